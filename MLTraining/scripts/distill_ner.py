@@ -0,0 +1,296 @@
+# distill_ner.py
+# Distill the trained NER model (teacher) into a shallower or narrower student, export the
+# student to ONNX through export_to_onnx.py, and report F1 against tokens/sec for both.
+#
+# Usage (from project root):
+#   python MLTraining/scripts/distill_ner.py --teacher pii-lab/experiments/baseline/model/final-model
+# Small CPU run, e.g. to check the pipeline end to end:
+#   python MLTraining/scripts/distill_ner.py --teacher <final-model> --cpu --max_train 200 --max_eval 50 --epochs 1
+# Optional args:
+#   --data_dir         prepared dataset dir from prepare_dataset.py (tokenized with the teacher's tokenizer)
+#   --out_dir          student training outputs; the clean export goes to final-model under it
+#   --onnx_out         ONNX export of the student (default: onnx under out_dir)
+#   --teacher_onnx     the teacher's ONNX model dir, to time it with ONNX Runtime as well (e.g. src/piiscanner/model)
+#   --student_layers   transformer layers in the student (the teacher has 6)
+#   --student_dim      hidden size of the student; 0 keeps the teacher's, and then the student
+#                      starts from the teacher's embeddings, classifier and every k-th layer
+#   --temperature      softening of both distributions in the distillation loss
+#   --alpha            weight of the soft (teacher) loss; 1 - alpha goes to the gold labels
+#
+# Writes distill_report.json to --out_dir.
+
+import os
+import copy
+import json
+import time
+import argparse
+
+import numpy as np
+
+import torch
+import torch.nn.functional as F
+from datasets import load_from_disk
+from transformers import (
+    AutoTokenizer,
+    AutoModelForTokenClassification,
+    DataCollatorForTokenClassification,
+    Trainer,
+    TrainingArguments,
+)
+import evaluate
+
+
+def make_student(teacher, layers, dim=0, heads=0):
+    """
+    A DistilBERT student with `layers` layers. At the teacher's width it is initialised from the
+    teacher (embeddings, classifier, and layers spread evenly over the teacher's), the way DistilBERT
+    itself was initialised from BERT. A narrower student starts from scratch.
+    """
+    cfg = copy.deepcopy(teacher.config)
+    if cfg.model_type != "distilbert":
+        raise SystemExit(f"Expected a DistilBERT teacher, got {cfg.model_type}")
+    cfg.n_layers = layers
+    narrow = bool(dim) and dim != cfg.dim
+    if narrow:
+        cfg.dim = dim
+        cfg.hidden_dim = 4 * dim
+        cfg.n_heads = heads or max(1, dim // 64)
+    student = AutoModelForTokenClassification.from_config(cfg)
+    if not narrow:
+        src, dst = teacher.distilbert, student.distilbert
+        dst.embeddings.load_state_dict(src.embeddings.state_dict())
+        picks = np.linspace(0, teacher.config.n_layers - 1, layers).round().astype(int)
+        for i, j in enumerate(picks):
+            dst.transformer.layer[i].load_state_dict(src.transformer.layer[int(j)].state_dict())
+        student.classifier.load_state_dict(teacher.classifier.state_dict())
+        print("Student initialised from teacher layers", picks.tolist())
+    return student
+
+
+class DistillTrainer(Trainer):
+    """Trainer whose loss mixes KL to the teacher's softened token distributions with the usual cross-entropy."""
+
+    def __init__(self, *args, teacher=None, temperature=2.0, alpha=0.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.teacher = teacher.to(self.args.device).eval()
+        self.temperature = temperature
+        self.alpha = alpha
+
+    def compute_loss(self, model, inputs, return_outputs=False, **kwargs):
+        out = model(**inputs)
+        with torch.no_grad():
+            t_logits = self.teacher(input_ids=inputs["input_ids"], attention_mask=inputs["attention_mask"]).logits
+        keep = inputs["labels"] != -100  # padding carries no signal
+        T = self.temperature
+        soft = F.kl_div(
+            F.log_softmax(out.logits[keep] / T, dim=-1),
+            F.softmax(t_logits[keep] / T, dim=-1),
+            reduction="batchmean",
+        ) * (T * T)
+        loss = self.alpha * soft + (1 - self.alpha) * out.loss
+        return (loss, out) if return_outputs else loss
+
+
+def make_compute_metrics(id2label):
+    metric = evaluate.load("seqeval")
+
+    def compute_metrics(p):
+        preds, labels = p
+        preds = np.argmax(preds, axis=-1)
+        true_preds, true_labels = [], []
+        for pred, lab in zip(preds, labels):
+            cur_p, cur_l = [], []
+            for p_i, l_i in zip(pred, lab):
+                if l_i == -100:
+                    continue
+                cur_p.append(id2label[p_i])
+                cur_l.append(id2label[l_i])
+            true_preds.append(cur_p)
+            true_labels.append(cur_l)
+        results = metric.compute(predictions=true_preds, references=true_labels)
+        return {
+            "precision": results.get("overall_precision", 0.0),
+            "recall":    results.get("overall_recall", 0.0),
+            "f1":        results.get("overall_f1", 0.0),
+            "accuracy":  results.get("overall_accuracy", 0.0),
+        }
+
+    return compute_metrics
+
+
+# -------- throughput --------
+def cpu_batches(ds, collator, bsz):
+    """Padded (input_ids, attention_mask) numpy batches of `ds`."""
+    out = []
+    for i in range(0, len(ds), bsz):
+        feats = [{"input_ids": ds[j]["input_ids"], "attention_mask": ds[j]["attention_mask"]}
+                 for j in range(i, min(i + bsz, len(ds)))]
+        b = collator(feats)
+        out.append((b["input_ids"].numpy(), b["attention_mask"].numpy()))
+    return out
+
+
+def torch_tokens_per_sec(model, batches):
+    model = model.to("cpu").eval()
+    with torch.no_grad():
+        ids, mask = batches[0]
+        model(input_ids=torch.from_numpy(ids), attention_mask=torch.from_numpy(mask))  # warm-up
+        tokens = 0
+        t0 = time.perf_counter()
+        for ids, mask in batches:
+            model(input_ids=torch.from_numpy(ids), attention_mask=torch.from_numpy(mask))
+            tokens += int(mask.sum())
+    return tokens / (time.perf_counter() - t0)
+
+
+def onnx_tokens_per_sec(model_dir, batches):
+    import onnxruntime as ort
+    sess = ort.InferenceSession(os.path.join(model_dir, "model.onnx"), providers=["CPUExecutionProvider"])
+    names = {i.name for i in sess.get_inputs()}
+
+    def feed(ids, mask):
+        f = {"input_ids": ids.astype(np.int64), "attention_mask": mask.astype(np.int64)}
+        return {k: v for k, v in f.items() if k in names}
+
+    sess.run(None, feed(*batches[0]))  # warm-up
+    tokens = 0
+    t0 = time.perf_counter()
+    for ids, mask in batches:
+        sess.run(None, feed(ids, mask))
+        tokens += int(mask.sum())
+    return tokens / (time.perf_counter() - t0)
+
+
+def describe(model):
+    c = model.config
+    return {"layers": c.n_layers, "dim": c.dim, "heads": c.n_heads,
+            "params": sum(p.numel() for p in model.parameters())}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--teacher", default="pii-lab/experiments/baseline/model/final-model")
+    ap.add_argument("--teacher_onnx", default=None, help="Teacher's ONNX dir, to compare ONNX Runtime throughput too")
+    ap.add_argument("--data_dir", default="pii-lab/experiments/baseline/data")
+    ap.add_argument("--out_dir", default="pii-lab/experiments/distilled/model")
+    ap.add_argument("--onnx_out", default=None, help="Export folder for the student's ONNX model")
+    ap.add_argument("--no_export", action="store_true", help="Skip the ONNX export")
+    ap.add_argument("--student_layers", type=int, default=3)
+    ap.add_argument("--student_dim", type=int, default=0)
+    ap.add_argument("--student_heads", type=int, default=0)
+    ap.add_argument("--temperature", type=float, default=2.0)
+    ap.add_argument("--alpha", type=float, default=0.5)
+    ap.add_argument("--epochs", type=int, default=5)
+    ap.add_argument("--bsz", type=int, default=16)
+    ap.add_argument("--lr", type=float, default=1e-4)
+    ap.add_argument("--warmup_ratio", type=float, default=0.1)
+    ap.add_argument("--max_train", type=int, default=0, help="Use only the first N training examples (0 = all)")
+    ap.add_argument("--max_eval", type=int, default=0, help="Use only the first N validation examples (0 = all)")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--cpu", action="store_true", help="Train on CPU even if CUDA is available")
+    ap.add_argument("--fp16", action="store_true", help="Use mixed precision (requires CUDA)")
+    args = ap.parse_args()
+
+    ds = load_from_disk(args.data_dir)
+    train, val = ds["train"], ds["validation"]
+    if args.max_train:
+        train = train.select(range(min(args.max_train, len(train))))
+    if args.max_eval:
+        val = val.select(range(min(args.max_eval, len(val))))
+    with open(os.path.join(args.data_dir, "id2label.json"), "r", encoding="utf-8") as f:
+        id2label = {int(k): v for k, v in json.load(f).items()}
+
+    tok = AutoTokenizer.from_pretrained(args.teacher, use_fast=True)
+    teacher = AutoModelForTokenClassification.from_pretrained(args.teacher)
+    student = make_student(teacher, args.student_layers, args.student_dim, args.student_heads)
+
+    collator = DataCollatorForTokenClassification(tok)
+    compute_metrics = make_compute_metrics(id2label)
+    os.makedirs(args.out_dir, exist_ok=True)
+
+    targs = TrainingArguments(
+        output_dir=args.out_dir,
+        logging_dir=os.path.join(args.out_dir, "runs"),
+        learning_rate=args.lr,
+        per_device_train_batch_size=args.bsz,
+        per_device_eval_batch_size=args.bsz,
+        num_train_epochs=args.epochs,
+        weight_decay=0.01,
+        evaluation_strategy="epoch",
+        save_strategy="no",
+        load_best_model_at_end=False,
+        warmup_ratio=args.warmup_ratio,
+        seed=args.seed,
+        report_to=["tensorboard"],
+        fp16=args.fp16,
+        use_cpu=args.cpu,
+        save_safetensors=True,
+    )
+
+    trainer = DistillTrainer(
+        model=student,
+        args=targs,
+        train_dataset=train,
+        eval_dataset=val,
+        tokenizer=tok,
+        data_collator=collator,
+        compute_metrics=compute_metrics,
+        teacher=teacher,
+        temperature=args.temperature,
+        alpha=args.alpha,
+    )
+    trainer.train()
+
+    # F1 of both on the same validation examples
+    student_eval = trainer.evaluate()
+    teacher_eval = Trainer(model=teacher, args=targs, eval_dataset=val, tokenizer=tok,
+                           data_collator=collator, compute_metrics=compute_metrics).evaluate()
+
+    # -------- Clean export, same layout as train_ner_v2.py --------
+    final_out = os.path.join(args.out_dir, "final-model")
+    os.makedirs(final_out, exist_ok=True)
+    trainer.model.save_pretrained(final_out)
+    tok.save_pretrained(final_out)
+    with open(os.path.join(final_out, "id2label.json"), "w", encoding="utf-8") as f:
+        json.dump({int(k): v for k, v in id2label.items()}, f, indent=2)
+
+    onnx_out = None
+    if not args.no_export:
+        onnx_out = args.onnx_out or os.path.join(args.out_dir, "onnx")
+        from export_to_onnx import export  # next to this script
+        export(final_out, onnx_out)
+
+    # -------- F1 vs tokens/sec --------
+    batches = cpu_batches(val, collator, args.bsz)
+    report = {"validation_examples": len(val), "temperature": args.temperature, "alpha": args.alpha}
+    for name, model, ev, onnx_dir in (("teacher", teacher, teacher_eval, args.teacher_onnx),
+                                      ("student", trainer.model, student_eval, onnx_out)):
+        report[name] = {
+            **describe(model),
+            "f1": ev.get("eval_f1"),
+            "precision": ev.get("eval_precision"),
+            "recall": ev.get("eval_recall"),
+            "torch_cpu_tokens_per_sec": torch_tokens_per_sec(model, batches),
+        }
+        if onnx_dir:
+            report[name]["onnx_cpu_tokens_per_sec"] = onnx_tokens_per_sec(onnx_dir, batches)
+    report["speedup_torch_cpu"] = (report["student"]["torch_cpu_tokens_per_sec"]
+                                   / report["teacher"]["torch_cpu_tokens_per_sec"])
+    if "onnx_cpu_tokens_per_sec" in report["teacher"] and "onnx_cpu_tokens_per_sec" in report["student"]:
+        report["speedup_onnx_cpu"] = (report["student"]["onnx_cpu_tokens_per_sec"]
+                                      / report["teacher"]["onnx_cpu_tokens_per_sec"])
+    if report["teacher"]["f1"] is not None and report["student"]["f1"] is not None:
+        report["f1_delta"] = report["student"]["f1"] - report["teacher"]["f1"]
+
+    with open(os.path.join(args.out_dir, "distill_report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+    print("\n=== Distillation complete ===")
+    print(json.dumps(report, indent=2))
+    print("Student model  :", final_out)
+    if onnx_out:
+        print("Student ONNX   :", onnx_out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,41 @@
 # evaluate_ner.py
-# Evaluate a token classification (NER) model on the saved test split.
+# Evaluate a token classification (NER) model on the saved test split, and time it.
 # Usage:
 #   python pii-lab/scripts/evaluate_ner.py
+#   python pii-lab/scripts/evaluate_ner.py --backend onnx          # the model the scanner ships
 # Optional args:
+#   --backend    torch: the HF checkpoint in --model_dir (argmax labels)
+#                onnx: an ONNX model dir through the scanner's PiiModel (its batching, decode and thresholds)
 #   --model_dir  path to trained HF model dir (default: experiments/baseline/model)
+#   --onnx_dir   ONNX model dir for --backend onnx (default: src/piiscanner/model)
+#   --config     scanner config.yaml whose thresholds the onnx backend applies (default: src/piiscanner/config.yaml);
+#                --config "" scores every label at 0.5, the baseline to compare tuned thresholds against
 #   --data_dir   path to prepared dataset dir (default: experiments/baseline/data)
 #   --bsz        batch size for inference (default: 16)
+#   --threads    ONNX Runtime intra-op threads (default: 0 = one per core)
+#   --max_eval   evaluate only the first N test rows (default: all)
+#   --warmup     batches run before timing starts (default: 1)
 #   --per_label  include per-label scores in output JSON
+# Output: seqeval scores, plus "speed": docs/sec, tokens/sec (real tokens, not padding) and
+# p50/p95/p99 batch latency in ms (model forward, and for onnx the threshold decode).
+# The onnx backend evaluates the test split's own token ids, so it needs the tokenizer the data was
+# prepared with.
 
 import os
+import sys
 import json
+import time
 import argparse
+import itertools
 from typing import Dict, List
 
 import numpy as np
-import torch
 from datasets import load_from_disk
-from transformers import (
-    AutoTokenizer,
-    AutoModelForTokenClassification,
-    DataCollatorForTokenClassification,
-)
 import evaluate
 
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, "..", "..", "src")
+
 
 def to_py(o):
     """Convert NumPy types/arrays (and nested structures) into plain Python for json.dumps."""
@@ -39,65 +52,113 @@ def to_py(o):
     return o
 
 
-def chunk_indices(n_items: int, bsz: int):
-    for i in range(0, n_items, bsz):
-        yield range(i, min(i + bsz, n_items))
+def batches(ds, bsz: int):
+    """Columns of ds, bsz rows at a time (one slice per batch instead of one lookup per row)."""
+    ds = ds.select_columns(["input_ids", "attention_mask", "labels"])
+    for i in range(0, len(ds), bsz):
+        yield ds[i:i + bsz]
+
+
+def pad(rows, value=0):
+    out = np.full((len(rows), max(len(r) for r in rows)), value, dtype=np.int64)
+    for j, r in enumerate(rows):
+        out[j, :len(r)] = r
+    return out
+
+
+def torch_backend(args):
+    """predict(batch) -> predicted label ids per row, and id2label, for the HF checkpoint."""
+    import torch
+    from transformers import AutoModelForTokenClassification
+
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = AutoModelForTokenClassification.from_pretrained(args.model_dir).to(device)
+    model.eval()
+
+    def predict(batch):
+        input_ids = torch.from_numpy(pad(batch["input_ids"])).to(device)
+        attention_mask = torch.from_numpy(pad(batch["attention_mask"])).to(device)
+        with torch.no_grad():
+            logits = model(input_ids=input_ids, attention_mask=attention_mask).logits  # [B, T, C]
+        preds = torch.argmax(logits, dim=-1).cpu().numpy()
+        return [p[:len(x)] for p, x in zip(preds, batch["input_ids"])]
+
+    return predict, {int(k): v for k, v in model.config.id2label.items()}
+
+
+def onnx_backend(args):
+    """predict(batch) -> label ids per row, and id2label, for an ONNX model dir run the way the scanner runs it."""
+    import yaml
+    sys.path.insert(0, os.path.abspath(SRC))
+    from piiscanner.infer import PiiModel
+
+    thresholds = {}
+    if args.config:
+        with open(args.config, "r", encoding="utf-8") as f:
+            thresholds = (yaml.safe_load(f) or {}).get("thresholds") or {}
+    model = PiiModel(os.path.abspath(args.onnx_dir), thresholds=thresholds, batch_size=args.bsz,
+                     intra_op_threads=args.threads, use_profile=False)
+
+    def predict(batch):
+        enc = {"input_ids": batch["input_ids"], "attention_mask": batch["attention_mask"]}
+        return model.token_labels(model.run(enc))
+
+    return predict, model.id2label
+
+
+def latency_stats(seconds: List[float]) -> Dict[str, float]:
+    ms = np.asarray(seconds) * 1000.0
+    p50, p95, p99 = np.percentile(ms, [50, 95, 99])
+    return {"p50": p50, "p95": p95, "p99": p99, "mean": ms.mean(), "max": ms.max()}
 
 
 def main():
     ap = argparse.ArgumentParser()
+    ap.add_argument("--backend", choices=["torch", "onnx"], default="torch")
     ap.add_argument("--model_dir", default="pii-lab/experiments/baseline/model")
+    ap.add_argument("--onnx_dir", default=os.path.join(SRC, "piiscanner", "model"))
+    ap.add_argument("--config", default=os.path.join(SRC, "piiscanner", "config.yaml"))
     ap.add_argument("--data_dir",  default="pii-lab/experiments/baseline/data")
     ap.add_argument("--bsz", type=int, default=16)
+    ap.add_argument("--threads", type=int, default=0)
+    ap.add_argument("--max_eval", type=int, default=0)
+    ap.add_argument("--warmup", type=int, default=1)
     ap.add_argument("--per_label", action="store_true")
     args = ap.parse_args()
 
     # Load dataset + label maps
     ds = load_from_disk(args.data_dir)
     test = ds["test"]
+    if args.max_eval:
+        test = test.select(range(min(args.max_eval, len(test))))
 
     with open(os.path.join(args.data_dir, "id2label.json"), "r", encoding="utf-8") as f:
         id2label: Dict[int, str] = {int(k): v for k, v in json.load(f).items()}
 
-    # Model & tokenizer
-    device = "cuda" if torch.cuda.is_available() else "cpu"
-    tok = AutoTokenizer.from_pretrained(args.model_dir, use_fast=True)
-    model = AutoModelForTokenClassification.from_pretrained(args.model_dir).to(device)
-    model.eval()
-
-    # Collator pads inputs AND labels (labels -> -100 for padded positions)
-    collator = DataCollatorForTokenClassification(tok)
+    predict, model_id2label = (onnx_backend if args.backend == "onnx" else torch_backend)(args)
     seqeval_metric = evaluate.load("seqeval")
 
+    for batch in itertools.islice(batches(test, args.bsz), args.warmup):
+        predict(batch)
+
     all_pred_tags: List[List[str]] = []
     all_true_tags: List[List[str]] = []
+    latencies: List[float] = []
+    tokens = 0
 
-    for idx_range in chunk_indices(len(test), args.bsz):
-        features = []
-        for i in idx_range:
-            ex = test[i]
-            features.append({
-                "input_ids": ex["input_ids"],
-                "attention_mask": ex["attention_mask"],
-                "labels": ex["labels"],
-            })
-
-        batch = collator(features)
-        input_ids = batch["input_ids"].to(device)
-        attention_mask = batch["attention_mask"].to(device)
-        labels = batch["labels"].cpu().numpy()  # [B, T] with -100 on padding
-
-        with torch.no_grad():
-            logits = model(input_ids=input_ids, attention_mask=attention_mask).logits  # [B, T, C]
-        preds = torch.argmax(logits, dim=-1).cpu().numpy()
+    for batch in batches(test, args.bsz):
+        t0 = time.perf_counter()
+        preds = predict(batch)
+        latencies.append(time.perf_counter() - t0)
+        tokens += sum(sum(m) for m in batch["attention_mask"])
 
-        # Convert ids -> tag strings, skipping padded (-100) label positions
-        for p_row, l_row in zip(preds, labels):
+        # Convert ids -> tag strings, skipping positions labelled -100 (ignored), if the split has any
+        for p_row, l_row in zip(preds, batch["labels"]):
             pred_tags, true_tags = [], []
             for pid, lid in zip(p_row, l_row):
                 if lid == -100:
-                    continue  # ignore padding
-                pred_tags.append(id2label[int(pid)])
+                    continue
+                pred_tags.append(model_id2label[int(pid)])
                 true_tags.append(id2label[int(lid)])
             all_pred_tags.append(pred_tags)
             all_true_tags.append(true_tags)
@@ -111,6 +172,21 @@ def main():
             "overall_accuracy": results.get("overall_accuracy"),
         }
 
+    seconds = sum(latencies)
+    results["speed"] = {
+        "backend": args.backend,
+        "model": args.onnx_dir if args.backend == "onnx" else args.model_dir,
+        "batch_size": args.bsz,
+        "docs": len(test),
+        "tokens": tokens,
+        "seconds": seconds,
+        "docs_per_sec": len(test) / seconds if seconds else 0.0,
+        "tokens_per_sec": tokens / seconds if seconds else 0.0,
+        "batch_latency_ms": latency_stats(latencies) if latencies else {},
+    }
+
+    if args.backend == "onnx":
+        results["thresholds"] = args.config or "0.5"
     print(json.dumps(to_py(results), indent=2))
 
 
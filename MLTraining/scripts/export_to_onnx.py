@@ -0,0 +1,160 @@
+# export_to_onnx.py
+# Export a trained HF token classification model to the ONNX layout the scanner loads, then
+# optimize the graph offline with ONNX Runtime's transformer optimizer.
+#
+# Usage:
+#   python export_to_onnx.py [--src final-model] [--dst app/model] [--opset 17]
+# Optional args:
+#   --no_optimize        ship the plain optimum export
+#   --optimize_only      skip the export and optimize the model.onnx already in --dst
+#   --test               JSONL with a "text" per line to check the optimized graph against (default: datasets/test.jsonl)
+#   --atol               largest logit difference allowed on real tokens
+#   --keep_unoptimized   keep the plain export as model.unoptimized.onnx
+# Also imported by distill_ner.py to export the student the same way.
+# The optimizer needs onnx and sympy next to onnxruntime (both come with the torch/optimum install).
+import os, json, argparse
+import numpy as np
+import onnxruntime as ort
+from onnxruntime.transformers.fusion_options import FusionOptions
+from onnxruntime.transformers.optimizer import optimize_model
+from transformers import AutoTokenizer, AutoConfig
+from optimum.onnxruntime import ORTModelForTokenClassification
+
+SRC = r"C:\Users\Capstone2026User\pii-lab\experiments\baseline\model\final-model"
+DST = r"C:\Users\Capstone2026User\pii-scanner\app\model"
+TEST = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "datasets", "test.jsonl")
+
+
+def export(src, dst, opset=17, optimize=True, test=TEST, atol=1e-3, keep_unoptimized=False):
+    """Write model.onnx, tokenizer files and id2label.json for the model in `src` to `dst`."""
+    os.makedirs(dst, exist_ok=True)
+
+    tok = AutoTokenizer.from_pretrained(src, use_fast=True)
+    cfg = AutoConfig.from_pretrained(src)
+
+    ort_model = ORTModelForTokenClassification.from_pretrained(
+        src, export=True, from_transformers=True, opset=opset
+    )
+    ort_model.save_pretrained(dst)
+    tok.save_pretrained(dst)
+
+    with open(os.path.join(dst, "id2label.json"), "w") as f:
+        json.dump({int(k): v for k, v in cfg.id2label.items()}, f)
+
+    if optimize:
+        optimize_and_verify(dst, test, atol, keep_unoptimized)
+    return dst
+
+
+# -------- offline graph optimization --------
+def optimize(dst, keep_outputs=("logits",)):
+    """
+    Run the transformer optimizer over dst/model.onnx and write dst/model.optimized.onnx.
+    - ORT basic optimizations first (constant folding, redundant node elimination); these are
+      hardware independent, so the result runs anywhere the plain graph does.
+    - Then the BERT-family fusions DistilBERT matches: attention, (skip) LayerNorm, GELU with its
+      bias, and embedding + LayerNorm.
+    - Graph outputs other than keep_outputs are dropped, and nodes that only fed them pruned.
+    Returns (path, fused operator counts).
+    """
+    cfg = AutoConfig.from_pretrained(dst)
+    opts = FusionOptions("bert")
+    opts.enable_gelu = True
+    opts.enable_bias_gelu = True
+    opts.enable_layer_norm = True
+    opts.enable_skip_layer_norm = True
+    opts.enable_bias_skip_layer_norm = True
+    opts.enable_attention = True
+    opts.enable_embed_layer_norm = True
+
+    model = optimize_model(
+        os.path.join(dst, "model.onnx"),
+        model_type="bert",
+        num_heads=getattr(cfg, "n_heads", getattr(cfg, "num_attention_heads", 0)),
+        hidden_size=getattr(cfg, "dim", getattr(cfg, "hidden_size", 0)),
+        optimization_options=opts,
+        opt_level=1,
+        use_gpu=False,
+    )
+    graph = model.model.graph
+    for out in [o for o in graph.output if o.name not in keep_outputs]:
+        graph.output.remove(out)
+    model.prune_graph()
+
+    path = os.path.join(dst, "model.optimized.onnx")
+    model.save_model_to_file(path)
+    return path, {k: v for k, v in model.get_fused_operator_statistics().items() if v}
+
+
+def load_texts(path, limit=0):
+    texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                texts.append(json.loads(line)["text"])
+            if limit and len(texts) >= limit:
+                break
+    return texts
+
+
+def compare(dst, optimized, texts, bsz=8, max_len=512):
+    """Logits of dst/model.onnx and `optimized` on `texts`: worst difference and argmax agreement on real tokens."""
+    tok = AutoTokenizer.from_pretrained(dst, use_fast=True)
+    plain = ort.InferenceSession(os.path.join(dst, "model.onnx"), providers=["CPUExecutionProvider"])
+    fused = ort.InferenceSession(optimized, providers=["CPUExecutionProvider"])
+
+    def feed(sess, enc):
+        names = {i.name for i in sess.get_inputs()}
+        return {k: enc[k].astype(np.int64) for k in names}
+
+    worst, agree, tokens = 0.0, 0, 0
+    for i in range(0, len(texts), bsz):
+        enc = tok(texts[i:i + bsz], padding=True, truncation=True, max_length=max_len, return_tensors="np")
+        a = plain.run(["logits"], feed(plain, enc))[0]
+        b = fused.run(["logits"], feed(fused, enc))[0]
+        real = enc["attention_mask"].astype(bool)
+        worst = max(worst, float(np.abs(a - b)[real].max()))
+        agree += int((a.argmax(-1) == b.argmax(-1))[real].sum())
+        tokens += int(real.sum())
+    return {"texts": len(texts), "tokens": tokens, "max_abs_diff": worst,
+            "argmax_agreement": agree / tokens if tokens else 1.0}
+
+
+def optimize_and_verify(dst, test=TEST, atol=1e-3, keep_unoptimized=False):
+    """
+    Optimize dst/model.onnx and, if it matches the plain graph on `test` (every token's label the
+    same, logits within atol), ship it as model.onnx. Otherwise the plain graph stays. Returns the report.
+    """
+    optimized, fused = optimize(dst)
+    report = {"fused": fused, **compare(dst, optimized, load_texts(test))}
+    report["ok"] = report["argmax_agreement"] == 1.0 and report["max_abs_diff"] <= atol
+    print("Graph optimization:", json.dumps(report, indent=2))
+
+    model_path = os.path.join(dst, "model.onnx")
+    if not report["ok"]:
+        os.remove(optimized)
+        print("Optimized graph doesn't match the export; keeping the unoptimized model.onnx")
+        return report
+    if keep_unoptimized:
+        os.replace(model_path, os.path.join(dst, "model.unoptimized.onnx"))
+    os.replace(optimized, model_path)
+    print("Shipped the optimized graph as", model_path)
+    return report
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--src", default=SRC)
+    ap.add_argument("--dst", default=DST)
+    ap.add_argument("--opset", type=int, default=17)
+    ap.add_argument("--no_optimize", action="store_true", help="Ship the plain export")
+    ap.add_argument("--optimize_only", action="store_true", help="Optimize the model.onnx already in --dst")
+    ap.add_argument("--test", default=TEST, help="JSONL texts to verify the optimized graph on")
+    ap.add_argument("--atol", type=float, default=1e-3)
+    ap.add_argument("--keep_unoptimized", action="store_true")
+    args = ap.parse_args()
+    if args.optimize_only:
+        optimize_and_verify(args.dst, args.test, args.atol, args.keep_unoptimized)
+    else:
+        export(args.src, args.dst, args.opset, not args.no_optimize, args.test, args.atol, args.keep_unoptimized)
+        print("Exported ONNX model to", args.dst)
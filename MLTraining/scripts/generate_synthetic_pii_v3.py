@@ -14,12 +14,23 @@ Features:
 Outputs:
   <out>/synthetic/text/*.txt
   datasets/train.jsonl, dev.jsonl, test.jsonl, labels.jsonl
+
+Sharded mode (--shard_size), for corpora of millions of documents:
+  <out>/shards/{train,dev,test}-NNNNN.jsonl, <out>/shards/manifest.json
+  Shards are generated by --workers processes and streamed to disk a document at a time.
+  Shard i is seeded from (--seed, i) alone, so the corpus is the same for any worker count.
+  Each document's split is drawn as it is generated (80/10/10) instead of by a shuffle at the end.
+  e.g.  python generate_synthetic_pii_v3.py --n 10000000 --shard_size 100000 --workers 16
 """
 
 import argparse
 import json
+import multiprocessing as mp
+import os
 import random
 import ipaddress
+import time
+import zlib
 from pathlib import Path
 from faker import Faker
 
@@ -178,7 +189,7 @@ def cc_styles(n):
     return pool[:max(1, min(n, len(pool)))]
 
 def ip_styles(n):
-    def ipv4_pub(_): return Faker().ipv4_public()
+    def ipv4_pub(f): return f.ipv4_public()
     def ipv6(_):     return str(ipaddress.IPv6Address(random.getrandbits(128)))
     def ipv4_pad(_): return ".".join(f"{random.randint(1,255):03d}" for _ in range(4))  # 010.200.007.099
     styles = [ipv4_pub, ipv6, ipv4_pad]
@@ -333,12 +344,126 @@ def build_negative(fake, hard_neg_rate=0.5, noise_rate=0.6):
 # Style splitting (for disjoint formats)
 # -----------------------------
 def split_styles(label, k, seed=13):
-    rng = random.Random(seed + hash(label) % 1000)
+    rng = random.Random(seed + zlib.crc32(label.encode()) % 1000)  # hash() is salted per process
     styles = STYLE_BANK[label](k)
     rng.shuffle(styles)
     mid = max(1, len(styles) // 2)
     return styles[:mid], styles[mid:]  # (train, heldout)
 
+def build_style_maps(args):
+    """(train, held-out) style maps; held-out is None without --disjoint_formats."""
+    if args.disjoint_formats:
+        style_map_train, style_map_held = {}, {}
+        cfg_k = {"SSN":5,"PHONE":6,"EMAIL":6,"DOB":5,"ADDRESS":4,"CREDIT_CARD":4,"IP_ADDRESS":3}
+        for lbl, k in cfg_k.items():
+            tr, ho = split_styles(lbl, k=k, seed=args.seed)
+            if not tr: tr = STYLE_BANK[lbl](max(1,k//2) or 1)
+            if not ho: ho = STYLE_BANK
+            style_map_train[lbl] = tr
+            style_map_held[lbl]  = ho
+        return style_map_train, style_map_held
+    style_map = {
+        "SSN": ssn_styles(5),
+        "PHONE": phone_styles(6),
+        "EMAIL": email_styles(6),
+        "DOB": dob_styles(5),
+        "ADDRESS": address_styles(4),
+        "CREDIT_CARD": cc_styles(4),   # Luhn-valid
+        "IP_ADDRESS": ip_styles(3),
+    }
+    return style_map, None
+
+def build_doc(fake, style_map, args):
+    is_pos = random.random() < args.positive_rate
+    if is_pos:
+        text, spans = build_positive(fake, style_map, confusable_rate=args.confusables)
+    else:
+        text, spans = build_negative(fake)
+
+    if random.random() < args.extra_noise:
+        extra, _ = build_negative(fake)
+        text = text + ("\n" if not text.endswith("\n") else "") + extra
+    return text, spans
+
+# -----------------------------
+# Sharded streaming mode
+# -----------------------------
+SPLITS = (("train", 0.8), ("dev", 0.9), ("test", 1.0))  # name, cumulative share
+_worker = {}
+
+def _init_worker(args):
+    """Per process: one Faker, and the style maps every shard shares (built from --seed, as in serial mode)."""
+    random.seed(args.seed); Faker.seed(args.seed)
+    _worker["args"] = args
+    _worker["fake"] = Faker("en_US")
+    _worker["maps"] = build_style_maps(args)
+
+def shard_seed(seed, shard):
+    return f"{seed}:{shard}"  # str seeds hash with sha512, so this is stable across processes and platforms
+
+def write_shard(shard):
+    """
+    Generate shard `shard` into <out>/shards/{train,dev,test}-NNNNN.jsonl, one document at a time.
+    Everything random (style picks, Faker, the split) is reseeded from (--seed, shard) first, so the
+    shard's content doesn't depend on which process runs it or what it ran before.
+    Files are written as .part and renamed when the shard is complete. Returns (shard, docs per split).
+    """
+    args, fake = _worker["args"], _worker["fake"]
+    style_map_train, style_map_held = _worker["maps"]
+    random.seed(shard_seed(args.seed, shard)); Faker.seed(shard_seed(args.seed, shard))
+
+    out_dir = Path(args.out)/"shards"
+    first = shard * args.shard_size
+    n = min(args.shard_size, args.n - first)
+    parts = {name: out_dir/f"{name}-{shard:05d}.jsonl.part" for name, _ in SPLITS}
+    files = {name: p.open("w", encoding="utf-8") for name, p in parts.items()}
+    counts = {name: 0 for name, _ in SPLITS}
+    try:
+        for k in range(n):
+            doc_id = f"doc_{first + k + 1:08d}"
+            r = random.random()
+            split = next(name for name, upto in SPLITS if r < upto)
+            held = style_map_held is not None and split != "train"
+            text, spans = build_doc(fake, style_map_held if held else style_map_train, args)
+            files[split].write(json.dumps({"id":doc_id,"text":text,"entities":spans}, ensure_ascii=False) + "\n")
+            counts[split] += 1
+    finally:
+        for f in files.values():
+            f.close()
+    for p in parts.values():
+        os.replace(p, p.with_suffix(""))
+    return shard, counts
+
+def main_sharded(args):
+    out_dir = Path(args.out)/"shards"; out_dir.mkdir(parents=True, exist_ok=True)
+    shards = (args.n + args.shard_size - 1) // args.shard_size
+    workers = max(1, min(args.workers, shards))
+    totals = {name: 0 for name, _ in SPLITS}
+    done = 0
+    t0 = time.perf_counter()
+    with mp.Pool(workers, initializer=_init_worker, initargs=(args,)) as pool:
+        for i, (shard, counts) in enumerate(pool.imap_unordered(write_shard, range(shards)), 1):
+            for name, c in counts.items():
+                totals[name] += c
+            done += sum(counts.values())
+            dt = time.perf_counter() - t0
+            print(f"\rShards {i}/{shards}  docs {done:,}  {done/dt:,.0f} docs/sec", end="", flush=True)
+    dt = time.perf_counter() - t0
+    print()
+
+    manifest = {
+        "n": args.n, "seed": args.seed, "shard_size": args.shard_size, "shards": shards,
+        "positive_rate": args.positive_rate, "confusables": args.confusables,
+        "extra_noise": args.extra_noise, "disjoint_formats": args.disjoint_formats,
+        "docs": totals, "workers": workers, "seconds": round(dt, 2), "docs_per_sec": round(done/dt, 1),
+    }
+    (out_dir/"manifest.json").write_text(json.dumps(manifest, indent=2), encoding="utf-8")
+    print("Done.")
+    print("Shards:", out_dir.resolve(), " ".join(f"{k}={v:,}" for k, v in totals.items()))
+    print(f"{done:,} docs in {dt:.1f}s with {workers} workers: {done/dt:,.0f} docs/sec")
+    if args.disjoint_formats:
+        print("Disjoint formats ENABLED: dev/test use held-out style pools.")
+
 # -----------------------------
 # Main
 # -----------------------------
@@ -351,8 +476,13 @@ def main():
     ap.add_argument("--confusables", type=float, default=0.0, help="0.0-1.0 rate of confusable chars INSIDE labeled values")
     ap.add_argument("--extra_noise", type=float, default=0.4, help="chance to append an extra negative block")
     ap.add_argument("--disjoint_formats", action="store_true", help="use held-out style pools for dev/test positives")
+    ap.add_argument("--shard_size", type=int, default=0, help="docs per shard; >0 switches to sharded streaming output under <out>/shards")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="processes for sharded mode")
     args = ap.parse_args()
 
+    if args.shard_size > 0:
+        return main_sharded(args)
+
     random.seed(args.seed); fake = Faker("en_US"); Faker.seed(args.seed)
 
     out_root = Path(args.out)
@@ -360,47 +490,12 @@ def main():
     ds_root = Path("datasets"); ds_root.mkdir(parents=True, exist_ok=True)
     labels_path = ds_root/"labels.jsonl"
 
-    # Build style maps
-    if args.disjoint_formats:
-        style_map_train, style_map_held = {}, {}
-        cfg_k = {"SSN":5,"PHONE":6,"EMAIL":6,"DOB":5,"ADDRESS":4,"CREDIT_CARD":4,"IP_ADDRESS":3}
-        for lbl, k in cfg_k.items():
-            tr, ho = split_styles(lbl, k=k, seed=args.seed)
-            if not tr: tr = STYLE_BANK[lbl](max(1,k//2) or 1)
-            if not ho: ho = STYLE_BANK
-            style_map_train[lbl] = tr
-            style_map_held[lbl]  = ho
-    else:
-        style_map = {
-            "SSN": ssn_styles(5),
-            "PHONE": phone_styles(6),
-            "EMAIL": email_styles(6),
-            "DOB": dob_styles(5),
-            "ADDRESS": address_styles(4),
-            "CREDIT_CARD": cc_styles(4),   # Luhn-valid
-            "IP_ADDRESS": ip_styles(3),
-        }
+    style_map_train, style_map_held = build_style_maps(args)
 
     items = []
     for idx in range(1, args.n+1):
         doc_id = f"doc_{idx:06d}"
-        is_pos = random.random() < args.positive_rate
-
-        if args.disjoint_formats:
-            if is_pos:
-                text, spans = build_positive(fake, style_map_train, confusable_rate=args.confusables)
-            else:
-                text, spans = build_negative(fake)
-        else:
-            if is_pos:
-                text, spans = build_positive(fake, style_map, confusable_rate=args.confusables)
-            else:
-                text, spans = build_negative(fake)
-
-        if random.random() < args.extra_noise:
-            extra, _ = build_negative(fake)
-            text = text + ("\n" if not text.endswith("\n") else "") + extra
-
+        text, spans = build_doc(fake, style_map_train, args)
         (txt_dir/f"{doc_id}.txt").write_text(text, encoding="utf-8")
         items.append({"id":doc_id,"text":text,"entities":spans})
 
@@ -1,54 +1,84 @@
 # prepare_dataset.py
-import json, argparse, os
+# Tokenize the synthetic JSONL corpora and align their character spans to BIO token labels.
+#
+# Usage:
+#   python prepare_dataset.py [--train ...] [--dev ...] [--test ...] [--model ...] [--out ...]
+# Optional args:
+#   --num_proc     worker processes for tokenization + alignment (default: all cores)
+#   --batch_size   examples per tokenizer call
+# --train/--dev/--test also take a glob, e.g. "data/shards/train-*.jsonl" from generate_synthetic_pii_v3.py --shard_size.
+import json, argparse, os, glob
 from pathlib import Path
-from datasets import Dataset, DatasetDict
+import numpy as np
+from datasets import DatasetDict, load_dataset
 from transformers import AutoTokenizer
 
 LABELS = ["O","B-PERSON","I-PERSON","B-DOB","I-DOB","B-ADDRESS","I-ADDRESS",
           "B-SSN","I-SSN","B-EMAIL","I-EMAIL","B-PHONE","I-PHONE",
           "B-CREDIT_CARD","I-CREDIT_CARD","B-IP_ADDRESS","I-IP_ADDRESS"]
+LABEL2ID = {l:i for i,l in enumerate(LABELS)}
 
-def char_spans_to_bio(text, spans, tok, max_len=512):
-    enc = tok(text, return_offsets_mapping=True, truncation=True, max_length=max_len)
-    tags = ["O"] * len(enc["offset_mapping"])
+def align_labels(offsets, spans):
+    """
+    Label ids for one tokenized example.
+    offsets: (T, 2) token char offsets; spans: entity dicts with start/end/label.
+    A token takes the span it overlaps most (the first one on a tie). It is B- when it starts
+    inside that span and I- when it starts before it; tokens with no overlap (and special
+    tokens, whose offsets are empty) are O.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+    ids = np.zeros(len(offsets), dtype=np.int64)
+    if not spans or not len(offsets):
+        return ids
+    a = np.fromiter((int(s["start"]) for s in spans), dtype=np.int64, count=len(spans))
+    b = np.fromiter((int(s["end"]) for s in spans), dtype=np.int64, count=len(spans))
+    s, e = offsets[:, 0:1], offsets[:, 1:2]
 
-    # Make span list (start,end,label) safe
-    norm = [(int(s["start"]), int(s["end"]), s["label"]) for s in spans]
-    for i, (s, e) in enumerate(enc["offset_mapping"]):
-        if e <= s:  # special tokens like CLS/SEP will be (0,0)
-            continue
-        covering = [lab for (a,b,lab) in norm if not (e <= a or b <= s)]
-        if covering:
-            # choose the one with max overlap
-            a,b,lab = max(((a,b,lab) for (a,b,lab) in norm),
-                          key=lambda x: max(0, min(e, x[1]) - max(s, x[0])) if not (e <= x[0] or x[1] <= s) else -1)
-            # B/I decision: starts at the token that overlaps the span start
-            if s >= a and s < b:
-                tags[i] = f"B-{lab}"
-            else:
-                tags[i] = f"I-{lab}"
+    # (T, S): does token t overlap span j, and by how much
+    covers = (e > a) & (b > s) & (e > s)
+    overlap = np.where(covers, np.maximum(0, np.minimum(e, b) - np.maximum(s, a)), -1)
+    best = overlap.argmax(axis=1)  # first maximum, like max() over the spans in order
+    hit = covers.any(axis=1)
+    if not hit.any():
+        return ids
 
-    # map to ids
-    label2id = {l:i for i,l in enumerate(LABELS)}
-    ids = [label2id.get(t, 0) for t in tags]
-    enc.pop("offset_mapping", None)
-    enc["labels"] = ids
+    t = np.flatnonzero(hit)
+    j = best[t]
+    starts_inside = (s[t, 0] >= a[j]) & (s[t, 0] < b[j])
+    b_ids = np.array([LABEL2ID.get(f"B-{sp['label']}", 0) for sp in spans], dtype=np.int64)
+    i_ids = np.array([LABEL2ID.get(f"I-{sp['label']}", 0) for sp in spans], dtype=np.int64)
+    ids[t] = np.where(starts_inside, b_ids[j], i_ids[j])
+    return ids
+
+def char_spans_to_bio(text, spans, tok, max_len=512):
+    """One example at a time; build_split does the same over batches."""
+    enc = tok(text, return_offsets_mapping=True, truncation=True, max_length=max_len)
+    enc["labels"] = align_labels(enc.pop("offset_mapping"), spans).tolist()
     return enc
 
+def encode_batch(batch, tok, max_len=512):
+    enc = tok(batch["text"], return_offsets_mapping=True, truncation=True, max_length=max_len)
+    offsets = enc.pop("offset_mapping")
+    enc["labels"] = [align_labels(o, spans).tolist() for o, spans in zip(offsets, batch["entities"])]
+    enc["id"] = batch["id"]
+    return dict(enc)
+
 def load_jsonl(path):
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            o = json.loads(line)
-            yield {"id": o["id"], "text": o["text"], "entities": o["entities"]}
+    # the json loader keys its cache on the files themselves, so a regenerated corpus isn't served from a stale cache
+    rows = load_dataset("json", data_files=sorted(glob.glob(path)) or [path], split="train")
+    return rows.select_columns(["id", "text", "entities"])
 
-def build_split(jsonl_path, tok):
-    rows = list(load_jsonl(jsonl_path))
-    def gen():
-        for r in rows:
-            ex = char_spans_to_bio(r["text"], r["entities"], tok)
-            ex["id"] = r["id"]
-            yield ex
-    return Dataset.from_generator(gen)
+def build_split(jsonl_path, tok, max_len=512, num_proc=None, batch_size=1000):
+    rows = load_jsonl(jsonl_path)
+    return rows.map(
+        encode_batch,
+        batched=True,
+        batch_size=batch_size,
+        num_proc=num_proc if num_proc and num_proc > 1 and len(rows) > batch_size else None,
+        fn_kwargs={"tok": tok, "max_len": max_len},
+        remove_columns=["text", "entities"],
+        desc=f"Tokenizing {os.path.basename(jsonl_path)}",
+    )
 
 def main():
     ap = argparse.ArgumentParser()
@@ -58,22 +88,26 @@ def main():
     ap.add_argument("--model", default="distilbert-base-uncased")
     ap.add_argument("--out",   default="pii-lab/experiments/baseline/data")
     ap.add_argument("--max_len", type=int, default=512)
+    ap.add_argument("--num_proc", type=int, default=os.cpu_count())
+    ap.add_argument("--batch_size", type=int, default=1000)
     args = ap.parse_args()
 
     tok = AutoTokenizer.from_pretrained(args.model, use_fast=True, model_max_length=args.max_len)
 
+    def split(path):
+        return build_split(path, tok, args.max_len, args.num_proc, args.batch_size)
+
     ds = DatasetDict({
-        "train": build_split(args.train, tok),
-        "validation": build_split(args.dev, tok),
-        "test": build_split(args.test, tok),
+        "train": split(args.train),
+        "validation": split(args.dev),
+        "test": split(args.test),
     })
     out = Path(args.out); out.mkdir(parents=True, exist_ok=True)
     ds.save_to_disk(str(out))
 
     # Save label maps
-    label2id = {l:i for i,l in enumerate(LABELS)}
-    id2label = {i:l for l,i in label2id.items()}
-    (out / "label2id.json").write_text(json.dumps(label2id, indent=2))
+    id2label = {i:l for l,i in LABEL2ID.items()}
+    (out / "label2id.json").write_text(json.dumps(LABEL2ID, indent=2))
     (out / "id2label.json").write_text(json.dumps(id2label, indent=2))
     print("Saved tokenized dataset to", out)
 
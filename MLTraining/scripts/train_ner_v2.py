@@ -12,6 +12,17 @@
 #   --eval_steps         evaluation/save frequency (steps)
 #   --seed               RNG seed
 #
+# CPU training profile (for build boxes without a GPU):
+#   python .\pii-lab\scripts\train_ner_v2.py --cpu --threads 16
+#   --cpu                train on CPU with length grouping and token-budget batches; defaults below
+#   --max_tokens         token budget per batch: rows x longest row (padding included) stays within it,
+#                        so a batch of short texts has many rows and one of long texts few (--cpu: 4096)
+#   --max_batch_rows     cap on rows per token-budget batch (default: 256)
+#   --grad_accum         gradient accumulation steps (--cpu: 2)
+#   --threads            torch intra-op threads (--cpu: one per core)
+# Every run logs samples/sec and padding efficiency (real tokens / padded tokens) per epoch, also to
+# train_speed.jsonl in --out_dir.
+#
 # After training:
 #   - Trainer saves checkpoints and the best model to --out_dir
 #   - We also save a clean export to --final_out_dir with:
@@ -19,8 +30,11 @@
 
 import os
 import json
+import time
 import argparse
 import numpy as np
+import torch
+from torch.utils.data import DataLoader
 
 from datasets import load_from_disk
 from transformers import (
@@ -29,10 +43,120 @@ from transformers import (
     AutoModelForTokenClassification,
     DataCollatorForTokenClassification,
     Trainer,
+    TrainerCallback,
     TrainingArguments,
 )
 import evaluate
 
+CPU_PROFILE = {"max_tokens": 4096, "grad_accum": 2, "threads": os.cpu_count()}
+DEFAULTS = {"max_tokens": 0, "grad_accum": 1, "threads": 0}
+
+
+class TokenBudgetBatches:
+    """
+    Batch sampler: rows sorted by length and packed so that rows x longest row <= max_tokens (and at
+    most max_rows rows). Batches are planned once, so every epoch has the same number of steps; their
+    order is reshuffled each epoch.
+    """
+
+    def __init__(self, lengths, max_tokens, max_rows=256, seed=42):
+        self.seed = seed
+        self.epoch = 0
+        lengths = np.asarray(lengths)
+        rng = np.random.default_rng(seed)
+        order = np.lexsort((rng.random(len(lengths)), lengths))  # by length, ties in random order
+        self.batches, cur, longest = [], [], 0
+        for i in order:
+            n = int(lengths[i])
+            if cur and ((len(cur) + 1) * max(longest, n) > max_tokens or len(cur) >= max_rows):
+                self.batches.append(cur)
+                cur, longest = [], 0
+            cur.append(int(i))
+            longest = max(longest, n)
+        if cur:
+            self.batches.append(cur)
+
+    def set_epoch(self, epoch):
+        self.epoch = epoch
+
+    def __iter__(self):
+        rng = np.random.default_rng((self.seed, self.epoch))
+        self.epoch += 1  # for trainers that never call set_epoch
+        for b in rng.permutation(len(self.batches)):
+            yield self.batches[b]
+
+    def __len__(self):
+        return len(self.batches)
+
+
+class PaddingStats:
+    """Wraps a collator and counts the rows, real tokens and padded tokens of the batches it builds."""
+
+    def __init__(self, collator):
+        self.collator = collator
+        self.reset()
+
+    def reset(self):
+        self.rows, self.real, self.padded = 0, 0, 0
+
+    def __call__(self, features):
+        batch = self.collator(features)
+        mask = batch["attention_mask"]
+        self.rows += int(mask.shape[0])
+        self.real += int(mask.sum())
+        self.padded += int(mask.numel())
+        return batch
+
+
+class EpochSpeed(TrainerCallback):
+    """Samples/sec and padding efficiency of each training epoch (evaluation runs after on_epoch_end, so isn't counted)."""
+
+    def __init__(self, stats, path):
+        self.stats = stats
+        self.path = path
+        self.t0 = None
+
+    def on_train_begin(self, args, state, control, **kwargs):
+        open(self.path, "w").close()
+
+    def on_epoch_begin(self, args, state, control, **kwargs):
+        self.stats.reset()
+        self.t0 = time.perf_counter()
+
+    def on_epoch_end(self, args, state, control, **kwargs):
+        dt = time.perf_counter() - self.t0
+        rec = {
+            "epoch": round(state.epoch or 0, 2),
+            "seconds": round(dt, 1),
+            "samples": self.stats.rows,
+            "samples_per_sec": round(self.stats.rows / dt, 2) if dt else 0.0,
+            "tokens_per_sec": round(self.stats.real / dt, 1) if dt else 0.0,
+            "padding_efficiency": round(self.stats.real / self.stats.padded, 4) if self.stats.padded else 1.0,
+        }
+        print("Epoch speed:", json.dumps(rec))
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(rec) + "\n")
+
+
+class BudgetTrainer(Trainer):
+    """Trainer whose training batches come from a TokenBudgetBatches sampler when one is given."""
+
+    def __init__(self, *args, batch_sampler=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.batch_sampler = batch_sampler
+
+    def get_train_dataloader(self):
+        if self.batch_sampler is None:
+            return super().get_train_dataloader()
+        ds = self._remove_unused_columns(self.train_dataset, description="training")
+        return self.accelerator.prepare(DataLoader(
+            ds,
+            batch_sampler=self.batch_sampler,
+            collate_fn=self.data_collator,
+            num_workers=self.args.dataloader_num_workers,
+            pin_memory=self.args.dataloader_pin_memory,
+        ))
+
 
 def main():
     ap = argparse.ArgumentParser()
@@ -47,7 +171,17 @@ def main():
     ap.add_argument("--eval_steps", type=int, default=200)
     ap.add_argument("--seed", type=int, default=42)
     ap.add_argument("--fp16", action="store_true", help="Use mixed precision (requires CUDA)")
+    ap.add_argument("--cpu", action="store_true", help="CPU training profile (length grouping, token-budget batches)")
+    ap.add_argument("--max_tokens", type=int, default=None, help="Token budget per training batch; 0 = --bsz rows")
+    ap.add_argument("--max_batch_rows", type=int, default=256)
+    ap.add_argument("--grad_accum", type=int, default=None, help="Gradient accumulation steps")
+    ap.add_argument("--threads", type=int, default=None, help="torch intra-op threads; 0 = torch's default")
     args = ap.parse_args()
+    for k, v in (CPU_PROFILE if args.cpu else DEFAULTS).items():
+        if getattr(args, k) is None:
+            setattr(args, k, v)
+    if args.threads:
+        torch.set_num_threads(args.threads)
 
     # Load tokenized dataset + label maps (from prepare_dataset.py)
     ds = load_from_disk(args.data_dir)
@@ -58,6 +192,13 @@ def main():
 
     num_labels = len(label2id)
 
+    # Row lengths, for length grouping and token budgets
+    train_ds = ds["train"].map(lambda b: {"length": [len(x) for x in b["input_ids"]]}, batched=True)
+    batch_sampler = None
+    if args.max_tokens:
+        batch_sampler = TokenBudgetBatches(train_ds["length"], args.max_tokens, args.max_batch_rows, args.seed)
+        print(f"Token-budget batches: {len(batch_sampler)} of <= {args.max_tokens} tokens per epoch")
+
     tok = AutoTokenizer.from_pretrained(args.base_model, use_fast=True)
     cfg = AutoConfig.from_pretrained(
         args.base_model,
@@ -67,7 +208,7 @@ def main():
     )
     model = AutoModelForTokenClassification.from_pretrained(args.base_model, config=cfg)
 
-    data_collator = DataCollatorForTokenClassification(tok)
+    data_collator = PaddingStats(DataCollatorForTokenClassification(tok))
     metric = evaluate.load("seqeval")
 
     def compute_metrics(p):
@@ -112,17 +253,26 @@ def main():
     	report_to=["tensorboard"],
     	fp16=args.fp16,
     	save_safetensors=True,         
+
+    	gradient_accumulation_steps=args.grad_accum,
+    	group_by_length=args.cpu,
+    	length_column_name="length",
+    	use_cpu=args.cpu,
+    	dataloader_num_workers=0,  # collation in this process, where PaddingStats counts it
+    	dataloader_pin_memory=not args.cpu,
     )
 
 
-    trainer = Trainer(
+    trainer = BudgetTrainer(
         model=model,
         args=targs,
-        train_dataset=ds["train"],
+        train_dataset=train_ds,
         eval_dataset=ds["validation"],
         tokenizer=tok,
         data_collator=data_collator,
         compute_metrics=compute_metrics,
+        callbacks=[EpochSpeed(data_collator, os.path.join(args.out_dir, "train_speed.jsonl"))],
+        batch_sampler=batch_sampler,
     )
 
     trainer.train()
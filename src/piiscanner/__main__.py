@@ -1,5 +1,8 @@
-from piiscanner.app import main
+import multiprocessing
 
 
 if __name__ == "__main__":
+    # before anything else is imported: in a spawned extraction process this is where it stops
+    multiprocessing.freeze_support()
+    from piiscanner.app import main
     main()
@@ -4,12 +4,15 @@ Group 43 Senior Capstone Project
 
 import importlib.metadata
 import sys
+from .guard import use_interpreter
 from .piiscannerapp import MainWindow
 
 from PySide6 import QtWidgets
 
 
 def main():
+    use_interpreter()
+
     # Linux desktop environments use an app's .desktop file to integrate the app
     # in to their application menus. The .desktop file of this app will include
     # the StartupWMClass key, set to app's formal name. This helps associate the
@@ -0,0 +1,275 @@
+# daemon.py (local scan service: warm model, concurrent requests coalesced into shared batches)
+import asyncio, json, logging, os, time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from .guard import OK
+from .metrics import NULL
+from .utils import empty_findings, exclude_globs, findings_to_dicts, merge_findings
+from .watch import matches
+
+log = logging.getLogger(__name__)
+
+MAX_BODY = 32 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 403: "Forbidden", 404: "Not Found", 405: "Method Not Allowed", 413: "Payload Too Large",
+           500: "Internal Server Error"}
+
+
+class MicroBatcher:
+    """
+    Collects texts from concurrent requests and runs them through the model together.
+    A batch closes when it has max_docs texts or max_wait seconds after its first text arrived,
+    whichever comes first, so a lone request waits at most max_wait for company.
+    Inference runs on one executor thread; the next batch fills up while the current one runs.
+    """
+
+    def __init__(self, model, merge_gap=0, max_docs=32, max_wait=0.005, metrics=NULL):
+        self.model = model
+        self.merge_gap = merge_gap
+        self.max_docs = max_docs
+        self.max_wait = max_wait
+        self.metrics = metrics
+        self.queue = None
+        self.pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="pii-infer")
+        self.batches = 0
+        self.texts = 0
+
+    async def submit(self, text):
+        """Merged FINDING_DTYPE array for `text`."""
+        fut = asyncio.get_running_loop().create_future()
+        await self.queue.put((text, fut))
+        return await fut
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_docs:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            texts = [t for t, _ in batch]
+            try:
+                results = await loop.run_in_executor(self.pool, self._infer, texts)
+            except Exception as e:
+                log.exception("Batch of %d failed", len(batch))
+                results = [e] * len(batch)
+            for (_, fut), res in zip(batch, results):
+                if fut.done():  # client went away
+                    continue
+                if isinstance(res, Exception):
+                    fut.set_exception(res)
+                else:
+                    fut.set_result(res)
+
+    def _infer(self, texts):
+        with self.metrics.time("daemon_batch_seconds"):
+            per_text = self.model.predict_batch(texts)
+        self.batches += 1
+        self.texts += len(texts)
+        self.metrics.inc("daemon_batches")
+        return [merge_findings(f, max_gap=self.merge_gap) for f in per_text]
+
+
+class ScanDaemon:
+    """
+    Minimal HTTP/1.1 JSON service (keep-alive, no chunked bodies), on localhost TCP or a Unix socket:
+        POST /scan/text  {"text": "..."}        -> {"contains_pii": bool, "findings": [...], "ms": float}
+        POST /scan/file  {"path": "..."}        -> same plus the file's "outcome", for a file matched by cfg targets
+                                                   (and not exclude_globs); contains_pii is null if it couldn't be read
+        GET  /health                            -> {"ok": true}
+        GET  /stats                             -> request/batch counts and p50/p99 latency
+    """
+
+    def __init__(self, model, cfg, metrics=NULL):
+        from .guard import extractor
+        from .scan import extraction_workers
+
+        dcfg = cfg.get("daemon", {})
+        self.cfg = dcfg
+        # /scan/file only reads what a scan of cfg targets would: any local client can call it
+        self.targets = cfg.get("targets", [])
+        self.excludes = exclude_globs(cfg)
+        self.metrics = metrics
+        self.throttle = model.throttle
+        # ...and reads it the way a scan does: under cfg limits (in watchdog processes with limits.isolate)
+        # and the throttle, so one malformed file can't hang or exhaust the daemon
+        workers = max(1, extraction_workers(cfg, model))
+        self.reader = extractor(cfg, workers, metrics)
+        self.read_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pii-read")
+        self.batcher = MicroBatcher(model, cfg.get("merge_gap", 0), dcfg.get("max_batch_docs", 32),
+                                    dcfg.get("max_wait_ms", 5) / 1000.0, metrics)
+        self.latencies = deque(maxlen=10000)
+        self.requests = 0
+        self.started = time.time()
+        self.server = None
+        self._batcher_task = None
+
+    async def start(self, host=None, port=None, unix_socket=None):
+        self.batcher.queue = asyncio.Queue()
+        self._batcher_task = asyncio.create_task(self.batcher.run())
+        unix_socket = unix_socket if unix_socket is not None else self.cfg.get("unix_socket")
+        if unix_socket:
+            self.server = await asyncio.start_unix_server(self._handle, path=unix_socket)
+        else:
+            host = host or self.cfg.get("host", "127.0.0.1")
+            port = self.cfg.get("port", 8765) if port is None else port
+            self.server = await asyncio.start_server(self._handle, host, port)
+        log.info("Listening on %s", self.address)
+        return self
+
+    @property
+    def address(self):
+        return self.server.sockets[0].getsockname()
+
+    async def stop(self):
+        self.server.close()
+        await self.server.wait_closed()
+        self._batcher_task.cancel()
+        self.batcher.pool.shutdown(wait=False)
+        self.read_pool.shutdown(wait=False)
+        self.reader.close()
+
+    def _read(self, path):
+        from .scan import _extract
+        return _extract(path, None, self.metrics, self.throttle, self.reader)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                line = await reader.readline()
+                if not line.strip():
+                    break
+                try:
+                    method, path, _ = line.decode("latin-1").split(" ", 2)
+                except ValueError:
+                    await self._respond(writer, 400, {"error": "bad request line"})
+                    break
+                headers = {}
+                while True:
+                    h = await reader.readline()
+                    if h in (b"\r\n", b"\n", b""):
+                        break
+                    k, _, v = h.decode("latin-1").partition(":")
+                    headers[k.strip().lower()] = v.strip()
+                length = headers.get("content-length", "0") or "0"
+                if not (length.isascii() and length.isdigit()):
+                    await self._respond(writer, 400, {"error": "bad content-length"})
+                    break
+                length = int(length)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {"error": f"body over {MAX_BODY} bytes"})
+                    break
+                body = await reader.readexactly(length) if length else b""
+                status, payload = await self._dispatch(method, path, body)
+                await self._respond(writer, status, payload)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _respond(self, writer, status, payload):
+        data = json.dumps(payload).encode("utf-8")
+        writer.write(f"HTTP/1.1 {status} {REASONS[status]}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+        await writer.drain()
+
+    async def _dispatch(self, method, path, body):
+        if path == "/health":
+            return 200, {"ok": True}
+        if path == "/stats":
+            return 200, self.stats()
+        if path not in ("/scan/text", "/scan/file"):
+            return 404, {"error": f"no such endpoint {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+        try:
+            req = json.loads(body or b"{}")
+        except ValueError:
+            return 400, {"error": "body is not JSON"}
+
+        t0 = time.perf_counter()
+        outcome = None  # a file's, for /scan/file
+        try:
+            if path == "/scan/text":
+                text = req.get("text")
+                if not isinstance(text, str):
+                    return 400, {"error": "expected {\"text\": \"...\"}"}
+            else:
+                file = req.get("path")
+                if not isinstance(file, str) or not file:
+                    return 400, {"error": "expected {\"path\": \"...\"}"}
+                file = os.path.realpath(file)
+                if not matches(file, self.targets, self.excludes):
+                    return 403, {"error": "path is not one of the configured targets"}
+                text, outcome = await asyncio.get_running_loop().run_in_executor(self.read_pool, self._read, file)
+            merged = await self.batcher.submit(text or "") if outcome is None or outcome is OK else empty_findings()
+        except OSError as e:
+            return 400, {"error": str(e)}
+        except Exception as e:
+            log.exception("Request failed")
+            return 500, {"error": str(e)}
+        elapsed = time.perf_counter() - t0
+        self.latencies.append(elapsed)
+        self.requests += 1
+        self.metrics.observe("daemon_request_seconds", elapsed)
+
+        scanned = outcome is None or outcome is OK
+        return 200, {"contains_pii": bool(len(merged)) if scanned else None, "findings": findings_to_dicts(merged),
+                     "ms": round(elapsed * 1000, 3), **(outcome or {})}
+
+    def stats(self):
+        lat = np.asarray(self.latencies) * 1000.0
+        return {
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "batches": self.batcher.batches,
+            "texts_per_batch": round(self.batcher.texts / self.batcher.batches, 2) if self.batcher.batches else 0,
+            "p50_ms": round(float(np.percentile(lat, 50)), 3) if len(lat) else None,
+            "p99_ms": round(float(np.percentile(lat, 99)), 3) if len(lat) else None,
+        }
+
+
+async def request(reader, writer, method, path, payload=None):
+    """One request over an open keep-alive connection; returns (status, decoded JSON). Used by tests and load tests."""
+    data = json.dumps(payload).encode("utf-8") if payload is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode("latin-1") + data)
+    await writer.drain()
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        h = await reader.readline()
+        if h in (b"\r\n", b""):
+            break
+        k, _, v = h.decode("latin-1").partition(":")
+        if k.strip().lower() == "content-length":
+            length = int(v)
+    return status, json.loads(await reader.readexactly(length))
+
+
+def serve(cfg, host=None, port=None, unix_socket=None, metrics=NULL):
+    """Load the model and serve until interrupted."""
+    from .scan import build_model
+
+    async def main():
+        daemon = await ScanDaemon(build_model(cfg, metrics), cfg, metrics).start(host, port, unix_socket)
+        print("Listening on", daemon.address, flush=True)
+        try:
+            await daemon.server.serve_forever()
+        finally:
+            await daemon.stop()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
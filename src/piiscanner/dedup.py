@@ -0,0 +1,145 @@
+# dedup.py (scan identical files once: extension and size, then a partial hash, then a full hash, only on collisions)
+import hashlib, logging, os
+from collections import deque
+
+from .guard import OK
+from .metrics import NULL, file_type
+from .utils import empty_findings
+
+log = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+READ = 1 << 20
+
+
+def _hash(path, limit=None):
+    """blake2b of the first `limit` bytes of `path` (all of it without a limit)."""
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        if limit is not None:
+            h.update(f.read(limit))
+        else:
+            for block in iter(lambda: f.read(READ), b""):
+                h.update(block)
+    return h.digest()
+
+
+class Dedup:
+    """
+    Exact-duplicate filter in front of a scan. Files are keyed on extension (lowercased) and size, since the
+    extension picks the extractor: the same bytes as .txt and as .csv are not read the same way. A file is only
+    hashed once another with the same key turns up: first its head (partial_kb), and the whole file only if the
+    heads match too.
+    A file with the same content as one already let through isn't scanned: it gets that file's findings,
+    with "duplicate_of" naming it in its outcome.
+
+    filter() is the path stream into the scan; resolve() is fed every scanned file's result and yields it
+    back along with the duplicates that were waiting on it; ready() yields duplicates whose original was done
+    before they were found. Both run on the thread that drives the scan.
+    """
+
+    def __init__(self, partial_kb=64, metrics=NULL):
+        self.partial = int(partial_kb * 1024)
+        self.metrics = metrics
+        self._by_size = {}    # (ext, size) -> first path with that key, until a second one makes it hashed
+        self._heads = {}      # (ext, size, head hash) -> paths let through with that head
+        self._full = {}       # path -> full hash, computed on demand
+        self._inflight = set()
+        self._waiting = {}    # original -> duplicates found while it was being scanned
+        self._results = {}    # original -> (findings, outcome), for those with findings or not scanned ok
+        self._ready = deque()
+        self.files = self.duplicates = 0
+        self.bytes = self.bytes_saved = self.bytes_hashed = 0
+
+    @classmethod
+    def from_cfg(cls, cfg, metrics=NULL):
+        """A Dedup for cfg dedup, or None unless it is enabled."""
+        dcfg = cfg.get("dedup") or {}
+        if not dcfg.get("enabled"):
+            return None
+        return cls(dcfg.get("partial_kb", 64), metrics)
+
+    def filter(self, paths):
+        """Yield the paths whose content hasn't been seen yet."""
+        for p in paths:
+            try:
+                original = self._original(p)
+            except OSError:
+                original = None  # the scan reports it
+            if original is None:
+                self._inflight.add(p)
+                yield p
+            elif original in self._inflight:
+                self._waiting.setdefault(original, []).append(p)
+            else:
+                self._ready.append((p, original))
+
+    def _original(self, p):
+        size = os.path.getsize(p)
+        self.files += 1
+        self.bytes += size
+        if not size:
+            return None  # nothing to save
+        key = (os.path.splitext(p)[1].lower(), size)
+        first = self._by_size.get(key)
+        if first is None:
+            self._by_size[key] = p
+            return None
+        if first is not True:  # second file with this key: the first one is hashed now
+            self._by_size[key] = True
+            self._heads.setdefault((*key, self._head(first, size)), []).append(first)
+        same_head = self._heads.setdefault((*key, self._head(p, size)), [])
+        for other in same_head:
+            if size <= self.partial or self._full_hash(p) == self._full_hash(other):
+                self._saved(p, size)
+                return other
+        same_head.append(p)
+        return None
+
+    def _head(self, p, size):
+        self.bytes_hashed += min(size, self.partial)
+        return _hash(p, self.partial)
+
+    def _full_hash(self, p):
+        h = self._full.get(p)
+        if h is None:
+            h = self._full[p] = _hash(p)
+            self.bytes_hashed += os.path.getsize(p)
+        return h
+
+    def _saved(self, p, size):
+        self.duplicates += 1
+        self.bytes_saved += size
+        self.metrics.inc("dedup_files", 1, file_type(p))
+        self.metrics.inc("dedup_bytes", size, file_type(p))
+
+    def resolve(self, p, merged, outcome):
+        """Yield (p, merged, outcome), then each duplicate of p found so far with the same result."""
+        self._inflight.discard(p)
+        if len(merged) or outcome is not OK:
+            self._results[p] = (merged, outcome)
+        yield p, merged, outcome
+        for dup in self._waiting.pop(p, ()):
+            yield self._attributed(dup, p)
+
+    def ready(self):
+        """Yield duplicates of files that were already scanned."""
+        while self._ready:
+            yield self._attributed(*self._ready.popleft())
+
+    def leftovers(self):
+        """Duplicates still waiting once the scan is over: their original never came back from it."""
+        for original, dups in self._waiting.items():
+            for dup in dups:
+                yield dup, original
+        self._waiting.clear()
+
+    def _attributed(self, dup, original):
+        merged, outcome = self._results.get(original, (empty_findings(), OK))
+        if outcome is OK and not len(merged):
+            return dup, merged, OK
+        return dup, merged.copy(), {**outcome, "duplicate_of": original}
+
+    def stats(self):
+        return {"files": self.files, "duplicates": self.duplicates, "mb": round(self.bytes / MB, 2),
+                "mb_saved": round(self.bytes_saved / MB, 2), "mb_hashed": round(self.bytes_hashed / MB, 2)}
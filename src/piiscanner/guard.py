@@ -0,0 +1,372 @@
+# guard.py (per-file limits, and a watchdog over extraction processes so one bad document can't stall a scan)
+import io, logging, multiprocessing as mp, os, queue, sys, threading, time
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; without it there is no memory cap on extraction
+    psutil = None
+
+from PyPDF2 import PdfReader
+
+from .metrics import NULL, file_type
+from .utils import iter_text_chunks, read_any, read_bytes
+
+log = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+POLL = 0.05
+
+# A file's outcome, as written next to its findings. OK is shared, never modify it.
+OK = {"outcome": "ok"}
+TIMEOUT, TOO_LARGE, ERROR = "timeout", "too_large", "error"
+
+
+class TooLarge(Exception):
+    """The file is over one of the cfg limits (bytes, pages, extracted text or memory)."""
+
+class FileTimeout(Exception):
+    """The file took longer than limits.file_seconds."""
+
+class ExtractError(Exception):
+    """Extraction failed in a worker process; the message is the worker's error."""
+
+
+class Limits:
+    """cfg limits. 0 or a missing key means no cap."""
+
+    def __init__(self, file_seconds=0, max_file_mb=0, max_pages=0, max_text_mb=0, memory_mb=0, isolate=False):
+        self.file_seconds = file_seconds
+        self.max_file_mb = max_file_mb
+        self.max_pages = max_pages
+        self.max_text_mb = max_text_mb
+        self.memory_mb = memory_mb
+        self.isolate = isolate
+
+    @classmethod
+    def from_cfg(cls, cfg):
+        """Limits for cfg limits, or None without that block (no caps, no outcomes but ok/error)."""
+        lcfg = cfg.get("limits")
+        if not lcfg:
+            return None
+        return cls(**{k: lcfg[k] for k in ("file_seconds", "max_file_mb", "max_pages", "max_text_mb",
+                                               "memory_mb", "isolate") if k in lcfg})
+
+    def as_dict(self):
+        return dict(vars(self))
+
+    def check_bytes(self, size):
+        if self.max_file_mb and size > self.max_file_mb * MB:
+            raise TooLarge(f"{size} bytes on disk, over max_file_mb {self.max_file_mb}")
+
+    def check_pages(self, pages):
+        if self.max_pages and pages > self.max_pages:
+            raise TooLarge(f"{pages} pages, over max_pages {self.max_pages}")
+
+    def check_text(self, chars):
+        if self.max_text_mb and chars > self.max_text_mb * MB:
+            raise TooLarge(f"over max_text_mb {self.max_text_mb} of extracted text")
+
+    def deadline(self):
+        """time.monotonic() by which a file started now must be done, or None."""
+        return time.monotonic() + self.file_seconds if self.file_seconds else None
+
+
+def extract(path, data=None, limits=None):
+    """
+    read_any / read_bytes under `limits`: the size on disk is checked before anything is parsed,
+    PDFs before their pages are extracted, and the text as it grows. Raises TooLarge or the reader's error.
+    """
+    if limits is None:
+        return read_any(path) if data is None else read_bytes(path, data)
+    size = len(data) if data is not None else os.path.getsize(path)
+    limits.check_bytes(size)
+    if size and os.path.splitext(path)[1].lower() == ".pdf":
+        pages = PdfReader(io.BytesIO(data) if data is not None else path).pages
+        limits.check_pages(len(pages))
+        parts, chars = [], 0
+        for page in pages:
+            parts.append(page.extract_text() or "")
+            chars += len(parts[-1]) + 1
+            limits.check_text(chars)
+        return "\n".join(parts)
+    text = (read_any(path) if data is None else read_bytes(path, data)) or ""
+    limits.check_text(len(text))
+    return text
+
+
+def extract_chunks(path, chunk_chars, limits=None):
+    """
+    iter_text_chunks under `limits`: the size on disk and a PDF's page count are checked before
+    anything is extracted, and the text as the pieces come. Raises TooLarge or the reader's error.
+    """
+    if limits is not None:
+        limits.check_bytes(os.path.getsize(path))
+        if os.path.splitext(path)[1].lower() == ".pdf":
+            limits.check_pages(len(PdfReader(path).pages))
+    for offset, text in iter_text_chunks(path, chunk_chars):
+        if limits is not None:
+            limits.check_text(offset + len(text))
+        yield offset, text
+
+
+def failure(path, exc, metrics=NULL):
+    """Log a file that couldn't be scanned and return its outcome record."""
+    if isinstance(exc, FileTimeout):
+        outcome = TIMEOUT
+    elif isinstance(exc, (TooLarge, MemoryError)):
+        outcome = TOO_LARGE
+    else:
+        outcome = ERROR
+    if outcome == ERROR and not isinstance(exc, ExtractError):
+        log.error("Failed to scan %s", path, exc_info=exc)
+    else:
+        log.warning("Skipped %s (%s): %s", path, outcome, exc)
+    metrics.inc(f"files_{outcome}", 1, file_type(path))
+    return {"outcome": outcome, "detail": str(exc) or type(exc).__name__}
+
+
+# --- extraction ---
+class Inline:
+    """Extraction in the calling thread. The size caps apply, but nothing can stop a parser that hangs."""
+
+    def __init__(self, limits=None):
+        self.limits = limits
+
+    def extract(self, path, data=None):
+        return extract(path, data, self.limits)
+
+    def chunks(self, path, chunk_chars):
+        return extract_chunks(path, chunk_chars, self.limits)
+
+    def close(self):
+        pass
+
+
+def _run(fn, *args):
+    """fn(*args) as a reply to the parent: ("ok", result) or (outcome, message)."""
+    try:
+        return "ok", fn(*args)
+    except TooLarge as e:
+        return TOO_LARGE, str(e)
+    except MemoryError:
+        return TOO_LARGE, "out of memory while extracting"
+    except Exception as e:
+        return ERROR, f"{type(e).__name__}: {e}"
+
+
+def _serve(conn, limits):
+    """Worker process: extract one file per request until the pipe closes."""
+    limits = Limits(**limits)
+    try:
+        conn.send(("ready", None))
+    except OSError:  # closed before it was ever used
+        return
+    while True:
+        try:
+            path, data, chunk_chars = conn.recv()
+            if chunk_chars:
+                _serve_chunks(conn, path, chunk_chars, limits)
+            else:
+                conn.send(_run(extract, path, data, limits))
+        except (EOFError, OSError):
+            return
+
+
+def _serve_chunks(conn, path, chunk_chars, limits):
+    """Send the file's pieces one at a time, each extracted only once the parent asks for it."""
+    pieces = extract_chunks(path, chunk_chars, limits)
+    while True:
+        kind, piece = _run(next, pieces, None)
+        if kind != "ok" or piece is None:  # ("ok", None) once the file is done
+            conn.send((kind, piece))
+            return
+        conn.send(("chunk", piece))
+        if conn.recv() != "next":  # the parent has what it needed
+            pieces.close()
+            return
+
+
+class _Worker:
+    def __init__(self, proc, conn):
+        self.proc = proc
+        self.conn = conn
+        self.ready = False
+
+
+class Watchdog:
+    """
+    Extraction in `processes` worker processes, each file under limits.file_seconds and limits.memory_mb.
+    A worker that runs past either is killed and replaced, so a malformed PDF costs at most that much and
+    the scan moves on. extract() and chunks() may be called from several threads at once; each call holds one worker.
+    """
+
+    STARTUP_SECONDS = 120
+
+    def __init__(self, limits, processes=1, metrics=NULL):
+        self.limits = limits
+        self.metrics = metrics
+        self.restarts = 0
+        self._ctx = mp.get_context("spawn")  # no fork of a process that has ONNX Runtime threads running
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = []
+        for _ in range(max(1, processes)):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        conn, child = self._ctx.Pipe()
+        proc = self._ctx.Process(target=_serve, args=(child, self.limits.as_dict()), name="pii-extract", daemon=True)
+        proc.start()
+        child.close()
+        worker = _Worker(proc, conn)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _kill(self, worker):
+        with self._lock:
+            self._workers.remove(worker)
+            self.restarts += 1
+        worker.conn.close()
+        if worker.proc.is_alive():
+            worker.proc.kill()
+        worker.proc.join(5)
+
+    def extract(self, path, data=None):
+        """Text of `path` (from `data` if its bytes were already fetched). Raises TooLarge, FileTimeout or ExtractError."""
+        worker = self._idle.get()
+        healthy = False
+        try:
+            kind, value = self._ask(worker, (path, data, None), self.limits.file_seconds or None)
+            healthy = True
+        finally:
+            self._release(worker, healthy)
+        if kind == "ok":
+            return value
+        raise (TooLarge if kind == TOO_LARGE else ExtractError)(value)
+
+    def chunks(self, path, chunk_chars):
+        """
+        (offset, text) pieces of `path`, as iter_text_chunks yields them. Each piece is extracted in the worker
+        only when the next one is asked for, so closing the generator early leaves the rest of the file unread.
+        limits.file_seconds applies to the time spent extracting, not to what the caller does between pieces.
+        Raises TooLarge, FileTimeout or ExtractError.
+        """
+        worker = self._idle.get()
+        healthy = False
+        left = self.limits.file_seconds or None
+        try:
+            self._ready(worker)
+            t0 = time.monotonic()
+            kind, value = self._ask(worker, (path, None, chunk_chars), left)
+            while kind == "chunk":
+                if left is not None:
+                    left -= time.monotonic() - t0
+                try:
+                    yield value
+                except GeneratorExit:
+                    try:
+                        worker.conn.send("stop")
+                        healthy = True
+                    except (OSError, ValueError):
+                        pass
+                    raise
+                t0 = time.monotonic()
+                self._send(worker, "next")
+                kind, value = self._wait(worker, left)
+            healthy = True
+        finally:
+            self._release(worker, healthy)
+        if kind != "ok":
+            raise (TooLarge if kind == TOO_LARGE else ExtractError)(value)
+
+    def _release(self, worker, healthy):
+        if not healthy:
+            self._kill(worker)
+            self.metrics.inc("extract_restarts")
+            worker = self._spawn()
+        self._idle.put(worker)
+
+    def _ready(self, worker):
+        if not worker.ready:
+            # startup (imports) doesn't count against the file
+            if not worker.conn.poll(self.STARTUP_SECONDS):
+                raise ExtractError("extraction process didn't start")
+            self._recv(worker)
+            worker.ready = True
+
+    def _ask(self, worker, request, seconds):
+        self._ready(worker)
+        self._send(worker, request)
+        return self._wait(worker, seconds)
+
+    def _send(self, worker, msg):
+        try:
+            worker.conn.send(msg)
+        except (OSError, ValueError) as e:
+            raise ExtractError(f"extraction process unavailable: {e}")
+
+    def _wait(self, worker, seconds):
+        """The worker's reply; raises (and the worker is killed) after `seconds` (None: no limit) or over limits.memory_mb."""
+        deadline = time.monotonic() + seconds if seconds is not None else None
+        cap = self.limits.memory_mb * MB if self.limits.memory_mb and psutil is not None else 0
+        while not worker.conn.poll(POLL):
+            if not worker.proc.is_alive():
+                break
+            if deadline is not None and time.monotonic() > deadline:
+                raise FileTimeout(f"extraction over file_seconds {self.limits.file_seconds}")
+            if cap and _rss(worker.proc.pid) > cap:
+                raise TooLarge(f"extraction over memory_mb {self.limits.memory_mb}")
+        return self._recv(worker)
+
+    def _recv(self, worker):
+        try:
+            return worker.conn.recv()
+        except (EOFError, OSError):
+            raise ExtractError(f"extraction process died (exit code {worker.proc.exitcode})")
+
+    def close(self):
+        with self._lock:
+            workers = list(self._workers)
+            self._workers.clear()
+        for w in workers:
+            w.conn.close()  # the worker sees EOF and exits
+        for w in workers:
+            w.proc.join(5)
+            if w.proc.is_alive():
+                w.proc.kill()
+
+
+def _rss(pid):
+    try:
+        return psutil.Process(pid).memory_info().rss
+    except psutil.Error:
+        return 0
+
+
+def use_interpreter():
+    """
+    Point spawned extraction processes at a Python interpreter; call it first thing in an entry point.
+    In the packaged app sys.executable is the app's launcher, which would start another copy of the app
+    instead of a worker, so the embedded interpreter next to it is used. False if there is none,
+    and limits.isolate can't work in this process.
+    """
+    mp.freeze_support()
+    exe = sys.executable or ""
+    if os.path.basename(exe).lower().startswith("python"):
+        return True
+    here = os.path.dirname(exe)
+    for name in ("pythonw.exe", "python.exe", "python3", "python"):
+        if os.path.isfile(os.path.join(here, name)):
+            mp.set_executable(os.path.join(here, name))
+            return True
+    log.warning("No Python interpreter next to %s; extraction processes (limits.isolate) can't start", exe)
+    return False
+
+
+def extractor(cfg, processes=1, metrics=NULL):
+    """What extracts text for a scan: a Watchdog with cfg limits.isolate, else Inline (capped if cfg limits is set)."""
+    limits = Limits.from_cfg(cfg)
+    if limits is not None and limits.isolate:
+        return Watchdog(limits, processes, metrics)
+    return Inline(limits)
@@ -1,42 +1,207 @@
 # infer.py (ONNX, robust local loading)
 from transformers import AutoTokenizer
+from tokenizers import Tokenizer
 import onnxruntime as ort
-import numpy as np, json, os, sys
+import numpy as np, json, logging, os, sys
 from pathlib import Path
+from .tune import load_profile
+from .utils import FINDING_DTYPE, _base_label, empty_findings, label_id
+
+log = logging.getLogger(__name__)
 
 def _resource_path(rel_path: str | os.PathLike) -> Path:
     # Works in both source and PyInstaller EXE
     base = Path(getattr(sys, "_MEIPASS", Path(__file__).parent))
     return (base / rel_path).resolve()
- 
+
+def tuned(profile, key, value, default):
+    """`value` if it was set, else the tune profile's, else `default`."""
+    from_profile = (profile or {}).get(key)
+    if value is None:
+        return default if from_profile is None else from_profile
+    if from_profile is not None and from_profile != value:
+        log.info("%s=%s as configured, not %s from the tune profile", key, value, from_profile)
+    return value
+
 class PiiModel:
-    def __init__(self, model_dir="model", thresholds=None, batch_size=8):
+    def __init__(self, model_dir="model", thresholds=None, batch_size=None, max_length=None, stride=64, governor=None,
+                 intra_op_threads=None, tokenizer_threads=0, use_profile=True, throttle=None):
         # If model_dir is absolute, use it as-is; else resolve relative to app/EXE
         mdir = Path(model_dir)
         self.model_dir = mdir if mdir.is_absolute() else _resource_path(mdir)
+        # A profile written by `piiscanner.scan tune` on this machine fills in what the caller left as None;
+        # values given explicitly (set in cfg) win over it
+        self.profile = load_profile(self.model_dir) if use_profile else None
+        batch_size = tuned(self.profile, "batch_size", batch_size, 8)
+        max_length = tuned(self.profile, "max_length", max_length, 512)
+        intra_op_threads = tuned(self.profile, "intra_op_threads", intra_op_threads, 0)
+        # Optional Throttle (see throttle.py) keeping thread counts and CPU time within a share of the host
+        self.throttle = throttle
+        if throttle is not None:
+            intra_op_threads = throttle.cap_threads(intra_op_threads)
+            tokenizer_threads = throttle.cap_threads(tokenizer_threads)
+        # The Rust tokenizer's thread pool is sized once per process, from the environment, on first use
+        if tokenizer_threads and "RAYON_NUM_THREADS" not in os.environ:
+            os.environ["RAYON_NUM_THREADS"] = str(int(tokenizer_threads))
+            os.environ["TOKENIZERS_PARALLELISM"] = "false" if int(tokenizer_threads) == 1 else "true"
         # Force local files only (no internet)
         self.tok = AutoTokenizer.from_pretrained(str(self.model_dir), use_fast=True, local_files_only=True)
+        # Our own copy of the Rust tokenizer for encode_batch, so its truncation settings don't leak into self.tok
+        self._fast = Tokenizer.from_str(self.tok.backend_tokenizer.to_str())
+        self._fast.no_padding()
+        self._fast_window = None
         model_path = self.model_dir / "model.onnx"
-        self.session = ort.InferenceSession(str(model_path), providers=["CPUExecutionProvider"])
+        opts = ort.SessionOptions()
+        opts.intra_op_num_threads = int(intra_op_threads)  # 0 = let ORT pick (one per core)
+        self.intra_op_threads = opts.intra_op_num_threads
+        self.session = ort.InferenceSession(str(model_path), opts, providers=["CPUExecutionProvider"])
         with open(self.model_dir / "id2label.json", "r", encoding="utf-8") as f:
             self.id2label = {int(k): v for k, v in json.load(f).items()}
         self.thresholds = thresholds or {}
+        # per model label id: base label id for the findings arrays (-1 for O) and its threshold
+        n_labels = max(self.id2label) + 1
+        self._base_ids = np.full(n_labels, -1, dtype=np.int16)
+        self._thresholds_by_id = np.full(n_labels, 0.5, dtype=np.float32)
+        self._o_id = 0
+        for i, lab in self.id2label.items():
+            if lab != "O":
+                self._base_ids[i] = label_id(_base_label(lab))
+            else:
+                self._o_id = i
+            # config.yaml keys thresholds by entity (SSN); a B-/I- key, if given, wins for that tag
+            self._thresholds_by_id[i] = self.thresholds.get(lab, self.thresholds.get(_base_label(lab), 0.5))
+        # base labels (no B-/I-) this model can predict
+        self.labels = sorted({_base_label(lab) for lab in self.id2label.values() if lab != "O"})
         self.batch_size = batch_size
+        # The model only has max_position_embeddings positions; longer texts are split into overlapping windows
+        self.max_length = max_length
+        self.stride = min(stride, max_length // 4)
+        # Optional MemoryGovernor that picks the batch size per call (see memory.py)
+        self.governor = governor
+        self.batches_run = 0
+
+    def encode(self, text: str):
+        return self.encode_batch([text])
+
+    def encode_batch(self, texts):
+        """
+        Tokenize many texts with one encode_batch call (parallel in the Rust tokenizer) and split each
+        into overlapping max_length windows. Returns the windows of all texts, flattened, as
+        input_ids / attention_mask lists, offset_mapping as (n, 2) int64 arrays, and
+        overflow_to_sample_mapping giving the index of the text each window came from.
+        """
+        if self._fast_window != (self.max_length, self.stride):
+            self._fast.enable_truncation(self.max_length, stride=self.stride)
+            self._fast_window = (self.max_length, self.stride)
+        ids, masks, offsets, doc = [], [], [], []
+        for i, e in enumerate(self._fast.encode_batch(list(texts))):
+            for w in (e, *e.overflowing):
+                ids.append(w.ids)
+                masks.append(w.attention_mask)
+                offsets.append(np.asarray(w.offsets, dtype=np.int64).reshape(-1, 2))
+                doc.append(i)
+        return {"input_ids": ids, "attention_mask": masks, "offset_mapping": offsets,
+                "overflow_to_sample_mapping": doc}
+
+    def run(self, enc):
+        """Run every window of `enc` through the model in batches. Returns one logits array per window."""
+        ids = enc["input_ids"]
+        masks = enc["attention_mask"]
+        out = []
+        i = 0
+        while i < len(ids):
+            seq_len = max(len(x) for x in ids[i:i + self.batch_size])
+            bs = self.governor.batch_size(seq_len) if self.governor else self.batch_size
+            chunk_ids, chunk_masks = ids[i:i + bs], masks[i:i + bs]
+            seq_len = max(len(x) for x in chunk_ids)
+            input_ids = np.zeros((len(chunk_ids), seq_len), dtype=np.int64)
+            attention_mask = np.zeros((len(chunk_ids), seq_len), dtype=np.int64)
+            for j, (x, m) in enumerate(zip(chunk_ids, chunk_masks)):
+                input_ids[j, :len(x)] = x
+                attention_mask[j, :len(m)] = m
+            run_options = self.governor.run_options() if self.governor else None
+            if self.throttle:
+                self.throttle.before_run()
+            (logits,) = self.session.run(None, {"input_ids": input_ids, "attention_mask": attention_mask}, run_options)
+            if self.throttle:
+                self.throttle.pace()
+            self.batches_run += 1
+            for j, x in enumerate(chunk_ids):
+                out.append(logits[j, :len(x)])
+            if self.governor:
+                self.governor.after_batch()
+            i += len(chunk_ids)
+        return out
+
+    def decode(self, enc, logits):
+        """Logits -> FINDING_DTYPE array of the tokens whose label clears its threshold."""
+        parts = [p for p in self._decode_windows(enc, logits) if len(p)]
+        return np.concatenate(parts) if parts else empty_findings()
+
+    def decode_batch(self, enc, logits, n_texts):
+        """Like decode, but one findings array per text of an encode_batch call."""
+        per_text = [[] for _ in range(n_texts)]
+        for i, part in zip(enc["overflow_to_sample_mapping"], self._decode_windows(enc, logits)):
+            if len(part):
+                per_text[i].append(part)
+        return [np.concatenate(p) if p else empty_findings() for p in per_text]
+
+    def token_labels(self, logits):
+        """
+        Per window, the model label id of every token as decode sees it: the argmax label where it clears
+        its threshold, O otherwise. For token-level evaluation of the runtime path.
+        """
+        out = []
+        for win_logits in logits:
+            lab_ids, _, hit = self._classify(win_logits)
+            out.append(np.where(hit, lab_ids, self._o_id))
+        return out
+
+    def _classify(self, win_logits):
+        """Argmax label id and its probability per token, and whether that is a non-O label over its threshold."""
+        e = np.exp(win_logits - win_logits.max(-1, keepdims=True))
+        probs = e / e.sum(-1, keepdims=True)
+        lab_ids = probs.argmax(-1)
+        scores = np.take_along_axis(probs, lab_ids[:, None], -1)[:, 0]
+        hit = (self._base_ids[lab_ids] >= 0) & (scores >= self._thresholds_by_id[lab_ids])
+        return lab_ids, scores, hit
+
+    def _decode_windows(self, enc, logits):
+        for offsets, win_logits in zip(enc["offset_mapping"], logits):
+            lab_ids, scores, hit = self._classify(win_logits)
+            offs = np.asarray(offsets, dtype=np.int64).reshape(-1, 2)
+            keep = (offs[:, 1] > offs[:, 0]) & hit
+            part = np.empty(int(keep.sum()), dtype=FINDING_DTYPE)
+            part["start"] = offs[keep, 0]
+            part["end"] = offs[keep, 1]
+            part["label_id"] = self._base_ids[lab_ids[keep]]
+            part["score"] = np.round(scores[keep], 4)
+            yield part
 
     def predict(self, text: str):
-        enc = self.tok(text, return_offsets_mapping=True, truncation=True, max_length=4096)
-        inputs = {
-            "input_ids": np.array([enc["input_ids"]], dtype=np.int64),
-            "attention_mask": np.array([enc["attention_mask"]], dtype=np.int64),
-        }
-        (logits,) = self.session.run(None, inputs)
-        probs = (np.exp(logits) / np.exp(logits).sum(-1, keepdims=True))[0]
-        findings = []
-        for i, (start, end) in enumerate(enc["offset_mapping"]):
-            if end <= start:
-                continue
-            lab_id = int(np.argmax(probs[i])); score = float(probs[i, lab_id])
-            lab = self.id2label.get(lab_id, "O")
-            if lab != "O" and score >= self.thresholds.get(lab, 0.5):
-                findings.append({"start": int(start), "end": int(end), "label": lab, "score": round(score, 4)})
-        return findings
+        enc = self.encode(text)
+        return self.decode(enc, self.run(enc))
+
+    def first_hit(self, text, label_ids=None):
+        """
+        The first finding in `text` (of one of `label_ids`, if given) as a 1-element array, or None.
+        Windows go through the model one batch at a time and the rest are skipped after a hit.
+        Returns (hit, windows run).
+        """
+        enc = self.encode(text)
+        n = len(enc["input_ids"])
+        i = 0
+        while i < n:
+            part = {k: v[i:i + self.batch_size] for k, v in enc.items()}
+            found = self.decode(part, self.run(part))
+            i += len(part["input_ids"])
+            if label_ids is not None:
+                found = found[np.isin(found["label_id"], label_ids)]
+            if len(found):
+                return found[np.argsort(found["start"], kind="stable")[:1]], i
+        return None, i
+
+    def predict_batch(self, texts):
+        """Findings for several texts; their windows share tokenizer calls and model batches."""
+        enc = self.encode_batch(texts)
+        return self.decode_batch(enc, self.run(enc), len(texts))
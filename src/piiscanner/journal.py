@@ -0,0 +1,92 @@
+# journal.py (checkpoints for long scans, so a crashed or rebooted scan can be resumed)
+import json, logging, os, time
+from pathlib import Path
+
+from .metrics import NULL
+
+log = logging.getLogger(__name__)
+
+
+class ScanJournal:
+    """
+    Append-only record of which files a scan has finished, next to its findings file (<scan-id>.journal).
+
+    Every `interval` seconds the findings file is flushed and fsync'ed, then one line is appended:
+        {"offset": <size of the findings file>, "done": [paths finished since the last line]}
+    and fsync'ed too. A line only ever names files whose findings are already on disk below its offset,
+    so on resume the findings file is cut back to the last offset (dropping records of files that
+    weren't checkpointed yet) and exactly the files not in the journal are scanned again.
+    A torn last line from a crash mid-write is ignored. The journal is deleted once the scan finishes.
+    """
+
+    def __init__(self, path, interval=10.0, max_pending=1000, metrics=NULL):
+        self.path = Path(path)
+        self.interval = interval
+        self.max_pending = max_pending
+        self.metrics = metrics
+        self.completed = set()
+        self.pending = []
+        self.out = None
+        self._f = None
+        self._last = time.monotonic()
+
+    @classmethod
+    def start(cls, path, meta=None, **kw):
+        j = cls(path, **kw)
+        j._f = open(j.path, "w", encoding="utf-8")
+        j._append({"started": time.time(), **(meta or {})})
+        return j
+
+    @classmethod
+    def resume(cls, path, out_path, **kw):
+        """Load the journal and cut `out_path` back to its last checkpoint."""
+        j = cls(path, **kw)
+        offset = 0
+        with open(j.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break  # torn write, everything after it is lost anyway
+                if "offset" in rec:
+                    offset = rec["offset"]
+                    j.completed.update(rec["done"])
+        if os.path.exists(out_path) and os.path.getsize(out_path) > offset:
+            os.truncate(out_path, offset)
+        j._f = open(j.path, "a", encoding="utf-8")
+        log.info("Resuming: %d files already done, findings kept up to byte %d", len(j.completed), offset)
+        return j
+
+    def attach(self, out):
+        """The open findings file that checkpoints flush."""
+        self.out = out
+
+    def done(self, path):
+        """`path` is finished and its findings (if any) are written to the findings file."""
+        self.pending.append(path)
+        if len(self.pending) >= self.max_pending or time.monotonic() - self._last >= self.interval:
+            self.checkpoint()
+
+    def checkpoint(self):
+        self._last = time.monotonic()
+        if not self.pending:
+            return
+        with self.metrics.time("checkpoint_seconds"):
+            self.out.flush()
+            os.fsync(self.out.fileno())
+            offset = os.fstat(self.out.fileno()).st_size
+            self._append({"offset": offset, "done": self.pending})
+        self.completed.update(self.pending)
+        self.pending = []
+
+    def _append(self, rec):
+        self._f.write(json.dumps(rec) + "\n")
+        self._f.flush()
+        os.fsync(self._f.fileno())
+
+    def close(self, finished=False):
+        if self.out is not None and not self.out.closed:
+            self.checkpoint()
+        self._f.close()
+        if finished:
+            self.path.unlink(missing_ok=True)
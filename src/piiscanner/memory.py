@@ -0,0 +1,139 @@
+# memory.py (keep a scan under memory_budget_mb)
+import json, os, sys, threading
+from pathlib import Path
+
+try:
+    import psutil
+except ImportError:  # psutil is optional, /proc is good enough on Linux
+    psutil = None
+
+MB = 1024 * 1024
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or 0 if it can't be measured."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024  # peak, not current, but better than nothing
+    except ImportError:
+        return 0
+
+
+def load_dims(model_dir):
+    try:
+        with open(Path(model_dir) / "config.json", "r", encoding="utf-8") as f:
+            cfg = json.load(f)
+    except OSError:
+        cfg = {}
+    return cfg.get("dim", 768), cfg.get("hidden_dim", 3072), cfg.get("n_heads", 12)
+
+def activation_bytes(dims, seq_len):
+    """
+    Rough peak of the ORT arena for one sequence of `seq_len` tokens: the widest per-layer
+    tensors (FFN hidden + a few dim-wide copies) plus the attention scores and probabilities.
+    ORT reuses buffers between layers, so this is per layer, not times n_layers.
+    """
+    dim, hidden, heads = dims
+    return 4 * (seq_len * (hidden + 4 * dim) + 2 * heads * seq_len * seq_len)
+
+
+class MemoryGovernor:
+    """
+    Sizes batches, the extracted-text queue and extraction concurrency from memory_budget_mb.
+    - batch_size(): the largest batch whose estimated activations fit in the headroom left under the budget.
+    - after_batch(): measures RSS after each session.run and shrinks the batch cap when close to the limit,
+      grows it back slowly when there is room again.
+    - try_admit()/admit()/release(): back-pressure for text waiting to be inferred; nothing new is read until it fits.
+    - is_oversized(): files too big to hold in memory alongside the model go to the chunked low-memory path.
+    """
+
+    HIGH = 0.85   # fraction of the budget where we start shrinking
+    LOW = 0.60    # fraction of the budget under which we may grow again
+
+    def __init__(self, budget_mb, model_dir, max_batch=8, max_workers=4):
+        self.budget = int(budget_mb * MB)
+        self.dims = load_dims(model_dir)
+        self.max_batch = max_batch
+        self.cap = max_batch
+        self.baseline = current_rss()  # model + runtime already loaded
+        self.max_workers = max_workers
+        # Whatever is left after the model is loaded is split between activations and queued text
+        free = max(self.budget - self.baseline, 32 * MB)
+        self.queue_budget = free // 4
+        self.in_flight = 0
+        self.pressure = False
+        self.peak_rss = self.baseline
+        self._lock = threading.Lock()
+
+    # --- batching ---
+    def headroom(self):
+        return self.budget - current_rss()
+
+    def batch_size(self, seq_len):
+        per_seq = activation_bytes(self.dims, seq_len)
+        fit = int(max(self.headroom() - self.in_flight, 0) // max(per_seq, 1))
+        return max(1, min(self.cap, fit))
+
+    def after_batch(self):
+        rss = current_rss()
+        self.peak_rss = max(self.peak_rss, rss)
+        if rss > self.HIGH * self.budget:
+            self.cap = max(1, self.cap // 2)
+            self.pressure = True
+        elif rss < self.LOW * self.budget:
+            self.cap = min(self.max_batch, self.cap + 1)
+            self.pressure = False
+
+    def run_options(self):
+        """Under pressure, ask ORT to give arena memory back after each run."""
+        if not self.pressure:
+            return None
+        import onnxruntime as ort
+        ro = ort.RunOptions()
+        ro.add_run_config_entry("memory.enable_memory_arena_shrinkage", "cpu:0")
+        return ro
+
+    # --- extraction ---
+    READER_MB = 16  # what one reader is expected to hold for a typical document
+
+    def extraction_workers(self):
+        by_memory = self.queue_budget // (self.READER_MB * MB)
+        return int(max(1, min(self.max_workers, by_memory, os.cpu_count() or 1)))
+
+    def is_oversized(self, nbytes):
+        # extracted text is held as str (up to 4 bytes/char) plus tokens and offsets, so leave a margin
+        return nbytes * 8 > self.queue_budget
+
+    def try_admit(self, nbytes):
+        """Reserve room for nbytes of queued text. Always succeeds when nothing is queued, so the scan can't stall."""
+        with self._lock:
+            if self.in_flight > 0 and (self.in_flight + nbytes > self.queue_budget or self.pressure):
+                return False
+            self.in_flight += nbytes
+            return True
+
+    def admit(self, nbytes):
+        """Reserve room for nbytes unconditionally: for a reader with nothing left of its own to wait on."""
+        with self._lock:
+            self.in_flight += nbytes
+
+    def release(self, nbytes):
+        with self._lock:
+            self.in_flight = max(0, self.in_flight - nbytes)
+
+    def stats(self):
+        return {
+            "budget_mb": self.budget / MB,
+            "baseline_rss_mb": self.baseline / MB,
+            "peak_rss_mb": self.peak_rss / MB,
+            "batch_cap": self.cap,
+            "queue_budget_mb": self.queue_budget / MB,
+        }
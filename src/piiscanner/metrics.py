@@ -0,0 +1,196 @@
+# metrics.py (per-stage counters and timing histograms for the scan path)
+import json, os, threading, time
+from contextlib import contextmanager
+from pathlib import Path
+
+PREFIX = "piiscanner"
+
+# Upper bounds in seconds, shared by every timing histogram
+BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+HELP = {
+    "files_walked": "Files found while walking the scan targets",
+    "files_read": "Files whose text was extracted",
+    "bytes_read": "Bytes on disk of the files that were read",
+    "bytes_fetched": "Bytes prefetched from disk ahead of extraction",
+    "bytes_extracted": "UTF-8 bytes of extracted text",
+    "tokens": "Tokens fed to the model",
+    "windows": "Model input windows",
+    "batches": "session.run calls",
+    "findings": "Merged findings",
+    "files_timeout": "Files skipped for running over limits.file_seconds",
+    "files_too_large": "Files skipped for being over a size, page, text or memory limit",
+    "files_error": "Files that failed to read or scan",
+    "extract_restarts": "Extraction worker processes killed and replaced by the watchdog",
+    "files_redacted": "Redacted copies written",
+    "bytes_redacted": "Bytes of redacted copies written",
+    "redact_errors": "Files whose redacted copy couldn't be written",
+    "dedup_files": "Files not scanned for being identical to one already scanned",
+    "dedup_bytes": "Bytes on disk of the files dedup skipped",
+    "verdict_early_exits": "Files abandoned at their first finding in --verdict mode",
+    "fetch_seconds": "Time spent fetching raw file bytes (prefetch)",
+    "read_seconds": "Time spent extracting text",
+    "tokenize_seconds": "Time spent in the tokenizer",
+    "session_run_seconds": "Time spent in ONNX Runtime session.run",
+    "postprocess_seconds": "Time spent turning logits into token findings",
+    "merge_seconds": "Time spent in merge_findings",
+    "write_seconds": "Time spent writing findings",
+    "redact_seconds": "Time spent writing redacted copies",
+    "checkpoint_seconds": "Time spent flushing findings and writing the scan journal",
+    "throttle_cpu_seconds": "Time slept to keep inference within throttle.cpu_share",
+    "throttle_read_seconds": "Time waited to keep reads within throttle.read_mb_per_sec",
+    "throttle_pause_seconds": "Time paused while the host was busy (throttle.pause_load)",
+    "queue_files_committed": "Files this worker committed to the work queue",
+    "daemon_batches": "Batches run by the scan daemon",
+    "daemon_batch_seconds": "Time the scan daemon spent inferring one batch",
+    "daemon_request_seconds": "Scan daemon request latency",
+    "watch_batches": "Batches of changed files scanned in watch mode",
+    "watch_files": "Changed files scanned in watch mode",
+}
+
+
+def file_type(path):
+    return os.path.splitext(path)[1].lower().lstrip(".") or "none"
+
+
+class Metrics:
+    """
+    Counters and histograms keyed by (name, file type).
+    Updates are a dict lookup and an add under a lock, cheap next to reading a file or running the model.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.hists = {}
+        self.started = time.time()
+
+    def inc(self, name, value=1, ftype=""):
+        key = (name, ftype)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, seconds, ftype=""):
+        key = (name, ftype)
+        with self._lock:
+            h = self.hists.get(key)
+            if h is None:
+                h = self.hists[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+            for i, le in enumerate(BUCKETS):
+                if seconds <= le:
+                    h["buckets"][i] += 1
+                    break
+            h["sum"] += seconds
+            h["count"] += 1
+
+    @contextmanager
+    def time(self, name, ftype=""):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, ftype)
+
+    # --- export ---
+    def snapshot(self):
+        with self._lock:
+            counters = dict(self.counters)
+            hists = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]} for k, v in self.hists.items()}
+        return counters, hists
+
+    def to_dict(self):
+        counters, hists = self.snapshot()
+        out = {"started": self.started, "ts": time.time(), "counters": {}, "histograms": {}}
+        for (name, ftype), v in sorted(counters.items()):
+            out["counters"].setdefault(name, {})[ftype or "all"] = v
+        for (name, ftype), h in sorted(hists.items()):
+            out["histograms"].setdefault(name, {})[ftype or "all"] = {
+                "count": h["count"], "sum": round(h["sum"], 6),
+                "buckets": dict(zip([str(b) for b in BUCKETS], h["buckets"])),
+            }
+        return out
+
+    def to_prometheus(self):
+        counters, hists = self.snapshot()
+        lines = []
+        done = set()
+        for (name, ftype), v in sorted(counters.items()):
+            metric = f"{PREFIX}_{name}_total"
+            if metric not in done:
+                done.add(metric)
+                lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels(ftype)} {v}")
+        for (name, ftype), h in sorted(hists.items()):
+            metric = f"{PREFIX}_{name}"
+            if metric not in done:
+                done.add(metric)
+                lines.append(f"# HELP {metric} {HELP.get(name, name)}")
+                lines.append(f"# TYPE {metric} histogram")
+            cum = 0
+            for le, n in zip(BUCKETS, h["buckets"]):
+                cum += n
+                lines.append(f"{metric}_bucket{_labels(ftype, le=le)} {cum}")
+            lines.append(f"{metric}_bucket{_labels(ftype, le='+Inf')} {h['count']}")
+            lines.append(f"{metric}_sum{_labels(ftype)} {h['sum']:.6f}")
+            lines.append(f"{metric}_count{_labels(ftype)} {h['count']}")
+        lines.append(f"{PREFIX}_scan_start_time_seconds {self.started:.3f}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, out_dir, name=PREFIX):
+        """Write <name>.json and <name>.prom. Files are replaced atomically so a scraper never sees half a file."""
+        out = Path(out_dir)
+        out.mkdir(parents=True, exist_ok=True)
+        _atomic_write(out / f"{name}.json", json.dumps(self.to_dict(), indent=2))
+        _atomic_write(out / f"{name}.prom", self.to_prometheus())
+
+
+class NullMetrics(Metrics):
+    """Drop-in for callers that don't collect metrics."""
+
+    def inc(self, name, value=1, ftype=""):
+        pass
+
+    def observe(self, name, seconds, ftype=""):
+        pass
+
+    @contextmanager
+    def time(self, name, ftype=""):
+        yield
+
+
+NULL = NullMetrics()
+
+
+class MetricsDumper(threading.Thread):
+    """Dumps a Metrics object every `interval` seconds until stopped, then once more on the way out."""
+
+    def __init__(self, metrics, out_dir, interval):
+        super().__init__(daemon=True)
+        self.metrics = metrics
+        self.out_dir = out_dir
+        self.interval = interval
+        self._stop_evt = threading.Event()
+
+    def run(self):
+        while not self._stop_evt.wait(self.interval):
+            self.metrics.dump(self.out_dir)
+
+    def stop(self):
+        self._stop_evt.set()
+        self.join()
+        self.metrics.dump(self.out_dir)
+
+
+def _labels(ftype, le=None):
+    parts = []
+    if ftype:
+        parts.append(f'filetype="{ftype}"')
+    if le is not None:
+        parts.append(f'le="{le}"')
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _atomic_write(path, text):
+    tmp = path.with_suffix(path.suffix + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
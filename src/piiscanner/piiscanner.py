@@ -111,9 +111,29 @@ class Ui_Form(object):
         font.setPointSize(18)
         self.label_3.setFont(font)
         self.label_3.setObjectName("label_3")
-        self.FileResults = QtWidgets.QTextBrowser(self.ResultsScreen)
-        self.FileResults.setGeometry(QtCore.QRect(100, 90, 441, 291))
+        self.ResultsLabelComboBox = QtWidgets.QComboBox(self.ResultsScreen)
+        self.ResultsLabelComboBox.setGeometry(QtCore.QRect(20, 80, 141, 22))
+        self.ResultsLabelComboBox.setObjectName("ResultsLabelComboBox")
+        self.ResultsFileFilterLineEdit = QtWidgets.QLineEdit(self.ResultsScreen)
+        self.ResultsFileFilterLineEdit.setGeometry(QtCore.QRect(170, 80, 301, 22))
+        self.ResultsFileFilterLineEdit.setObjectName("ResultsFileFilterLineEdit")
+        self.ResultsMinScoreSpinBox = QtWidgets.QDoubleSpinBox(self.ResultsScreen)
+        self.ResultsMinScoreSpinBox.setGeometry(QtCore.QRect(480, 80, 151, 22))
+        self.ResultsMinScoreSpinBox.setMaximum(1.0)
+        self.ResultsMinScoreSpinBox.setSingleStep(0.05)
+        self.ResultsMinScoreSpinBox.setObjectName("ResultsMinScoreSpinBox")
+        self.FileResults = QtWidgets.QTableView(self.ResultsScreen)
+        self.FileResults.setGeometry(QtCore.QRect(20, 110, 611, 225))
+        self.FileResults.setSortingEnabled(True)
         self.FileResults.setObjectName("FileResults")
+        self.ResultsSkippedLabel = QtWidgets.QLabel(self.ResultsScreen)
+        self.ResultsSkippedLabel.setGeometry(QtCore.QRect(20, 338, 611, 20))
+        self.ResultsSkippedLabel.setText("")
+        self.ResultsSkippedLabel.setObjectName("ResultsSkippedLabel")
+        self.ResultsProgressBar = QtWidgets.QProgressBar(self.ResultsScreen)
+        self.ResultsProgressBar.setGeometry(QtCore.QRect(20, 361, 611, 20))
+        self.ResultsProgressBar.setProperty("value", 0)
+        self.ResultsProgressBar.setObjectName("ResultsProgressBar")
         self.ResultsMainMenuButton = QtWidgets.QPushButton(self.ResultsScreen)
         self.ResultsMainMenuButton.setGeometry(QtCore.QRect(140, 390, 161, 41))
         font = QtGui.QFont()
@@ -148,5 +168,7 @@ class Ui_Form(object):
         self.FileMainMenuButton.setText(_translate("Form", "Back To Main Menu"))
         self.label_2.setText(_translate("Form", "Scanning..."))
         self.label_3.setText(_translate("Form", "Results"))
+        self.ResultsFileFilterLineEdit.setPlaceholderText(_translate("Form", "Filter by file...."))
+        self.ResultsMinScoreSpinBox.setPrefix(_translate("Form", "Min score: "))
         self.ResultsMainMenuButton.setText(_translate("Form", "Back To Main Menu"))
         self.FindingsFolderButton.setText(_translate("Form", "Open Findings Folder"))
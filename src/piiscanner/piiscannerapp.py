@@ -1,13 +1,19 @@
 from PySide6.QtWidgets import QMainWindow, QFileDialog, QWidget, QLabel, QPushButton
-from PySide6.QtCore import QSize, QObject
+from PySide6.QtCore import QSize, QObject, QThread, Signal
 from .piiscanner import Ui_Form
 import json, os, fnmatch, pathlib, time, yaml, os, webbrowser
-from .infer import PiiModel
-from .utils import read_any, merge_findings
+from .scan import build_model, build_paths, iter_scan, setup_logging
+from .metrics import Metrics, file_type
+from .schedule import schedule
+from .utils import exclude_globs, findings_to_dicts
+from .results import FindingsTableModel
 import logging
 import datetime as dt
 import re
-from os import startfile
+try:
+    from os import startfile
+except ImportError:  # Windows only
+    startfile = None
 from pathlib import Path
 
 
@@ -36,6 +42,75 @@ class PopUpForWarning(QWidget):
         self.WarningLabel.setText(text)
 
 
+class ScanWorker(QObject):
+    """Runs a scan off the GUI thread and hands findings back one file at a time."""
+    progress = Signal(int)
+    fileFindings = Signal(str, object)
+    fileSkipped = Signal(str, object)
+    done = Signal(str)
+    failed = Signal(object)
+
+    def __init__(self, cfg, outputDir, fileText, directoryText):
+        super().__init__()
+        # Extraction stays in this process (limits.isolate off) until the watchdog's worker processes have
+        # been checked in the packaged app, where sys.executable is the app itself (see guard.use_interpreter)
+        self.cfg = {**cfg, "limits": {**cfg["limits"], "isolate": False}} if cfg.get("limits") else cfg
+        self.outputDir = outputDir
+        self.fileText = fileText
+        self.directoryText = directoryText
+
+    def run(self):
+        metrics = Metrics()
+        try:
+            model = build_model(self.cfg, metrics)
+            self.progress.emit(25)
+
+            paths = build_paths(self.fileText, self.directoryText, exclude_globs(self.cfg), metrics)
+            self.progress.emit(50)
+            if not paths:
+                self.done.emit("")
+                return
+
+            # Findings are streamed into the record as they come in instead of being held until the end
+            outPath = self.outputDir + os.path.sep + (pathlib.Path(paths[-1]).name + ".json")
+            tmpPath = outPath + ".part"
+            count = 0
+            skipped = []  # outcome records of the files that couldn't be scanned, as in a headless scan
+            # Same path as a headless scan: extraction under cfg limits, and dedup / redact from cfg
+            scanned = iter_scan(self.cfg, model, schedule(self.cfg, paths), metrics)
+
+            with open(tmpPath, "w") as file:
+                file.write('{\n  "ts": %s,\n  "files": %s,\n  "findings": [' % (
+                    json.dumps(time.time()), json.dumps([pathlib.Path(p).name for p in paths])))
+                for i, (p, file_merged, outcome) in enumerate(scanned):
+                    fname = pathlib.Path(p).name
+                    if outcome["outcome"] != "ok":
+                        skipped.append({"file": fname, **outcome})
+                        self.fileSkipped.emit(fname, outcome)
+                        self.progress.emit(50 + (45 * (i + 1)) // len(paths))
+                        continue
+                    with metrics.time("write_seconds", file_type(p)):
+                        for f in findings_to_dicts(file_merged, file=fname):
+                            file.write((",\n    " if count else "\n    ") + json.dumps(f))
+                            count += 1
+                    if len(file_merged):
+                        self.fileFindings.emit(fname, file_merged)
+                    self.progress.emit(50 + (45 * (i + 1)) // len(paths))
+                file.write("\n  ],\n  \"skipped\": %s\n}\n" % json.dumps(skipped))
+
+            if count or skipped:
+                os.replace(tmpPath, outPath)
+                self.done.emit(outPath)
+            else:
+                os.remove(tmpPath)
+                self.done.emit("")
+        except Exception as E:
+            self.failed.emit(E)
+        finally:
+            if self.cfg.get("metrics", {}).get("path"):
+                metrics.dump(self.cfg["metrics"]["path"])
+
+
 class MainWindow(QMainWindow, Ui_Form, QObject):
     def __init__(self):
         super().__init__()
@@ -69,6 +144,10 @@ class MainWindow(QMainWindow, Ui_Form, QObject):
         
         self.ProgressBar.setMaximum(100)
 
+        self.ResultsProgressBar.setRange(0, 100)
+        self.ResultsProgressBar.setVisible(False)
+        self.ResultsSkippedLabel.setVisible(False)
+
         self.FileBrowseButton.clicked.connect(self.open_file_browser)
 
         self.DirectoriesBrowseButton.clicked.connect(self.open_directory_browser)
@@ -90,6 +169,18 @@ class MainWindow(QMainWindow, Ui_Form, QObject):
         
         self.FindingsFolderButton.clicked.connect(lambda: self.open_external_document(self.fileLocation))
 
+        self.scanThread = None
+        self.scanWorker = None
+
+        self.resultsModel = FindingsTableModel(self)
+        self.FileResults.setModel(self.resultsModel)
+        self.resultsLabels = set()
+        self.resultsSkipped = []
+        self.ResultsLabelComboBox.addItem("All labels")
+        self.ResultsLabelComboBox.currentTextChanged.connect(self.apply_results_filter)
+        self.ResultsFileFilterLineEdit.textChanged.connect(self.apply_results_filter)
+        self.ResultsMinScoreSpinBox.valueChanged.connect(self.apply_results_filter)
+
         
 
     
@@ -114,80 +205,67 @@ class MainWindow(QMainWindow, Ui_Form, QObject):
         self.stackedWidget.setCurrentIndex(index)
         self.FileLineEdit.setText("")
         self.DirectoryLineEdit.setText("")
-        self.FileResults.setText("")
+        self.clear_results()
+
+    def clear_results(self):
+        self.resultsModel.clear()
+        self.resultsLabels.clear()
+        self.resultsSkipped.clear()
+        self.ResultsSkippedLabel.setText("")
+        self.ResultsSkippedLabel.setToolTip("")
+        self.ResultsSkippedLabel.setVisible(False)
+        self.ResultsLabelComboBox.blockSignals(True)
+        self.ResultsLabelComboBox.clear()
+        self.ResultsLabelComboBox.addItem("All labels")
+        self.ResultsLabelComboBox.blockSignals(False)
+        self.ResultsFileFilterLineEdit.setText("")
+        self.ResultsMinScoreSpinBox.setValue(0.0)
+
+    def apply_results_filter(self, *_):
+        label = self.ResultsLabelComboBox.currentText()
+        self.resultsModel.set_filter(
+            label=None if label == "All labels" else label,
+            file_text=self.ResultsFileFilterLineEdit.text(),
+            min_score=self.ResultsMinScoreSpinBox.value(),
+        )
     
     def open_external_document(self, fileName):
-        startfile(fileName)
+        if startfile is not None:
+            startfile(fileName)
+        else:
+            webbrowser.open(Path(fileName).as_uri())
+
+    def log_exception(self, E):
+        setup_logging(self.cfg)
+        self.logger = logging.getLogger(__name__)
+    
+        self.logger.error("%s", E, exc_info=E)
 
     def scan(self):
         try:
+            if self.scanThread is not None:
+                return
             pattern = "^(.+[/\\\\])?([^/\\\\]+)$"
             if re.match(pattern, self.FileLineEdit.text()) or re.match(pattern, self.DirectoryLineEdit.text()):
                 
-                
+                self.clear_results()
+                self.ProgressBar.setValue(0)
+                self.ResultsProgressBar.setValue(0)
+                self.ResultsProgressBar.setVisible(True)
+                self.FindingsFolderButton.setEnabled(False)
                 self.stackedWidget.setCurrentIndex(3)
 
-                model = PiiModel(
-                    model_dir=self.cfg.get("model_dir", "model"),
-                    thresholds=self.cfg.get("thresholds", {}),
-                    batch_size=self.cfg.get("batch_size", 8),
-                )
-        
-                self.ProgressBar.setValue(25)
-
-                #Build File List 
-                paths = []
-                if len(self.FileLineEdit.text()) > 0:
-                    os.path.isfile(self.FileLineEdit.text())
-                    if os.path.isfile(self.FileLineEdit.text()):
-                        paths.append(self.FileLineEdit.text())
-                elif len(self.DirectoryLineEdit.text()) > 0:
-                    if os.path.isdir(self.DirectoryLineEdit.text()):
-                        for root, _, files in os.walk(self.DirectoryLineEdit.text()):
-                            if any(fnmatch.fnmatch(root, ex) for ex in self.cfg.get("exclude_globs", [])):
-                                continue
-                            for f in files:
-                                paths.append(os.path.join(root, f))
-        
-                self.ProgressBar.setValue(50)
-
-                merged = []
-                if paths:
-                    for p in paths:
-                        text = read_any(p)
-                        if not text:
-                            continue
-                        findings = model.predict(text)
-                        file_merged = merge_findings(findings, max_gap=self.cfg.get("merge_gap", 0))
-                        fname = pathlib.Path(p).name
-                        for f in file_merged:
-                            merged.append({**f, "file": fname})
-
-                self.ProgressBar.setValue(75)
-
-                if merged:
-                    record = {
-                        "ts": time.time(),
-                        "files": [pathlib.Path(p).name for p in paths],
-                        "findings": merged,
-                    }
-
-                    with open(str(self.outputDir + os.path.sep + (pathlib.Path(p).name + ".json")), "w") as file:
-                        file.write(json.dumps(record, indent=2))
-                        self.FileResults.setText(json.dumps(record, indent=2))
-
-                        self.fileLocation = self.outputDir + os.path.sep + (pathlib.Path(p).name + ".json")
-                            
-                        file.close()
-                        self.ProgressBar.setValue(100)
-                        self.stackedWidget.setCurrentIndex(4)          
-                else:
-                    self.stackedWidget.setCurrentIndex(0)
-                    self.popUpWindow = PopUpForWarning()
-                    self.popUpWindow.setText("This file or directory does not have any PII data!")
-                    self.popUpWindow.show()
-
-
+                self.scanThread = QThread(self)
+                self.scanWorker = ScanWorker(self.cfg, self.outputDir, self.FileLineEdit.text(), self.DirectoryLineEdit.text())
+                self.scanWorker.moveToThread(self.scanThread)
+                self.scanThread.started.connect(self.scanWorker.run)
+                self.scanWorker.progress.connect(self.ProgressBar.setValue)
+                self.scanWorker.progress.connect(self.ResultsProgressBar.setValue)
+                self.scanWorker.fileFindings.connect(self.on_file_findings)
+                self.scanWorker.fileSkipped.connect(self.on_file_skipped)
+                self.scanWorker.done.connect(self.on_scan_done)
+                self.scanWorker.failed.connect(self.on_scan_failed)
+                self.scanThread.start()
     
             else:
                 if len(self.FileLineEdit.text()) == 0 or len(self.FileLineEdit.text()) == 0:
@@ -196,8 +274,54 @@ class MainWindow(QMainWindow, Ui_Form, QObject):
                     self.popUpWindow.show()
 
         except Exception as E:
-            logging.basicConfig(filename=self.cfg["logging"]["file"] + os.path.sep + str(dt.datetime.now().strftime('%y-%m-%d-Time-%H-%M')) + ".log" , filemode="a", format="%(asctime)s - %(levelname)s - %(message)s" )
-            self.logger = logging.getLogger(__name__)
-        
-            self.logger.error("%s", E, exc_info=True)
-            
+            self.log_exception(E)
+
+    def on_file_findings(self, fname, findings):
+        self.resultsModel.append_findings(fname, findings)
+        for lab in self.resultsModel.labels():
+            if lab not in self.resultsLabels:
+                self.resultsLabels.add(lab)
+                self.ResultsLabelComboBox.addItem(lab)
+        # Show the table as soon as there is something in it; the scan keeps going underneath,
+        # with its progress in the bar under the table until on_scan_done
+        if self.stackedWidget.currentIndex() == 3:
+            self.stackedWidget.setCurrentIndex(4)
+
+    def on_file_skipped(self, fname, outcome):
+        # files that timed out, were too large or failed have no rows; they are listed under the table instead
+        self.resultsSkipped.append((fname, outcome))
+        counts = {}
+        for _, o in self.resultsSkipped:
+            counts[o["outcome"]] = counts.get(o["outcome"], 0) + 1
+        self.ResultsSkippedLabel.setText("%d file(s) not scanned: %s (hover for details)" % (
+            len(self.resultsSkipped), ", ".join(f"{n} {kind}" for kind, n in sorted(counts.items()))))
+        self.ResultsSkippedLabel.setToolTip("\n".join(
+            f"{f}: {o['outcome']} - {o.get('detail', '')}" for f, o in self.resultsSkipped))
+        self.ResultsSkippedLabel.setVisible(True)
+
+    def stop_scan_thread(self):
+        self.scanThread.quit()
+        self.scanThread.wait()
+        self.scanWorker.deleteLater()
+        self.scanThread.deleteLater()
+        self.scanThread = None
+        self.scanWorker = None
+        self.ResultsProgressBar.setVisible(False)
+
+    def on_scan_done(self, outPath):
+        self.stop_scan_thread()
+        if outPath:
+            self.fileLocation = outPath
+            self.FindingsFolderButton.setEnabled(True)
+            self.ProgressBar.setValue(100)
+            self.stackedWidget.setCurrentIndex(4)
+        else:
+            self.stackedWidget.setCurrentIndex(0)
+            self.popUpWindow = PopUpForWarning()
+            self.popUpWindow.setText("This file or directory does not have any PII data!")
+            self.popUpWindow.show()
+
+    def on_scan_failed(self, E):
+        self.stop_scan_thread()
+        self.stackedWidget.setCurrentIndex(0)
+        self.log_exception(E)
@@ -0,0 +1,70 @@
+# prefetch.py (keep many file reads in flight, for shares where every open/read is a network round trip)
+import logging, os, threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from .metrics import NULL, file_type
+
+log = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+
+
+def fetch(path, max_bytes, throttle=None, metrics=NULL):
+    """
+    Raw bytes of `path`, or None when it is bigger than max_bytes or can't be read
+    (the caller then reads it the ordinary way, which also logs the error).
+    One open, one fstat and one read: on SMB/NFS each of those is a round trip.
+    """
+    try:
+        with metrics.time("fetch_seconds", file_type(path)):
+            with open(path, "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                if size > max_bytes:
+                    return None
+                if throttle is not None:
+                    throttle.before_read(path, size)
+                data = f.read()
+    except OSError:
+        return None
+    metrics.inc("bytes_fetched", len(data), file_type(path))
+    return data
+
+
+def prefetch(paths, io_threads=16, budget_mb=256, max_file_mb=64, throttle=None, metrics=NULL):
+    """
+    Yield (path, bytes or None) in the order of `paths`, with up to io_threads reads in flight.
+    Fetched bytes that haven't been consumed yet are kept under budget_mb: no new read starts
+    while they are over it, so a slow consumer (extraction, the model) holds the readers back.
+    """
+    budget = int(budget_mb * MB)
+    max_bytes = int(max_file_mb * MB)
+    lock = threading.Lock()
+    held = [0]
+
+    def one(p):
+        data = fetch(p, max_bytes, throttle, metrics)
+        if data is not None:
+            with lock:
+                held[0] += len(data)
+        return data
+
+    it = iter(paths)
+    pending = deque()
+    exhausted = False
+    with ThreadPoolExecutor(max_workers=io_threads, thread_name_prefix="pii-fetch") as pool:
+        while True:
+            while not exhausted and len(pending) < 2 * io_threads and held[0] < budget:
+                p = next(it, None)
+                if p is None:
+                    exhausted = True
+                    break
+                pending.append((p, pool.submit(one, p)))
+            if not pending:
+                return
+            p, fut = pending.popleft()
+            data = fut.result()
+            if data is not None:
+                with lock:
+                    held[0] -= len(data)
+            yield p, data
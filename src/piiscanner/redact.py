@@ -0,0 +1,293 @@
+# redact.py (redacted copies of scanned files, written in the scan while their text is still in memory)
+import logging, mmap, os, pathlib, shutil, threading, time
+
+import numpy as np
+
+from .metrics import NULL, file_type
+from .utils import iter_text_chunks, label_name
+
+log = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+BUFFER = 1 << 20            # write buffer of a redacted copy
+WRITE_SPANS = 8192          # spans written per step
+SPLICE_GAP = 128            # a step whose spans are this close on average is spliced in one numpy pass
+CHUNK_CHARS = 4_000_000     # text re-read per piece for files scanned on the low-memory path
+CRLF_BLOCK = 16 * MB        # bytes searched for \r\n at a time
+DEFAULT_MASK = "[{label}]"
+
+
+class Masks:
+    """
+    Replacement text per label, from cfg redact.masks: a template per label, or "default" for the rest.
+    A template may use {label} and {fill}, one fill_char per char of the span (keeps the length).
+    """
+
+    def __init__(self, masks=None, fill_char="*"):
+        masks = dict(masks or {})
+        self.default = masks.pop("default", DEFAULT_MASK)
+        self.masks = masks
+        self.fill_char = fill_char
+
+    def __call__(self, label, length):
+        return self.masks.get(label, self.default).format(label=label, fill=self.fill_char * length)
+
+    def encoded(self, starts, ends, label_ids):
+        """UTF-8 mask of every span, as a list; each distinct mask is built once."""
+        out = np.empty(len(starts), dtype=object)
+        lengths = ends - starts
+        for lid in np.unique(label_ids).tolist():
+            label = label_name(lid)
+            rows = label_ids == lid
+            if "{fill}" not in self.masks.get(label, self.default):
+                out[rows] = self(label, 0).encode("utf-8")
+                continue
+            for n in np.unique(lengths[rows]).tolist():
+                out[rows & (lengths == n)] = self(label, n).encode("utf-8")
+        return out.tolist()
+
+
+def spans(merged):
+    """(starts, ends, label ids) of merged findings (sorted by start), clamped so that none overlap."""
+    s, e = merged["start"], merged["end"]
+    if not len(s):
+        return s, e, merged["label_id"]
+    s = np.maximum(s, np.concatenate(([0], np.maximum.accumulate(e)[:-1])))
+    keep = e > s
+    return s[keep], e[keep], merged["label_id"][keep]
+
+
+def masked(pieces, spans, masks):
+    """
+    The text of `pieces` (consecutive strings of one text) with each span replaced by its mask, as a
+    stream of strings: one pass, nothing joined. A span may cross pieces.
+    """
+    rows = [(s, e, label_name(lid)) for s, e, lid in zip(*(a.tolist() for a in spans))]
+    i, base, skip_to = 0, 0, 0
+    for piece in pieces:
+        end = base + len(piece)
+        at = min(max(skip_to - base, 0), len(piece))
+        while i < len(rows) and rows[i][0] < end:
+            s, e, label = rows[i]
+            i += 1
+            if s - base > at:
+                yield piece[at:s - base]
+            yield masks(label, e - s)
+            skip_to = e
+            at = min(e - base, len(piece))
+            if e > end:
+                break
+        if at < len(piece):
+            yield piece[at:]
+        base = end
+
+
+def crlf_offsets(mm):
+    """File offsets of the \\r\\n pairs in the bytes of `mm`, found a block at a time (no copy of the file)."""
+    data = np.frombuffer(mm, np.uint8)
+    found = []
+    for at in range(0, len(data), CRLF_BLOCK):
+        cr = np.flatnonzero(data[at:at + CRLF_BLOCK] == 13) + at
+        cr = cr[cr + 1 < len(data)]
+        found.append(cr[data[cr + 1] == 10])
+    del data
+    return np.concatenate(found) if found else np.empty(0, np.int64)
+
+
+def byte_offsets(pieces, bounds, size, crlf=()):
+    """
+    Offsets in the UTF-8 file of `size` bytes of the sorted char offsets `bounds` into the text of `pieces`,
+    or None when the text isn't a lossless decoding of the file (bytes read_txt dropped).
+    `crlf` are the file offsets of its \\r\\n pairs (crlf_offsets), each read into the text as one \\n.
+    """
+    bounds = np.asarray(bounds, dtype=np.int64)
+    out = np.empty(len(bounds), dtype=np.int64)
+    i, base, nbytes = 0, 0, 0
+    for piece in pieces:
+        end = base + len(piece)
+        j = int(np.searchsorted(bounds, end, side="right"))
+        if piece.isascii():  # one byte per char
+            out[i:j] = nbytes + bounds[i:j] - base
+            nbytes += len(piece)
+        else:
+            at = 0
+            for k in range(i, j):
+                c = int(bounds[k]) - base
+                nbytes += len(piece[at:c].encode("utf-8"))
+                out[k] = nbytes
+                at = c
+            nbytes += len(piece[at:].encode("utf-8"))
+        i, base = j, end
+    if nbytes + len(crlf) != size or i != len(bounds):
+        return None
+    if len(crlf):
+        # each \r\n before an offset adds the \r the text doesn't have
+        newlines = np.asarray(crlf, dtype=np.int64) - np.arange(len(crlf))  # where the \n of each is in the text
+        out += np.searchsorted(newlines, out, side="left")
+    return out
+
+
+class Redactor:
+    """
+    Writes a redacted copy of each scanned file under `root`, at the file's absolute path below it.
+    - .txt: the file's own bytes between the findings, copied from a memory map straight into a buffered
+      writer, so the copy keeps its encoding and newlines and is never rebuilt in memory.
+    - .docx, .pdf: their extracted text with the findings masked, as <name>.txt next to where the copy would be.
+    Copies are written as .part and renamed once complete. A file that can't be redacted is logged and skipped;
+    its scan record is unaffected.
+    """
+
+    def __init__(self, root, masks=None, include_clean=False, metrics=NULL):
+        self.root = pathlib.Path(root)
+        self.masks = masks or Masks()
+        self.include_clean = include_clean
+        self.metrics = metrics
+        self._lock = threading.Lock()
+        self.files = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.seconds = 0.0
+
+    @classmethod
+    def from_cfg(cls, cfg, metrics=NULL):
+        """A Redactor for cfg redact, or None unless it is enabled."""
+        rcfg = cfg.get("redact") or {}
+        if not rcfg.get("enabled"):
+            return None
+        return cls(rcfg["path"], Masks(rcfg.get("masks"), rcfg.get("fill_char", "*")),
+                   rcfg.get("include_clean", False), metrics)
+
+    def target(self, path):
+        """Where the redacted copy of `path` goes: its absolute path under root (drive and UNC host as folders)."""
+        parts = [part.replace(":", "").strip("\\/") for part in pathlib.Path(os.path.abspath(path)).parts]
+        dst = self.root.joinpath(*[part for part in parts if part])
+        return dst if dst.suffix.lower() == ".txt" else dst.with_name(dst.name + ".txt")
+
+    def write(self, path, text, merged):
+        """
+        Redact `path` given its extracted `text` (None if it was scanned on the low-memory path; the text is
+        then re-read a piece at a time) and merged findings. Returns the copy's path, or None.
+        """
+        if not len(merged) and not self.include_clean:
+            return None
+        ftype = file_type(path)
+        dst = self.target(path)
+        part = dst.with_name(dst.name + ".part")
+        t0 = time.perf_counter()
+        try:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            with self.metrics.time("redact_seconds", ftype):
+                with open(part, "wb", buffering=BUFFER) as out:
+                    self._write(path, text, spans(merged), out)
+                    size_out = out.tell()
+            size_in = os.path.getsize(path)
+            os.replace(part, dst)
+        except Exception:
+            log.exception("Failed to write a redacted copy of %s", path)
+            self.metrics.inc("redact_errors", 1, ftype)
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            return None
+        self._count(ftype, size_in, size_out, time.perf_counter() - t0)
+        return dst
+
+    def copy(self, original, path):
+        """
+        Redacted copy of `path`, a byte-identical duplicate of `original`: a copy of `original`'s redacted copy,
+        so nothing is read or extracted again. Returns the copy's path, or None if `original` has none.
+        """
+        src = self.target(original)
+        if not src.is_file():
+            return None
+        dst = self.target(path)
+        part = dst.with_name(dst.name + ".part")
+        ftype = file_type(path)
+        t0 = time.perf_counter()
+        try:
+            dst.parent.mkdir(parents=True, exist_ok=True)
+            with self.metrics.time("redact_seconds", ftype):
+                shutil.copyfile(src, part)
+            size_in, size_out = os.path.getsize(path), os.path.getsize(part)
+            os.replace(part, dst)
+        except Exception:
+            log.exception("Failed to copy the redacted copy of %s for %s", original, path)
+            self.metrics.inc("redact_errors", 1, ftype)
+            try:
+                os.remove(part)
+            except OSError:
+                pass
+            return None
+        self._count(ftype, size_in, size_out, time.perf_counter() - t0)
+        return dst
+
+    def _count(self, ftype, size_in, size_out, seconds):
+        self.metrics.inc("files_redacted", 1, ftype)
+        self.metrics.inc("bytes_redacted", size_out, ftype)
+        with self._lock:
+            self.files += 1
+            self.bytes_in += size_in
+            self.bytes_out += size_out
+            self.seconds += seconds
+
+    def _write(self, path, text, spans, out):
+        """Write the redacted copy to `out`: the .txt byte copy where offsets map 1:1, else the masked text."""
+        def pieces():
+            if text is not None:
+                return [text]
+            return (t for _, t in iter_text_chunks(path, CHUNK_CHARS, overlap=0))
+
+        if os.path.splitext(path)[1].lower() == ".txt" and os.path.getsize(path):
+            with open(path, "rb") as src, mmap.mmap(src.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                starts, ends, _ = spans
+                bounds = np.column_stack((starts, ends)).ravel()
+                # read_txt turns \r\n into \n; the copy keeps the file's own newlines
+                crlf = crlf_offsets(mm) if mm.find(b"\r\n") >= 0 else ()
+                offsets = byte_offsets(pieces(), bounds, len(mm), crlf)
+                if offsets is not None:
+                    self._copy_txt(mm, spans, offsets, out)
+                    return
+        for s in masked(pieces(), spans, self.masks):
+            out.write(s.encode("utf-8"))
+
+    def _copy_txt(self, mm, spans, offsets, out):
+        view = memoryview(mm)
+        try:
+            masks = self.masks.encoded(*spans)
+            b0s, b1s = offsets[0::2], offsets[1::2]
+            prev = 0
+            for k in range(0, len(masks), WRITE_SPANS):
+                b0, b1, m = b0s[k:k + WRITE_SPANS], b1s[k:k + WRITE_SPANS], masks[k:k + WRITE_SPANS]
+                if b1[-1] - prev <= SPLICE_GAP * len(m):
+                    out.write(_splice(np.frombuffer(mm, np.uint8, int(b1[-1]) - prev, prev), b0 - prev, b1 - prev, m))
+                else:  # far apart: the gaps go straight from the map
+                    parts = []
+                    for a, b, mask in zip([prev] + b1[:-1].tolist(), b0.tolist(), m):
+                        parts += (view[a:b], mask)
+                    out.writelines(parts)
+                    del parts
+                prev = int(b1[-1])
+            out.write(view[prev:])
+        finally:
+            view.release()
+
+    def stats(self):
+        with self._lock:
+            mb = self.bytes_in / MB
+            return {"files": self.files, "mb_in": round(mb, 2), "mb_out": round(self.bytes_out / MB, 2),
+                    "seconds": round(self.seconds, 3),
+                    "mb_per_sec": round(mb / self.seconds, 1) if self.seconds else 0.0}
+
+
+def _splice(region, b0, b1, masks):
+    """Bytes of `region` with [b0[k], b1[k]) replaced by masks[k] (sorted, disjoint ranges ending at the region's end)."""
+    inside = np.zeros(len(region) + 1, dtype=np.int8)
+    inside[b0] += 1
+    inside[b1] -= 1
+    kept = region[np.cumsum(inside[:-1]) == 0]
+    mask_bytes = np.frombuffer(b"".join(masks), dtype=np.uint8)
+    lengths = np.fromiter(map(len, masks), dtype=np.int64, count=len(masks))
+    # kept bytes before each span, i.e. where its mask goes
+    at = b0 - np.concatenate(([0], np.cumsum(b1 - b0)[:-1]))
+    return np.insert(kept, np.repeat(at, lengths), mask_bytes).tobytes()
@@ -0,0 +1,182 @@
+# results.py (lazy table model for the Results screen)
+from array import array
+import bisect
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+from .utils import label_id, label_name
+
+
+class FindingsTableModel(QAbstractTableModel):
+    """
+    Table model over the merged findings of a scan.
+    - Rows are stored column-wise in compact arrays, never as one big text document.
+    - Only FETCH_CHUNK rows are exposed at a time; the view pulls more as the user scrolls.
+    - Sorting and filtering work on an index of row ids, the rows themselves are never copied.
+    """
+
+    COLUMNS = ("File", "Label", "Score", "Start", "End")
+    FETCH_CHUNK = 500
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._files = []        # interned file names
+        self._file_ids = {}
+        self._seen_labels = set()  # label ids (see utils.label_id)
+        self._file = array("I")
+        self._label = array("H")
+        self._score = array("f")
+        self._start = array("q")
+        self._end = array("q")
+
+        self._view = []         # row ids that pass the filter, ascending by sort key
+        self._loaded = 0        # how many of _view are exposed to Qt
+
+        self._filter_label = None
+        self._filter_file = ""
+        self._filter_score = 0.0
+        self._sort_column = None
+        self._sort_order = Qt.AscendingOrder
+
+    # --- data in ---
+    def append_findings(self, fname, findings):
+        """Add one file's merged findings (a FINDING_DTYPE array)."""
+        n = len(findings)
+        if not n:
+            return
+        fid = self._file_ids.get(fname)
+        if fid is None:
+            fid = self._file_ids[fname] = len(self._files)
+            self._files.append(fname)
+
+        first = len(self._start)
+        self._file.extend(array("I", [fid]) * n)
+        self._label.extend(findings["label_id"].tolist())
+        self._score.extend(findings["score"].tolist())
+        self._start.extend(findings["start"].tolist())
+        self._end.extend(findings["end"].tolist())
+        self._seen_labels.update(findings["label_id"].tolist())
+
+        new_rows = [r for r in range(first, len(self._start)) if self._accepts(r)]
+        if not new_rows:
+            return
+
+        if self._sort_column is not None:
+            # keep the index sorted; only inserts into the exposed part are announced
+            for r in new_rows:
+                pos = bisect.bisect_right(self._view, self._sort_key(r), key=self._sort_key)
+                shown = len(self._view) - pos if self._descending() else pos
+                if shown < self._loaded:
+                    self.beginInsertRows(QModelIndex(), shown, shown)
+                    self._view.insert(pos, r)
+                    self._loaded += 1
+                    self.endInsertRows()
+                else:
+                    self._view.insert(pos, r)
+        else:
+            self._view.extend(new_rows)
+
+        # Fill the first page straight away so rows show up while the scan runs
+        if self._loaded < self.FETCH_CHUNK and self._loaded < len(self._view):
+            self.fetchMore(QModelIndex())
+
+    def clear(self):
+        self.beginResetModel()
+        self._files.clear(); self._file_ids.clear()
+        self._seen_labels.clear()
+        self._file = array("I"); self._label = array("H")
+        self._score = array("f"); self._start = array("q"); self._end = array("q")
+        self._view = []
+        self._loaded = 0
+        self.endResetModel()
+
+    def labels(self):
+        return sorted(label_name(i) for i in self._seen_labels)
+
+    # --- filtering / sorting ---
+    def set_filter(self, label=None, file_text="", min_score=0.0):
+        self._filter_label = label_id(label) if label else None
+        self._filter_file = (file_text or "").lower()
+        self._filter_score = float(min_score or 0.0)
+        self._rebuild_view()
+
+    def _accepts(self, row):
+        if self._filter_label is not None and self._label[row] != self._filter_label:
+            return False
+        if self._score[row] < self._filter_score:
+            return False
+        if self._filter_file and self._filter_file not in self._files[self._file[row]].lower():
+            return False
+        return True
+
+    def _sort_key(self, row):
+        col = self._sort_column
+        if col == 0:
+            return (self._files[self._file[row]], self._start[row])
+        if col == 1:
+            return (label_name(self._label[row]), self._start[row])
+        if col == 2:
+            return self._score[row]
+        if col == 3:
+            return self._start[row]
+        return self._end[row]
+
+    def _rebuild_view(self):
+        self.beginResetModel()
+        self._view = [r for r in range(len(self._start)) if self._accepts(r)]
+        if self._sort_column is not None:
+            self._view.sort(key=self._sort_key)
+        self._loaded = min(self.FETCH_CHUNK, len(self._view))
+        self.endResetModel()
+
+    def _descending(self):
+        return self._sort_column is not None and self._sort_order == Qt.DescendingOrder
+
+    def _display_pos(self, pos):
+        # descending order is the ascending index read backwards
+        return len(self._view) - 1 - pos if self._descending() else pos
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        self._sort_column = column if column >= 0 else None
+        self._sort_order = order
+        self._rebuild_view()
+
+    # --- Qt model interface ---
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self._loaded < len(self._view)
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        n = min(self.FETCH_CHUNK, len(self._view) - self._loaded)
+        if n <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._loaded, self._loaded + n - 1)
+        self._loaded += n
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        row = self._view[self._display_pos(index.row())]
+        col = index.column()
+        if col == 0:
+            return self._files[self._file[row]]
+        if col == 1:
+            return label_name(self._label[row])
+        if col == 2:
+            return f"{self._score[row]:.4f}"
+        if col == 3:
+            return self._start[row]
+        return self._end[row]
@@ -0,0 +1,242 @@
+# sample.py (first-pass risk assessment: scan a reproducible sample and estimate PII prevalence)
+import datetime as dt, heapq, json, logging, math, os, random, time
+from collections import defaultdict
+
+from PyPDF2 import PdfReader
+
+from .guard import Limits, extractor, failure
+from .metrics import NULL, file_type
+from .utils import merge_findings, read_any
+
+log = logging.getLogger(__name__)
+
+MB = 1024 * 1024
+Z95 = 1.959964
+SIZE_CLASSES = (16 * 1024, 256 * 1024, 4 * MB)  # <16K, <256K, <4M, bigger
+
+
+# --- per file: head, tail and random windows ---
+def _spread(total, width, n, rng):
+    """Start offsets of head, tail and n random windows of `width` over `total`, or None to take it all."""
+    if total <= width * (n + 2):
+        return None
+    starts = {0, total - width}
+    starts.update(rng.randrange(width, total - 2 * width) for _ in range(n))
+    return sorted(starts)
+
+def sample_text(path, width, n, rng, reader=None):
+    """
+    (list of text windows, chars covered, chars in the file) for one file.
+    .txt is read by seeking, so only the sampled bytes come off the disk; for PDFs only the sampled
+    pages are extracted; other formats are extracted whole and then sampled.
+    With a guard `reader` (cfg limits), everything but the seeks is extracted whole through it, under the limits.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".txt":
+        size = os.path.getsize(path)
+        starts = _spread(size, width, n, rng)
+        if starts is None:
+            text = (read_any(path) if reader is None else reader.extract(path)) or ""
+            return [text], len(text), len(text)
+        parts = []
+        with open(path, "rb") as f:
+            for s in starts:
+                f.seek(s)
+                parts.append(f.read(width).decode("utf-8", errors="ignore"))
+        return parts, sum(len(p) for p in parts), size
+    if ext == ".pdf" and reader is None:
+        pages = PdfReader(path).pages
+        picked = _spread(len(pages), 1, n, rng)
+        picked = range(len(pages)) if picked is None else picked
+        parts = [pages[i].extract_text() or "" for i in picked]
+        covered = sum(len(p) for p in parts)
+        # chars in the unread pages are estimated from the ones we read
+        return parts, covered, int(covered * len(pages) / max(len(picked), 1))
+    text = (read_any(path) if reader is None else reader.extract(path)) or ""
+    starts = _spread(len(text), width, n, rng)
+    if starts is None:
+        return [text], len(text), len(text)
+    parts = [text[s:s + width] for s in starts]
+    return parts, sum(len(p) for p in parts), len(text)
+
+
+# --- per tree: stratified order ---
+def stratum(path, size, root, depth):
+    rel = os.path.relpath(os.path.dirname(path), root)
+    top = os.sep.join(rel.split(os.sep)[:depth]) if rel != "." else "."
+    size_class = sum(size >= c for c in SIZE_CLASSES)
+    return top, file_type(path), size_class
+
+def _roots(dirs):
+    """{drive: the directory every one of `dirs` on that drive is under}; one root ("" key) when they share one."""
+    try:
+        return {"": os.path.commonpath(dirs)} if dirs else {}
+    except ValueError:  # different drives (Windows)
+        by_drive = defaultdict(list)
+        for d in dirs:
+            by_drive[os.path.splitdrive(d)[0].upper()].append(d)
+        return {drive: os.path.commonpath(ds) for drive, ds in by_drive.items()}
+
+def stratified_order(files, seed, depth=1):
+    """
+    files: [(path, size)]. Returns (strata {key: [paths]}, visiting order). Any prefix of the order is a
+    proportional stratified sample, and within a stratum files come in seeded random order.
+    Files on different drives are stratified per drive.
+    """
+    roots = _roots([os.path.dirname(p) for p, _ in files])
+    strata = defaultdict(list)
+    for p, size in files:
+        if "" in roots:
+            key = stratum(p, size, roots[""], depth)
+        else:
+            drive = os.path.splitdrive(p)[0].upper()
+            top, ext, size_class = stratum(p, size, roots[drive], depth)
+            key = (os.path.join(drive + os.sep, top), ext, size_class)
+        strata[key].append(p)
+    rng = random.Random(seed)
+    for k in sorted(strata):
+        strata[k].sort()
+        rng.shuffle(strata[k])
+    # Sainte-Lague style: the next file comes from the stratum with the lowest (taken + 0.5) / size
+    heap = [(0.5 / len(v), k) for k, v in sorted(strata.items())]
+    heapq.heapify(heap)
+    taken = defaultdict(int)
+    order = []
+    while heap:
+        _, k = heapq.heappop(heap)
+        order.append((k, strata[k][taken[k]]))
+        taken[k] += 1
+        if taken[k] < len(strata[k]):
+            heapq.heappush(heap, ((taken[k] + 0.5) / len(strata[k]), k))
+    return strata, order
+
+
+# --- estimation ---
+def wilson(pos, n, z=Z95):
+    if n == 0:
+        return 0.0, 1.0
+    p = pos / n
+    d = 1 + z * z / n
+    c = (p + z * z / (2 * n)) / d
+    h = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / d
+    return max(0.0, c - h), min(1.0, c + h)
+
+def estimate(strata_sizes, results):
+    """
+    Stratified estimate of the share of files with PII in their sampled windows, with a 95% interval.
+    Files that were only partly sampled can hide PII elsewhere, so this is a lower bound on full-scan prevalence.
+    strata_sizes: {key: N_h}; results: {key: [bool per sampled file]}.
+    Strata with no sample yet are left out of the estimate and their weight reported as unsampled.
+    """
+    total = sum(strata_sizes.values())
+    sampled = {k: v for k, v in results.items() if v}
+    covered = sum(strata_sizes[k] for k in sampled)
+    if not covered:
+        return {"estimate": None, "ci95": [0.0, 1.0], "unsampled_weight": 1.0}
+    p_hat = var = 0.0
+    for k, v in sampled.items():
+        w = strata_sizes[k] / covered
+        n, N = len(v), strata_sizes[k]
+        p = sum(v) / n
+        p_hat += w * p
+        if n > 1:
+            var += w * w * p * (1 - p) / (n - 1) * (1 - n / N)
+        elif N > 1:
+            var += w * w * 0.25 * (1 - 1 / N)  # one file says nothing about the spread; assume the worst
+    n_all = sum(len(v) for v in sampled.values())
+    if var == 0.0:
+        # all-or-nothing samples: fall back to Wilson on the pooled sample so the interval isn't 0 wide
+        lo, hi = wilson(round(p_hat * n_all), n_all)
+    else:
+        half = Z95 * math.sqrt(var)
+        lo, hi = max(0.0, p_hat - half), min(1.0, p_hat + half)
+    return {"estimate": p_hat, "ci95": [lo, hi], "unsampled_weight": 1 - covered / total}
+
+
+# --- the run ---
+def run_sample(cfg, paths, metrics=NULL, seed=None, budget_mb=None, budget_seconds=None):
+    """Scan a stratified sample of `paths` within the byte/time budget and write a JSON report. Returns its path."""
+    from .scan import build_model, output_path
+
+    scfg = cfg.get("sample", {})
+    seed = scfg.get("seed", 0) if seed is None else seed
+    budget_mb = scfg.get("budget_mb", 1024) if budget_mb is None else budget_mb
+    budget_seconds = scfg.get("budget_seconds", 0) if budget_seconds is None else budget_seconds
+    width, n_windows = scfg.get("window_chars", 2048), scfg.get("windows", 8)
+    merge_gap = cfg.get("merge_gap", 0)
+
+    files = []
+    for p in paths:
+        try:
+            files.append((p, os.path.getsize(p)))
+        except OSError:
+            continue
+    strata, order = stratified_order(files, seed, scfg.get("strata_depth", 1))
+    sizes = {k: len(v) for k, v in strata.items()}
+    model = build_model(cfg, metrics)
+    # with cfg limits, extraction runs under them (in a watchdog process with limits.isolate)
+    reader = extractor(cfg, 1, metrics) if Limits.from_cfg(cfg) is not None else None
+
+    results = defaultdict(list)
+    unscanned = defaultdict(list)  # sampled files that couldn't be read: left out of results, but reported
+    positives = []
+    sampled_chars = findings = 0
+    t0 = time.monotonic()
+    try:
+        for k, p in order:
+            if budget_mb and sampled_chars >= budget_mb * MB:
+                break
+            if budget_seconds and time.monotonic() - t0 >= budget_seconds:
+                break
+            rng = random.Random(f"{seed}:{p}")  # per file, so a file's windows don't depend on what came before it
+            try:
+                with metrics.time("read_seconds", file_type(p)):
+                    parts, covered, total_chars = sample_text(p, width, n_windows, rng, reader)
+                per_window = model.predict_batch([t for t in parts if t]) if any(parts) else []
+            except Exception as e:
+                unscanned[k].append({"file": p, **failure(p, e, metrics)})
+                continue
+            n_found = sum(len(merge_findings(f, max_gap=merge_gap)) for f in per_window)
+            metrics.inc("files_read", 1, file_type(p))
+            sampled_chars += covered
+            findings += n_found
+            results[k].append(n_found > 0)
+            if n_found:
+                positives.append({"file": p, "findings_in_sample": n_found,
+                                  "coverage": round(covered / total_chars, 4) if total_chars else 1.0})
+    finally:
+        if reader is not None:
+            reader.close()
+
+    est = estimate(sizes, results)
+    n_sampled = sum(len(v) for v in results.values())
+    n_unscanned = sum(len(v) for v in unscanned.values())
+    est["unscanned"] = n_unscanned
+    if n_unscanned:
+        # the interval if the unscanned files had been all clean / all positive
+        lo = estimate(sizes, {k: results[k] + [False] * len(unscanned[k]) for k in strata})["ci95"][0]
+        hi = estimate(sizes, {k: results[k] + [True] * len(unscanned[k]) for k in strata})["ci95"][1]
+        est["ci95_with_unscanned"] = [lo, hi]
+    report = {
+        "ts": dt.datetime.now().isoformat(timespec="seconds"),
+        "seed": seed,
+        "budget": {"mb": budget_mb, "seconds": budget_seconds},
+        "per_file": {"window_chars": width, "windows": n_windows},
+        "population": {"files": len(files), "bytes": sum(s for _, s in files), "strata": len(strata)},
+        "sample": {"files": n_sampled, "unscanned": n_unscanned, "chars": sampled_chars, "seconds": round(time.monotonic() - t0, 2)},
+        "prevalence": est,
+        "estimated_files_with_pii": ([round(x * len(files)) for x in est["ci95"]]
+                                     if est["estimate"] is not None else None),
+        "findings_per_mb_sampled": round(findings / (sampled_chars / MB), 3) if sampled_chars else None,
+        "strata": [
+            {"dir": k[0], "ext": k[1], "size_class": k[2], "files": sizes[k], "sampled": len(results[k]),
+             "positive": sum(results[k]), "unscanned": len(unscanned[k]),
+             "ci95": list(wilson(sum(results[k]), len(results[k])))}
+            for k in sorted(strata)
+        ],
+        "positives": positives,
+        "unscanned": [u for k in sorted(unscanned) for u in unscanned[k]],
+    }
+    out_path = output_path(cfg, "sample").with_suffix(".json")
+    out_path.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    return out_path
@@ -0,0 +1,656 @@
+# scan.py (headless scan path shared by the GUI and the tooling)
+import argparse, datetime as dt, itertools, json, logging, os, fnmatch, pathlib, time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+import numpy as np
+import yaml
+
+from .dedup import Dedup
+from .infer import PiiModel, _resource_path, tuned
+from .guard import OK, FileTimeout, Inline, Limits, extractor, failure, use_interpreter
+from .journal import ScanJournal
+from .memory import MemoryGovernor
+from .prefetch import prefetch
+from .redact import Redactor
+from .schedule import schedule
+from .throttle import Throttle
+from .tune import tune, save_profile
+from .metrics import Metrics, MetricsDumper, NULL, file_type
+from .utils import label_id, read_any, read_bytes, merge_findings, exclude_globs, iter_files, iter_text_chunks, empty_findings, findings_to_dicts
+
+
+def load_config(path=None):
+    path = path or _resource_path("config.yaml")
+    with open(path, "r", encoding="utf-8") as f:
+        return yaml.safe_load(f)
+
+def setup_logging(cfg):
+    log_cfg = cfg.get("logging", {})
+    log_dir = log_cfg.get("path")
+    if log_dir:
+        os.makedirs(log_dir, exist_ok=True)
+        logging.basicConfig(
+            filename=os.path.join(log_dir, dt.datetime.now().strftime('%y-%m-%d-Time-%H-%M') + ".log"),
+            filemode="a", format="%(asctime)s - %(levelname)s - %(message)s",
+            level=log_cfg.get("level", "INFO"),
+        )
+
+def build_model(cfg, metrics=NULL):
+    throttle = Throttle.from_cfg(cfg, metrics)
+    if throttle is not None:
+        throttle.apply_priority()
+        logging.getLogger(__name__).info("Throttle: %s", throttle.stats())
+    return PiiModel(
+        model_dir=cfg.get("model_dir", "model"),
+        thresholds=cfg.get("thresholds", {}),
+        batch_size=cfg.get("batch_size"),  # None: from the tune profile
+        intra_op_threads=cfg.get("intra_op_threads"),
+        tokenizer_threads=cfg.get("tokenizer_threads", 0),
+        use_profile=cfg.get("use_tune_profile", True),
+        throttle=throttle,
+    )
+
+def walk_dir(directory, excludes, metrics=NULL):
+    for root, _, files in os.walk(directory):
+        if any(fnmatch.fnmatch(root, ex) for ex in excludes):
+            continue
+        for f in files:
+            p = os.path.join(root, f)
+            metrics.inc("files_walked", 1, file_type(p))
+            yield p
+
+def build_paths(fileText, directoryText, excludes, metrics=NULL):
+    """Same rules as the GUI: a single file wins over a directory."""
+    paths = []
+    if len(fileText) > 0:
+        if os.path.isfile(fileText):
+            metrics.inc("files_walked", 1, file_type(fileText))
+            paths.append(fileText)
+    elif len(directoryText) > 0:
+        if os.path.isdir(directoryText):
+            paths.extend(walk_dir(directoryText, excludes, metrics))
+    return paths
+
+def iter_targets(cfg, metrics=NULL):
+    for p in iter_files(cfg.get("targets", []), exclude_globs(cfg)):
+        metrics.inc("files_walked", 1, file_type(p))
+        yield p
+
+def scan_file(model, path, merge_gap=0, metrics=NULL):
+    """Read, infer and merge one file. Returns (file name, merged FINDING_DTYPE array)."""
+    if model.throttle is not None:
+        model.throttle.before_read(path)
+    with metrics.time("read_seconds", file_type(path)):
+        text = read_any(path)
+    return scan_text(model, path, text, merge_gap, metrics)
+
+def scan_text(model, path, text, merge_gap=0, metrics=NULL):
+    """Infer and merge text already extracted from `path`. Returns (file name, merged FINDING_DTYPE array)."""
+    fname = pathlib.Path(path).name
+    if not text:
+        return fname, empty_findings()
+    ftype = file_type(path)
+    metrics.inc("files_read", 1, ftype)
+    metrics.inc("bytes_read", os.path.getsize(path), ftype)
+    metrics.inc("bytes_extracted", len(text.encode("utf-8", "ignore")), ftype)
+    findings = _infer(model, text, ftype, metrics)
+    with metrics.time("merge_seconds", ftype):
+        merged = merge_findings(findings, max_gap=merge_gap)
+    metrics.inc("findings", len(merged), ftype)
+    return fname, merged
+
+def scan_texts(model, docs, merge_gap=0, metrics=NULL):
+    """
+    Infer and merge several extracted (path, text) pairs together: one encode_batch call for all
+    of them, and their windows share model batches. Returns [(file name, merged array)] in order.
+    """
+    live = [(i, p, t) for i, (p, t) in enumerate(docs) if t]
+    out = [(pathlib.Path(p).name, empty_findings()) for p, _ in docs]
+    if not live:
+        return out
+    ftypes = [file_type(p) for _, p, _ in live]
+    for (_, p, t), ftype in zip(live, ftypes):
+        metrics.inc("files_read", 1, ftype)
+        metrics.inc("bytes_read", os.path.getsize(p), ftype)
+        metrics.inc("bytes_extracted", len(t.encode("utf-8", "ignore")), ftype)
+
+    # stage timings cover the whole batch, so they are recorded without a file type
+    with metrics.time("tokenize_seconds"):
+        enc = model.encode_batch([t for _, _, t in live])
+    for d, ids in zip(enc["overflow_to_sample_mapping"], enc["input_ids"]):
+        metrics.inc("tokens", len(ids), ftypes[d])
+        metrics.inc("windows", 1, ftypes[d])
+    batches = model.batches_run
+    with metrics.time("session_run_seconds"):
+        logits = model.run(enc)
+    metrics.inc("batches", model.batches_run - batches)
+    with metrics.time("postprocess_seconds"):
+        per_doc = model.decode_batch(enc, logits, len(live))
+
+    for (i, p, _), ftype, findings in zip(live, ftypes, per_doc):
+        with metrics.time("merge_seconds", ftype):
+            merged = merge_findings(findings, max_gap=merge_gap)
+        metrics.inc("findings", len(merged), ftype)
+        out[i] = (out[i][0], merged)
+    return out
+
+def scan_file_chunked(model, path, merge_gap=0, metrics=NULL, chunk_chars=1_000_000, limits=None):
+    """
+    Low-memory path for files too big to extract whole: text is read a piece at a time,
+    windows go through the model one at a time, and only the findings are kept.
+    With `limits` (guard.Limits), raises TooLarge or FileTimeout between pieces once the file is over them.
+    """
+    fname = pathlib.Path(path).name
+    ftype = file_type(path)
+    deadline = None
+    if limits is not None:
+        limits.check_bytes(os.path.getsize(path))
+        deadline = limits.deadline()
+    if model.throttle is not None:
+        model.throttle.before_read(path)
+    findings = []
+    saved_batch = model.batch_size
+    model.batch_size = 1
+    try:
+        read_any_text = False
+        for offset, text in iter_text_chunks(path, chunk_chars):
+            read_any_text = True
+            if limits is not None:
+                limits.check_text(offset + len(text))
+                if deadline is not None and time.monotonic() > deadline:
+                    raise FileTimeout(f"over file_seconds {limits.file_seconds}")
+            metrics.inc("bytes_extracted", len(text.encode("utf-8", "ignore")), ftype)
+            part = _infer(model, text, ftype, metrics)
+            part["start"] += offset
+            part["end"] += offset
+            findings.append(part)
+    finally:
+        model.batch_size = saved_batch
+    if read_any_text:
+        metrics.inc("files_read", 1, ftype)
+        metrics.inc("bytes_read", os.path.getsize(path), ftype)
+    with metrics.time("merge_seconds", ftype):
+        merged = merge_findings(np.concatenate(findings) if findings else empty_findings(), max_gap=merge_gap)
+    metrics.inc("findings", len(merged), ftype)
+    return fname, merged
+
+def verdict_file(model, path, label_ids=None, metrics=NULL, chunk_chars=8192, reader=None):
+    """
+    Does `path` contain PII (of `label_ids`, if given)? Text is extracted a piece at a time and the
+    file is abandoned at the first finding, so later pages are never extracted and later windows never run.
+    With a guard `reader`, the pieces are extracted through it, under its limits.
+    Returns the first finding as a dict, or None.
+    """
+    ftype = file_type(path)
+    if model.throttle is not None:
+        model.throttle.before_read(path)
+    metrics.inc("files_read", 1, ftype)
+    chunks = iter_text_chunks(path, chunk_chars) if reader is None else reader.chunks(path, chunk_chars)
+    try:
+        for offset, text in chunks:
+            with metrics.time("session_run_seconds", ftype):
+                hit, windows = model.first_hit(text, label_ids)
+            metrics.inc("windows", windows, ftype)
+            if hit is not None:
+                metrics.inc("verdict_early_exits", 1, ftype)
+                hit["start"] += offset
+                hit["end"] += offset
+                return findings_to_dicts(hit)[0]
+    finally:
+        chunks.close()  # stops the extraction there
+    return None
+
+def _infer(model, text, ftype, metrics):
+    with metrics.time("tokenize_seconds", ftype):
+        enc = model.encode(text)
+    metrics.inc("tokens", sum(len(x) for x in enc["input_ids"]), ftype)
+    metrics.inc("windows", len(enc["input_ids"]), ftype)
+    batches = model.batches_run
+    with metrics.time("session_run_seconds", ftype):
+        logits = model.run(enc)
+    metrics.inc("batches", model.batches_run - batches, ftype)
+    with metrics.time("postprocess_seconds", ftype):
+        return model.decode(enc, logits)
+
+
+def _extract(p, data=None, metrics=NULL, throttle=None, reader=None):
+    """(text, outcome) for one file; `reader` is a guard extractor (plain read_any / read_bytes by default)."""
+    if data is None and throttle is not None:
+        throttle.before_read(p)
+    try:
+        with metrics.time("read_seconds", file_type(p)):
+            return (reader or _PLAIN).extract(p, data), OK
+    except Exception as e:
+        return "", failure(p, e, metrics)
+
+_PLAIN = Inline()
+
+def _iter_read(paths, metrics=NULL, throttle=None, reader=None):
+    for p in paths:
+        text, outcome = _extract(p, None, metrics, throttle, reader)
+        yield p, text, 0, outcome
+
+def iter_extracted(paths, workers, governor=None, metrics=NULL, throttle=None, prefetch_cfg=None, reader=None):
+    """
+    Extract text ahead of inference on `workers` reader threads.
+    Yields (path, text, reserved_bytes, outcome); the caller releases reserved_bytes once it is done with the text.
+    `reader` is the guard extractor the threads hand files to (a Watchdog runs them in worker processes).
+    With a MemoryGovernor, no new read starts while the queued text is over its budget (back-pressure),
+    and oversized files are yielded with text=None so the caller can take the low-memory path.
+    With prefetch_cfg (cfg prefetch), raw bytes are fetched on many I/O threads first (prefetch.py)
+    and the reader threads only extract text from memory.
+    """
+    if governor is not None:
+        workers = min(workers, governor.extraction_workers())
+
+    if prefetch_cfg and prefetch_cfg.get("io_threads"):
+        budget = prefetch_cfg.get("budget_mb", 256)
+        if governor is not None:
+            budget = min(budget, governor.queue_budget / (1024 * 1024))
+        source = prefetch(paths, prefetch_cfg["io_threads"], budget, prefetch_cfg.get("max_file_mb", 64),
+                          throttle, metrics)
+    else:
+        source = ((p, None) for p in paths)
+
+    def ready(entry):
+        p0, fut, n0 = entry
+        text, outcome = fut.result()
+        return p0, text, n0, outcome
+
+    pending = deque()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for p, data in source:
+            size = 0
+            if governor is not None:
+                if data is not None:
+                    size = len(data)
+                else:
+                    try:
+                        size = os.path.getsize(p)
+                    except OSError as e:
+                        # reported like a file that failed to extract, in its place in the order
+                        failed = Future()
+                        failed.set_result(("", failure(p, e, metrics)))
+                        pending.append((p, failed, 0))
+                        continue
+                if governor.is_oversized(size):
+                    yield p, None, 0, OK
+                    continue
+                while pending and not governor.try_admit(size):
+                    yield ready(pending.popleft())
+                if not pending:
+                    # the caller may still hold texts it was given (released once inferred), but there is
+                    # nothing left here to wait on: reserve anyway, so that release() balances
+                    governor.admit(size)
+            pending.append((p, pool.submit(_extract, p, data, metrics, throttle, reader), size))
+            while len(pending) >= 2 * workers:
+                yield ready(pending.popleft())
+        while pending:
+            yield ready(pending.popleft())
+
+
+def run_scan(cfg, paths, metrics=NULL, resume=None):
+    """
+    Scan `paths` and write one JSONL record per file with findings. Returns the output path.
+    Progress is checkpointed to a journal (cfg checkpoint); `resume` is the id of an unfinished scan
+    (its output file name without .jsonl) to continue instead of starting a new one.
+    """
+    log = logging.getLogger(__name__)
+    ckpt = cfg.get("checkpoint", {})
+    opts = {"interval": ckpt.get("interval", 10.0), "metrics": metrics}
+    if resume:
+        out_path = pathlib.Path(cfg["output"]["path"]) / f"{resume}.jsonl"
+        journal_path = out_path.with_suffix(".journal")
+        if not journal_path.exists():
+            raise FileNotFoundError(f"No journal for scan {resume} at {journal_path} (finished scans don't keep one)")
+        journal = ScanJournal.resume(journal_path, out_path, **opts)
+        paths = (p for p in paths if p not in journal.completed)
+    else:
+        out_path = output_path(cfg, "scan")
+        journal = None
+        if ckpt.get("enabled", True):
+            journal = ScanJournal.start(out_path.with_suffix(".journal"), {"targets": cfg.get("targets", [])}, **opts)
+            log.info("Scan id %s (resume with --resume %s)", out_path.stem, out_path.stem)
+
+    paths = schedule(cfg, paths)
+    model = build_model(cfg, metrics)
+    governor = attach_governor(cfg, model)
+    finished = False
+    try:
+        with open(out_path, "a" if resume else "w", encoding="utf-8") as out:
+            if journal is not None:
+                journal.attach(out)
+            scan_into(cfg, model, paths, out, metrics, governor, journal)
+            finished = True
+            if journal is not None:
+                journal.checkpoint()
+    finally:
+        if journal is not None:
+            journal.close(finished)
+    if governor is not None:
+        log.info("Memory: %s", governor.stats())
+    return out_path
+
+class UnknownLabels(ValueError):
+    """A verdict label the model doesn't predict."""
+
+def run_verdicts(cfg, paths, metrics=NULL, labels=None):
+    """
+    Triage scan: one compact record per file, {"file", "contains_pii", "first": finding or null},
+    stopping at each file's first finding. Returns the output path.
+    Raises UnknownLabels for a label the model doesn't have (a typo would otherwise make every verdict false).
+    """
+    log = logging.getLogger(__name__)
+    vcfg = cfg.get("verdict", {})
+    labels = labels or vcfg.get("labels") or None
+    chunk_chars = vcfg.get("chunk_chars", 8192)
+    model = build_model(cfg, metrics)
+    unknown = sorted(set(labels or ()) - set(model.labels))
+    if unknown:
+        raise UnknownLabels(f"unknown labels {', '.join(unknown)}; the model has {', '.join(model.labels)}")
+    label_ids = [label_id(l) for l in labels] if labels else None
+    attach_governor(cfg, model)
+    workers = max(1, extraction_workers(cfg, model))
+    limits = Limits.from_cfg(cfg)
+    # with cfg limits, the pieces are extracted under them (in a Watchdog process with limits.isolate)
+    reader = extractor(cfg, workers, metrics) if limits is not None else None
+    out_path = output_path(cfg, "verdict")
+
+    def one(p):
+        try:
+            return p, verdict_file(model, p, label_ids, metrics, chunk_chars, reader), OK
+        except Exception as e:
+            return p, None, failure(p, e, metrics)
+
+    positives = 0
+    pending = deque()
+
+    def verdicts():
+        # a bounded window of files in flight, in order, so a large tree doesn't hold a future per file
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for p in paths:
+                pending.append(pool.submit(one, p))
+                while len(pending) >= 2 * workers:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    try:
+        with open(out_path, "w", encoding="utf-8") as out:
+            for p, first, outcome in verdicts():
+                positives += first is not None
+                out.write(json.dumps({"ts": time.time(), "file": p, "contains_pii": (first is not None) if outcome is OK else None,
+                                      "first": first, **outcome}) + "\n")
+    finally:
+        if reader is not None:
+            reader.close()
+    log.info("%d files contain PII%s", positives, f" ({', '.join(labels)})" if labels else "")
+    return out_path
+
+def output_path(cfg, kind):
+    out_dir = pathlib.Path(cfg["output"]["path"])
+    out_dir.mkdir(parents=True, exist_ok=True)
+    return out_dir / f"{kind}-{dt.datetime.now().strftime('%Y%m%d-%H%M%S')}.jsonl"
+
+def extraction_workers(cfg, model):
+    workers = tuned(model.profile, "extraction_workers", cfg.get("extraction_workers"), 4)
+    return model.throttle.cap_threads(workers) if model.throttle else workers
+
+def attach_governor(cfg, model):
+    """A MemoryGovernor for cfg memory_budget_mb, wired into the model, or None without a budget."""
+    if not cfg.get("memory_budget_mb"):
+        return None
+    model.governor = MemoryGovernor(cfg["memory_budget_mb"], model.model_dir,
+                                    max_batch=model.batch_size, max_workers=extraction_workers(cfg, model))
+    return model.governor
+
+def scan_into(cfg, model, paths, out, metrics=NULL, governor=None, journal=None, reader=None):
+    """
+    Scan `paths` with an already loaded model, writing a JSONL record to `out` per file with findings
+    or that couldn't be scanned ("outcome": timeout / too_large / error, with a "detail").
+    Each file is reported to `journal` (a ScanJournal) once its record is written.
+    """
+    for p, merged, outcome in iter_scan(cfg, model, paths, metrics, governor, reader):
+        if len(merged) or outcome is not OK:
+            with metrics.time("write_seconds", file_type(p)):
+                out.write(json.dumps({"ts": time.time(), "file": p, "findings": findings_to_dicts(merged),
+                                      **outcome}) + "\n")
+        if journal is not None:
+            journal.done(p)
+
+def iter_scan(cfg, model, paths, metrics=NULL, governor=None, reader=None):
+    """
+    Yield (path, merged findings array, outcome) for every one of `paths`, in order, using an already loaded model.
+    outcome is guard.OK, or a record of why the file was skipped; such a file yields no findings.
+    `reader` is a guard extractor to share across calls; by default one is made from cfg limits for this call.
+    With cfg redact enabled, each file's redacted copy is written before its text is let go.
+    With cfg dedup enabled, a file identical to one already scanned isn't scanned again; it is yielded, out of
+    order, with that file's findings and "duplicate_of" in its outcome.
+    """
+    log = logging.getLogger(__name__)
+    redactor = Redactor.from_cfg(cfg, metrics)
+    dedup = Dedup.from_cfg(cfg, metrics)
+    try:
+        if dedup is None:
+            yield from _iter_scan(cfg, model, paths, metrics, governor, reader, redactor)
+            return
+        for p, merged, outcome in _iter_scan(cfg, model, dedup.filter(paths), metrics, governor, reader, redactor):
+            for item in itertools.chain(dedup.resolve(p, merged, outcome), dedup.ready()):
+                if (redactor is not None and item[0] != p and "duplicate_of" in item[2]
+                        and (len(item[1]) or redactor.include_clean)):
+                    redactor.copy(item[2]["duplicate_of"], item[0])  # not extracted again
+                yield item
+        yield from dedup.ready()
+        for dup, original in dedup.leftovers():
+            yield dup, empty_findings(), failure(dup, OSError(f"duplicate of {original}, which wasn't scanned"), metrics)
+        log.info("Dedup: %s", dedup.stats())
+    finally:
+        if redactor is not None and redactor.files:
+            log.info("Redaction: %s", redactor.stats())
+
+def _iter_scan(cfg, model, paths, metrics, governor, reader, redactor):
+    merge_gap = cfg.get("merge_gap", 0)
+    log = logging.getLogger(__name__)
+
+    workers = extraction_workers(cfg, model)
+    own_reader = reader is None
+    if own_reader:
+        reader = extractor(cfg, workers, metrics)
+    limits = reader.limits
+    prefetch_cfg = cfg.get("prefetch", {})
+    if governor is not None or workers > 1 or prefetch_cfg.get("io_threads") or (limits and limits.isolate):
+        items = iter_extracted(paths, workers, governor, metrics, model.throttle, prefetch_cfg, reader)
+    else:
+        items = _iter_read(paths, metrics, model.throttle, reader)
+
+    # small documents are grouped so tokenization runs in parallel and windows fill model batches
+    max_docs = cfg.get("doc_batch_size", 32)
+    max_chars = cfg.get("doc_batch_chars", 256 * 1024)
+    batch = []
+
+    def flush():
+        outcomes = [outcome for _, _, _, outcome in batch]
+        try:
+            merged = [m for _, m in scan_texts(model, [(p, t) for p, t, _, _ in batch], merge_gap, metrics)]
+        except Exception:
+            # find the file that broke the batch; the others still get scanned
+            merged = []
+            for i, (p, t, _, _) in enumerate(batch):
+                try:
+                    merged.append(scan_text(model, p, t, merge_gap, metrics)[1])
+                except Exception as e:
+                    merged.append(empty_findings())
+                    outcomes[i] = failure(p, e, metrics)
+        done = [(p, m, outcome) for (p, _, _, _), m, outcome in zip(batch, merged, outcomes)]
+        if redactor is not None:
+            for (p, t, _, _), m, outcome in zip(batch, merged, outcomes):
+                if outcome is OK:
+                    redactor.write(p, t, m)
+        if governor is not None:
+            for _, _, reserved, _ in batch:
+                governor.release(reserved)
+        batch.clear()
+        if model.throttle is not None:
+            model.throttle.pace()
+        return done
+
+    try:
+        for p, text, reserved, outcome in items:
+            if text is None:
+                yield from flush()
+                log.info("Scanning %s on the low-memory path", p)
+                try:
+                    merged = scan_file_chunked(model, p, merge_gap, metrics, limits=limits)[1]
+                except Exception as e:
+                    yield p, empty_findings(), failure(p, e, metrics)
+                    continue
+                if redactor is not None:
+                    redactor.write(p, None, merged)
+                yield p, merged, OK
+                continue
+            batch.append((p, text, reserved, outcome))
+            if (len(batch) >= max_docs or sum(len(t) for _, t, _, _ in batch) >= max_chars
+                    or (governor is not None and governor.in_flight >= governor.queue_budget)):
+                yield from flush()
+        yield from flush()
+    finally:
+        if own_reader:
+            reader.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Headless PII scan over the configured targets")
+    ap.add_argument("--config", default=None, help="config.yaml to use (default: the bundled one)")
+    sub = ap.add_subparsers(dest="command")
+
+    sp = sub.add_parser("scan", help="scan the configured targets (default)")
+    sp.add_argument("--metrics-dir", default=None, help="where to dump metrics (default: cfg metrics.path)")
+    sp.add_argument("--metrics-interval", type=float, default=None, help="also dump every N seconds during the scan")
+    sp.add_argument("--verdict", action="store_true", help="only report whether each file contains PII, stopping at the first finding")
+    sp.add_argument("--labels", default=None, help="with --verdict: comma-separated labels that count, e.g. SSN,CREDIT_CARD")
+    sp.add_argument("--resume", default=None, metavar="SCAN_ID", help="continue an interrupted scan, e.g. scan-20250101-120000")
+
+    wp = sub.add_parser("watch", help="keep running and scan files as they are created or modified")
+    wp.add_argument("--polling", action="store_true", help="poll for changes instead of using native file events")
+    wp.add_argument("--metrics-dir", default=None, help="where to dump metrics (default: cfg metrics.path)")
+    wp.add_argument("--metrics-interval", type=float, default=None, help="dump every N seconds while watching")
+
+    dp = sub.add_parser("serve", help="keep the model loaded and answer scan requests from local tools")
+    dp.add_argument("--host", default=None, help="address to bind (default: cfg daemon.host)")
+    dp.add_argument("--port", type=int, default=None, help="port (default: cfg daemon.port)")
+    dp.add_argument("--unix-socket", default=None, help="listen on this Unix socket instead of TCP")
+    dp.add_argument("--metrics-dir", default=None, help="where to dump metrics (default: cfg metrics.path)")
+    dp.add_argument("--metrics-interval", type=float, default=None, help="dump every N seconds while serving")
+
+    mp = sub.add_parser("sample", help="estimate PII prevalence from a stratified, seeded sample of the targets")
+    mp.add_argument("--seed", type=int, default=None, help="same seed, same sample (default: cfg sample.seed)")
+    mp.add_argument("--budget-mb", type=float, default=None, help="stop after scanning this much text")
+    mp.add_argument("--budget-seconds", type=float, default=None, help="stop after this long")
+
+    cp = sub.add_parser("coordinate", help="enqueue the configured targets for `work` processes")
+    cp.add_argument("--queue", required=True, help="work queue database, on a filesystem every worker can reach")
+    cp.add_argument("--wait", action="store_true", help="wait for the workers, then write the findings file")
+    kp = sub.add_parser("work", help="scan files from a work queue until it is finished")
+    kp.add_argument("--queue", required=True, help="work queue database created by `coordinate`")
+    kp.add_argument("--metrics-dir", default=None, help="where to dump metrics (default: cfg metrics.path)")
+    kp.add_argument("--metrics-interval", type=float, default=None, help="dump every N seconds while working")
+    lp = sub.add_parser("collect", help="write a work queue's results as a findings file")
+    lp.add_argument("--queue", required=True)
+
+    tp = sub.add_parser("tune", help="find the fastest batch size / window / thread counts for this machine")
+    tp.add_argument("--seconds", type=float, default=3.0, help="time spent on each trial")
+    tp.add_argument("--docs", type=int, default=32, help="size of the synthetic workload")
+    tp.add_argument("--dry-run", action="store_true", help="print the profile without saving it")
+
+    args = ap.parse_args(argv)
+    if args.command == "scan" and args.verdict and args.resume:
+        sp.error("--resume can't be combined with --verdict: verdict runs don't keep a journal")
+    cfg = load_config(args.config)
+    setup_logging(cfg)
+
+    if args.command == "tune":
+        return cmd_tune(cfg, args)
+    if args.command == "watch":
+        return cmd_watch(cfg, args)
+    if args.command == "sample":
+        from .sample import run_sample
+        print("Report written to", run_sample(cfg, iter_targets(cfg), seed=args.seed,
+                                              budget_mb=args.budget_mb, budget_seconds=args.budget_seconds))
+        return
+    if args.command == "serve":
+        from .daemon import serve
+        return _run_with_metrics(cfg, args, lambda metrics: serve(cfg, args.host, args.port, args.unix_socket, metrics))
+    if args.command in ("coordinate", "work", "collect"):
+        return cmd_queue(cfg, args)
+    if args.command is None:
+        args = sp.parse_args([])
+    try:
+        return cmd_scan(cfg, args)
+    except UnknownLabels as e:
+        sp.error(str(e))
+
+
+def cmd_tune(cfg, args):
+    prof = tune(cfg.get("model_dir", "model"), seconds=args.seconds, n_docs=args.docs,
+                doc_batch=cfg.get("doc_batch_size", 32))
+    summary = {k: prof[k] for k in ("intra_op_threads", "batch_size", "max_length", "extraction_workers", "docs_per_sec")}
+    print(json.dumps(summary, indent=2))
+    if not args.dry_run:
+        print("Saved profile to", save_profile(prof))
+
+
+def _run_with_metrics(cfg, args, fn):
+    metrics_cfg = cfg.get("metrics", {})
+    metrics_dir = args.metrics_dir or metrics_cfg.get("path")
+    interval = args.metrics_interval if args.metrics_interval is not None else metrics_cfg.get("interval", 0)
+
+    metrics = Metrics() if metrics_dir else NULL
+    dumper = None
+    if metrics_dir and interval:
+        dumper = MetricsDumper(metrics, metrics_dir, interval)
+        dumper.start()
+
+    try:
+        return fn(metrics)
+    finally:
+        if dumper is not None:
+            dumper.stop()
+        elif metrics_dir:
+            metrics.dump(metrics_dir)
+
+
+def cmd_scan(cfg, args):
+    if args.verdict:
+        labels = args.labels.split(",") if args.labels else None
+        out_path = _run_with_metrics(cfg, args, lambda metrics: run_verdicts(cfg, iter_targets(cfg, metrics), metrics, labels))
+        print("Verdicts written to", out_path)
+        return
+    out_path = _run_with_metrics(cfg, args, lambda metrics: run_scan(cfg, iter_targets(cfg, metrics), metrics, args.resume))
+    print("Findings written to", out_path)
+
+
+def cmd_watch(cfg, args):
+    from .watch import watch
+    out_path = _run_with_metrics(cfg, args, lambda metrics: watch(cfg, metrics, polling=args.polling))
+    print("Findings written to", out_path)
+
+
+def cmd_queue(cfg, args):
+    from . import workqueue
+    if args.command == "work":
+        n = _run_with_metrics(cfg, args, lambda metrics: workqueue.run_worker(cfg, args.queue, metrics))
+        print("Committed", n, "files")
+        return
+    if args.command == "coordinate":
+        out_path = workqueue.coordinate(cfg, args.queue, iter_targets(cfg), wait=args.wait)
+        if out_path is None:
+            print(f"Queued; start workers with `work --queue {args.queue}`")
+            return
+    else:
+        out_path = workqueue.collect(cfg, args.queue)
+    print("Findings written to", out_path)
+
+
+if __name__ == "__main__":
+    use_interpreter()
+    main()
@@ -0,0 +1,256 @@
+# throttle.py (bound what a scan takes from the host: CPU share, read bandwidth, priority)
+import logging, os, sys, threading, time
+
+from .metrics import NULL
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; without it, priorities fall back to os.nice and load to /proc/stat
+    psutil = None
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Read bandwidth limit. consume(n) blocks until n bytes are allowed. A request bigger than the
+    bucket is let through and paid back afterwards (the bucket goes negative), so one large file
+    can't stall the scan forever but still costs its full share of time.
+    """
+
+    def __init__(self, rate, burst=None):
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self.tokens = self.burst
+        self.stamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, n):
+        """Take n tokens; returns the seconds spent waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+            self.stamp = now
+            self.tokens -= n
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait:
+            time.sleep(wait)
+        return wait
+
+
+def own_cpu():
+    """
+    CPU seconds used so far by this process (every thread) and its child processes: the Watchdog
+    extraction workers while they run (limits.isolate), plus those that have exited and been reaped.
+    """
+    live = _children_cpu()  # before os.times(), so a worker reaped in between is never missed
+    t = os.times()
+    return t.user + t.system + t.children_user + t.children_system + live
+
+def _children_cpu():
+    """CPU seconds of the child processes still running."""
+    if psutil is not None:
+        total = 0.0
+        try:
+            children = psutil.Process().children(recursive=True)
+        except psutil.Error:
+            return 0.0
+        for c in children:
+            try:
+                t = c.cpu_times()
+            except psutil.Error:
+                continue
+            total += t.user + t.system
+        return total
+    try:
+        tasks = os.listdir("/proc/self/task")
+    except OSError:
+        return 0.0
+    hz = os.sysconf("SC_CLK_TCK")
+    total = 0.0
+    for tid in tasks:
+        try:
+            with open(f"/proc/self/task/{tid}/children") as f:
+                pids = f.read().split()
+        except OSError:
+            continue
+        for pid in pids:
+            try:
+                with open(f"/proc/{pid}/stat") as f:
+                    fields = f.read().rsplit(")", 1)[1].split()
+            except (OSError, IndexError):
+                continue
+            total += (int(fields[11]) + int(fields[12])) / hz  # utime stime
+    return total
+
+
+class OtherCpu:
+    """Fraction of the machine's CPU used by other processes (not ours, nor our workers) since the previous sample."""
+
+    def __init__(self):
+        self.cpus = os.cpu_count() or 1
+        self.prev = self._sample()
+
+    def _sample(self):
+        own = own_cpu()
+        if psutil is not None:
+            t = psutil.cpu_times()
+            return t.user + t.system + getattr(t, "nice", 0.0), sum(t), own
+        try:
+            with open("/proc/stat") as f:
+                vals = [float(v) for v in f.readline().split()[1:]]
+        except (OSError, ValueError):
+            return None
+        hz = os.sysconf("SC_CLK_TCK")
+        busy = vals[0] + vals[1] + vals[2] + sum(vals[5:8])  # user nice system irq softirq steal
+        return busy / hz, sum(vals[:8]) / hz, own
+
+    def __call__(self):
+        cur = self._sample()
+        if cur is None or self.prev is None:
+            return None
+        (busy0, total0, own0), (busy1, total1, own1) = self.prev, cur
+        self.prev = cur
+        if total1 <= total0:
+            return None
+        # total is summed over all cores, own is our CPU time with our workers'; both are core-seconds
+        return max(0.0, ((busy1 - busy0) - (own1 - own0)) / (total1 - total0))
+
+
+class Throttle:
+    """
+    Host-friendly limits for a scan, all off by default (see `throttle:` in config.yaml):
+    - cpu_share: fraction of the machine's cores. Caps the ORT/tokenizer/reader thread counts, and after
+      each session.run and each batch of documents sleeps off any CPU time used beyond the share (duty cycle).
+    - read_mb_per_sec: token bucket on bytes read from disk.
+    - nice / ionice: OS scheduling priority for the whole process.
+    - pause_load: pause before the next batch while other processes use more than this fraction of the
+      CPU, until they drop under resume_load.
+    Time spent holding back is counted in the throttle_*_seconds metrics.
+    """
+
+    CHECK_EVERY = 1.0  # seconds between load samples
+
+    def __init__(self, cpu_share=1.0, read_mb_per_sec=0, nice=0, ionice=None, pause_load=0, resume_load=None,
+                 metrics=NULL):
+        self.cpus = os.cpu_count() or 1
+        self.cpu_share = min(max(float(cpu_share), 0.01), 1.0)
+        self.threads = None
+        self.cores = None
+        if self.cpu_share < 1.0:
+            self.cores = self.cpu_share * self.cpus
+            self.threads = max(1, int(self.cores))
+        self._mark = (time.monotonic(), own_cpu())
+        self.bucket = TokenBucket(read_mb_per_sec * 1024 * 1024) if read_mb_per_sec else None
+        self.nice = nice
+        self.ionice = ionice
+        self.pause_load = pause_load
+        self.resume_load = resume_load if resume_load is not None else pause_load * 0.75
+        self.metrics = metrics
+        self._other_cpu = OtherCpu() if pause_load else None
+        self._last_check = 0.0
+
+    @classmethod
+    def from_cfg(cls, cfg, metrics=NULL):
+        """A Throttle for cfg["throttle"], or None when every limit is off."""
+        t = cfg.get("throttle") or {}
+        if not (t.get("cpu_share", 1.0) < 1.0 or t.get("read_mb_per_sec") or t.get("nice")
+                or t.get("ionice") or t.get("pause_load")):
+            return None
+        return cls(t.get("cpu_share", 1.0), t.get("read_mb_per_sec", 0), t.get("nice", 0), t.get("ionice"),
+                   t.get("pause_load", 0), t.get("resume_load"), metrics)
+
+    # --- threads ---
+    def cap_threads(self, n):
+        """A thread count within the CPU share; n=0 means "one per core" and gets the cap itself."""
+        if self.threads is None:
+            return n
+        return self.threads if not n else min(int(n), self.threads)
+
+    # --- between units of work ---
+    def before_run(self):
+        if self._other_cpu is None:
+            return
+        now = time.monotonic()
+        if now - self._last_check < self.CHECK_EVERY:
+            return
+        self._last_check = now
+        load = self._other_cpu()
+        if load is None or load <= self.pause_load:
+            return
+        log.info("Host busy (%.0f%% CPU used by other processes), pausing the scan", load * 100)
+        t0 = time.monotonic()
+        while load is None or load > self.resume_load:
+            time.sleep(self.CHECK_EVERY)
+            load = self._other_cpu()
+        paused = time.monotonic() - t0
+        self.metrics.inc("throttle_pause_seconds", paused)
+        log.info("Resuming after %.1fs", paused)
+        self._last_check = time.monotonic()
+
+    def pace(self):
+        """
+        Sleep until the scan's CPU time since the last call averages out to cpu_share of the host.
+        That is every thread of this process (ORT, tokenizer, readers) and the Watchdog's extraction
+        processes, so the share holds whatever the mix.
+        """
+        if self.cores is None:
+            return
+        now, cpu = time.monotonic(), own_cpu()
+        idle = (cpu - self._mark[1]) / self.cores - (now - self._mark[0])
+        if idle > 0:
+            time.sleep(idle)
+            self.metrics.inc("throttle_cpu_seconds", idle)
+            now = time.monotonic()
+        self._mark = (now, own_cpu())
+
+    # --- reads ---
+    def before_read(self, path, size=None):
+        if self.bucket is None:
+            return
+        if size is None:
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                return
+        waited = self.bucket.consume(size)
+        if waited:
+            self.metrics.inc("throttle_read_seconds", waited)
+
+    # --- process priority ---
+    def apply_priority(self):
+        """Lower this process's CPU and I/O priority. Best effort: failures are logged, not raised."""
+        if self.nice:
+            try:
+                if sys.platform == "win32":
+                    if psutil is None:
+                        raise OSError("psutil is needed to change priority on Windows")
+                    cls = psutil.IDLE_PRIORITY_CLASS if self.nice >= 15 else psutil.BELOW_NORMAL_PRIORITY_CLASS
+                    psutil.Process().nice(cls)
+                else:
+                    os.nice(int(self.nice))
+            except OSError as e:
+                log.warning("Could not lower CPU priority: %s", e)
+        if self.ionice:
+            try:
+                if psutil is None or not hasattr(psutil.Process, "ionice"):
+                    raise OSError("psutil with ionice support is needed to lower I/O priority")
+                p = psutil.Process()
+                if sys.platform == "win32":
+                    p.ionice(psutil.IOPRIO_VERYLOW if self.ionice == "idle" else psutil.IOPRIO_LOW)
+                elif self.ionice == "idle":
+                    p.ionice(psutil.IOPRIO_CLASS_IDLE)
+                else:
+                    p.ionice(psutil.IOPRIO_CLASS_BE, value=7)
+            except (OSError, AttributeError, ValueError) as e:
+                log.warning("Could not lower I/O priority: %s", e)
+
+    def stats(self):
+        return {
+            "cpu_share": self.cpu_share,
+            "thread_cap": self.threads,
+            "read_mb_per_sec": self.bucket.rate / (1024 * 1024) if self.bucket else None,
+            "nice": self.nice,
+            "ionice": self.ionice,
+            "pause_load": self.pause_load,
+        }
@@ -0,0 +1,222 @@
+# tune.py (per-machine throughput profile for batch size, window length and thread counts)
+import hashlib, json, os, platform, random, shutil, socket, tempfile, time
+from pathlib import Path
+
+PROFILE_VERSION = 1
+
+
+# --- profile storage ---
+def profile_dir():
+    try:
+        from platformdirs import user_config_dir
+        return Path(user_config_dir("pii-scanner", appauthor=False))
+    except ImportError:
+        if os.name == "nt":
+            return Path(os.environ.get("LOCALAPPDATA", Path.home())) / "pii-scanner"
+        return Path(os.environ.get("XDG_CONFIG_HOME", Path.home() / ".config")) / "pii-scanner"
+
+def profile_path():
+    # named after the host so a roaming home directory never hands one machine's profile to another
+    return profile_dir() / f"tune-{socket.gethostname()}.json"
+
+def model_fingerprint(model_dir):
+    """Size + hash of the first MB of model.onnx: cheap, and changes whenever the model is swapped."""
+    path = Path(model_dir) / "model.onnx"
+    try:
+        with open(path, "rb") as f:
+            head = f.read(1024 * 1024)
+        return f"{path.stat().st_size}-{hashlib.sha1(head).hexdigest()[:16]}"
+    except OSError:
+        return None
+
+def load_profile(model_dir):
+    """The saved profile for this host and model, or None if there isn't a matching one."""
+    try:
+        prof = json.loads(profile_path().read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if prof.get("version") != PROFILE_VERSION or prof.get("cpus") != os.cpu_count():
+        return None
+    if prof.get("model") != model_fingerprint(model_dir):
+        return None
+    return prof
+
+def save_profile(prof):
+    path = profile_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(prof, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+    return path
+
+
+# --- synthetic workload ---
+FIRST = ["James", "Maria", "Wei", "Aisha", "John", "Olga", "Carlos", "Priya"]
+LAST = ["Smith", "Garcia", "Chen", "Okafor", "Miller", "Ivanova", "Lopez", "Patel"]
+FILLER = [
+    "Meeting notes: finalize the deployment plan next Tuesday; no customer data attached.",
+    "Changelog: refactor module, update dependencies, and improve logging verbosity.",
+    "Reminder: rotate API keys monthly and validate error handling for timeouts.",
+    "2025-03-14T10:05:22Z INFO login ok src=10.0.0.12 req=GET /health",
+]
+
+def synthetic_texts(n, seed=13, target_chars=3000):
+    """Deterministic mix of PII records and filler, sized like typical office documents."""
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        parts = []
+        size = 0
+        while size < target_chars:
+            if rng.random() < 0.5:
+                name = f"{rng.choice(FIRST)} {rng.choice(LAST)}"
+                line = (f"Customer {name} (DOB {rng.randint(1,12):02d}/{rng.randint(1,28):02d}/{rng.randint(1940,2005)}) "
+                        f"SSN {rng.randint(100,899)}-{rng.randint(10,99)}-{rng.randint(1000,9999)}. "
+                        f"Email {name.split()[0].lower()}.{rng.randint(1,99)}@example.com. "
+                        f"Phone ({rng.randint(200,999)}) {rng.randint(200,999)}-{rng.randint(1000,9999)}.")
+            else:
+                line = rng.choice(FILLER)
+            parts.append(line)
+            size += len(line) + 1
+        texts.append("\n".join(parts))
+    return texts
+
+
+# --- measurement ---
+def _groups(texts, doc_batch):
+    return [texts[i:i + doc_batch] for i in range(0, len(texts), doc_batch)]
+
+def _throughput(model, texts, seconds, doc_batch=32):
+    """docs/sec and chars/sec of predict_batch over groups of doc_batch texts, the way scans batch documents."""
+    groups = _groups(texts, doc_batch)
+    model.predict_batch(groups[0])  # warm-up
+    docs = chars = 0
+    t0 = time.perf_counter()
+    while True:
+        for g in groups:
+            model.predict_batch(g)
+            docs += len(g)
+            chars += sum(map(len, g))
+            if time.perf_counter() - t0 >= seconds:
+                elapsed = time.perf_counter() - t0
+                return docs / elapsed, chars / elapsed
+
+def _findings(model, texts, doc_batch=32):
+    """What the model finds in `texts`, as one set of (start, end, label id) per text."""
+    out = []
+    for g in _groups(texts, doc_batch):
+        for found in model.predict_batch(g):
+            out.append(set(zip(found["start"].tolist(), found["end"].tolist(), found["label_id"].tolist())))
+    return out
+
+def _pipeline_throughput(model, paths, workers, seconds, doc_batch=32):
+    from .scan import iter_extracted, scan_texts
+    docs = 0
+    t0 = time.perf_counter()
+    while time.perf_counter() - t0 < seconds:
+        batch = []
+        for p, text, _, _ in iter_extracted(paths, workers):
+            batch.append((p, text))
+            if len(batch) >= doc_batch:
+                scan_texts(model, batch)
+                docs += len(batch)
+                batch = []
+        if batch:
+            scan_texts(model, batch)
+            docs += len(batch)
+    return docs / (time.perf_counter() - t0)
+
+def _pow2_upto(n):
+    out = [1]
+    while out[-1] * 2 <= n:
+        out.append(out[-1] * 2)
+    if out[-1] != n:
+        out.append(n)
+    return out
+
+
+def tune(model_dir="model", seconds=3.0, n_docs=32, seed=13, doc_batch=32, log=print):
+    """
+    Coordinate sweep, one knob at a time with the others held at the best value so far:
+    ORT intra-op threads, then batch size, then window length, then reader threads.
+    Documents go through predict_batch doc_batch at a time (cfg doc_batch_size), as in a scan.
+    A window shorter than 512 tokens is only kept if it finds exactly what 512 finds in the workload,
+    since the profile applies it to every later scan. Returns the winning profile (not yet saved).
+    """
+    from .infer import PiiModel
+
+    cpus = os.cpu_count() or 1
+    texts = synthetic_texts(n_docs, seed)
+    best = {"intra_op_threads": 0, "batch_size": 8, "max_length": 512, "extraction_workers": 1}
+    trials = []
+
+    def record(knob, value, docs_per_sec, chars_per_sec=None, **extra):
+        trials.append({"knob": knob, "value": value, "docs_per_sec": round(docs_per_sec, 3), **extra})
+        log(f"  {knob}={value}: {docs_per_sec:.2f} docs/sec" + (f", {chars_per_sec / 1e6:.2f} MB/sec" if chars_per_sec else "")
+            + ("" if extra.get("same_findings", True) else " (findings differ from 512, not used)"))
+
+    log("intra_op_threads")
+    # only the best session so far is kept: at most two are loaded at once on the small hosts this is for
+    model, top = None, -1.0
+    for threads in _pow2_upto(cpus):
+        m = PiiModel(model_dir, batch_size=best["batch_size"], max_length=best["max_length"],
+                     intra_op_threads=threads, use_profile=False)
+        dps, cps = _throughput(m, texts, seconds, doc_batch)
+        record("intra_op_threads", threads, dps, cps)
+        if dps > top:
+            model, top = m, dps
+            best["intra_op_threads"] = threads
+        del m
+
+    log("batch_size")
+    scores = {}
+    for bs in (1, 2, 4, 8, 16, 32):
+        model.batch_size = bs
+        dps, cps = _throughput(model, texts, seconds, doc_batch)
+        record("batch_size", bs, dps, cps)
+        scores[bs] = dps
+    best["batch_size"] = model.batch_size = max(scores, key=scores.get)
+
+    log("max_length")
+    scores = {}
+    reference = _findings(model, texts, doc_batch)  # at 512, the window the model was trained on
+    for L in (128, 256, 384, 512):
+        model.max_length, model.stride = L, min(64, L // 4)
+        dps, cps = _throughput(model, texts, seconds, doc_batch)
+        same = L == 512 or _findings(model, texts, doc_batch) == reference
+        record("max_length", L, dps, cps, same_findings=same)
+        if same:
+            scores[L] = dps
+    best["max_length"] = max(scores, key=scores.get)
+    model.max_length, model.stride = best["max_length"], min(64, best["max_length"] // 4)
+
+    log("extraction_workers")
+    tmp = Path(tempfile.mkdtemp(prefix="pii-tune-"))
+    try:
+        paths = []
+        for i, t in enumerate(texts):
+            p = tmp / f"doc_{i:04d}.txt"
+            p.write_text(t, encoding="utf-8")
+            paths.append(str(p))
+        scores = {}
+        for w in _pow2_upto(min(cpus, 16)):
+            dps = _pipeline_throughput(model, paths, w, seconds, doc_batch)
+            record("extraction_workers", w, dps)
+            scores[w] = dps
+        best["extraction_workers"] = max(scores, key=scores.get)
+        docs_per_sec = scores[best["extraction_workers"]]
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+    return {
+        "version": PROFILE_VERSION,
+        "host": socket.gethostname(),
+        "cpus": cpus,
+        "machine": platform.machine(),
+        "model": model_fingerprint(model.model_dir),
+        "tuned_at": time.time(),
+        **best,
+        "doc_batch_size": doc_batch,
+        "docs_per_sec": round(docs_per_sec, 3),
+        "trials": trials,
+    }
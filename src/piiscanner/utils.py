@@ -2,11 +2,45 @@
 from pathlib import Path
 from docx import Document
 from PyPDF2 import PdfReader
+import numpy as np
 import os
-import os, fnmatch, glob
+import io, os, fnmatch, glob
 
 
 
+# --- findings arrays ---
+# A file's findings travel from decode to output as one structured array instead of a dict per token.
+FINDING_DTYPE = np.dtype([("start", np.int64), ("end", np.int64), ("label_id", np.int16), ("score", np.float32)])
+
+# Base labels (no B-/I-) interned to the small ints stored in label_id
+_LABELS = []
+_LABEL_IDS = {}
+
+def label_id(label: str) -> int:
+    lid = _LABEL_IDS.get(label)
+    if lid is None:
+        lid = _LABEL_IDS[label] = len(_LABELS)
+        _LABELS.append(label)
+    return lid
+
+def label_name(lid: int) -> str:
+    return _LABELS[lid]
+
+def empty_findings():
+    return np.empty(0, dtype=FINDING_DTYPE)
+
+def to_findings_array(findings):
+    """List of finding dicts -> structured array (O/None labels dropped, B-/I- stripped)."""
+    rows = [(int(f["start"]), int(f["end"]), label_id(_base_label(f["label"])), float(f.get("score", 0.0)))
+            for f in findings if f and f.get("label") not in (None, "O")]
+    return np.array(rows, dtype=FINDING_DTYPE) if rows else empty_findings()
+
+def findings_to_dicts(arr, **extra):
+    """Structured array -> list of finding dicts. Only done where findings leave the scanner (JSON, GUI)."""
+    return [{"start": s, "end": e, "label": _LABELS[l], "score": round(sc, 4), **extra}
+            for s, e, l, sc in arr.tolist()]
+
+
 # --- merge helpers ---
 def _base_label(lbl: str) -> str:
     return lbl[2:] if lbl and (lbl.startswith("B-") or lbl.startswith("I-")) else lbl
@@ -17,39 +51,54 @@ def merge_findings(findings, max_gap=0):
     - Strips BIO prefixes (B-/I-) to a plain label before merging.
     - Uses the max confidence of merged fragments.
     - max_gap: allow up to N chars gap between chunks to still merge (0 = only touching/overlap).
+    Takes and returns a FINDING_DTYPE array; a list of dicts is still accepted and gives back dicts.
     """
+    if isinstance(findings, np.ndarray):
+        return merge_findings_array(findings, max_gap)
     if not findings:
         return []
+    return findings_to_dicts(merge_findings_array(to_findings_array(findings), max_gap))
 
-    # normalize & filter
-    norm = []
-    for f in findings:
-        if not f or f.get("label") in (None, "O"):
-            continue
-        norm.append({
-            "start": int(f["start"]),
-            "end": int(f["end"]),
-            "label": _base_label(f["label"]),
-            "score": float(f.get("score", 0.0)),
-        })
-
-    if not norm:
-        return []
+def merge_findings_array(arr, max_gap=0):
+    """
+    Vectorized form of the merge loop: sorted by (start, end), a finding starts a new span when its
+    label differs from the previous one or it starts past the running end of the current span + max_gap.
+    """
+    n = len(arr)
+    if n == 0:
+        return empty_findings()
+    s = arr[np.lexsort((arr["end"], arr["start"]))]
+    start, end, lab = s["start"], s["end"], s["label_id"]
+
+    # runs of the same label in sorted order; a different label in between always splits a span
+    new_run = np.empty(n, dtype=bool)
+    new_run[0] = True
+    np.not_equal(lab[1:], lab[:-1], out=new_run[1:])
+    run = np.cumsum(new_run) - 1
+
+    # running max of `end` that restarts with every run: offset each run above everything before it
+    big = int(end.max()) + 1
+    run_end = np.maximum.accumulate(end + run * big) - run * big
+
+    brk = new_run.copy()
+    brk[1:] |= start[1:] > run_end[:-1] + max_gap
+    firsts = np.flatnonzero(brk)
 
-    norm.sort(key=lambda x: (x["start"], x["end"]))
-    merged = []
-    cur = norm[0]
-    for nxt in norm[1:]:
-        same_label = (nxt["label"] == cur["label"])
-        touching_or_gap = nxt["start"] <= cur["end"] + max_gap  # overlap or within gap
-        if same_label and touching_or_gap:
-            cur["end"] = max(cur["end"], nxt["end"])
-            cur["score"] = max(cur["score"], nxt["score"])  # keep strongest score
-        else:
-            merged.append(cur)
-            cur = nxt
-    merged.append(cur)
-    return merged
+    out = np.empty(len(firsts), dtype=FINDING_DTYPE)
+    out["start"] = start[firsts]
+    out["end"] = np.maximum.reduceat(end, firsts)
+    out["label_id"] = lab[firsts]
+    out["score"] = np.maximum.reduceat(s["score"], firsts)
+    return out
+
+def exclude_globs(cfg):
+    """cfg exclude_globs, plus where the scan writes (output.path, redact.path), so it never scans its own output."""
+    excludes = list(cfg.get("exclude_globs") or [])
+    for root in ((cfg.get("output") or {}).get("path"), (cfg.get("redact") or {}).get("path")):
+        if root:
+            root = glob.escape(os.path.abspath(root))
+            excludes += [root, os.path.join(root, "**")]
+    return excludes
 
 def iter_files(patterns, excludes):
     seen = set()
@@ -71,32 +120,88 @@ def read_any(path):
         return read_pdf(path)
     return ""  # unknown types ignored
 
+def read_bytes(path, data):
+    """read_any for a file whose bytes were already fetched; `path` only picks the format."""
+    if not data:
+        return ""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".txt":
+        # same newline handling as read_text, so offsets match read_txt
+        return data.decode("utf-8", errors="ignore").replace("\r\n", "\n").replace("\r", "\n")
+    if ext == ".docx":
+        doc = Document(io.BytesIO(data))
+        return "\n".join(p.text for p in doc.paragraphs)
+    if ext == ".pdf":
+        pdf = PdfReader(io.BytesIO(data))
+        return "\n".join(page.extract_text() or "" for page in pdf.pages)
+    return ""
+
 
+# The readers raise on files they can't open or parse; callers decide what a failure means
+# (guard.failure gives the file an outcome in the scan output).
 def read_txt(path: str) -> str:
-    try:
-        if(os.path.getsize(path) == 0):
-            return ""
-        else:
-            return Path(path).read_text(encoding="utf-8", errors="ignore")
-    except:
-        pass
+    if(os.path.getsize(path) == 0):
+        return ""
+    return Path(path).read_text(encoding="utf-8", errors="ignore")
 
 def read_docx(path: str) -> str:
-    try:
-        if(os.path.getsize(path) == 0):
-            return ""
-        else:
-            doc = Document(path)
-            return "\n".join(p.text for p in doc.paragraphs)
-    except:
-        pass
+    if(os.path.getsize(path) == 0):
+        return ""
+    doc = Document(path)
+    return "\n".join(p.text for p in doc.paragraphs)
 
 def read_pdf(path: str) -> str:
-    try:
-        if(os.path.getsize(path) == 0):
-            return ""
-        else:
-            pdf = PdfReader(path)
-            return "\n".join(page.extract_text() or "" for page in pdf.pages)
-    except Exception:
-        return ""  # unreadable PDFs just return empty
\ No newline at end of file
+    if(os.path.getsize(path) == 0):
+        return ""
+    pdf = PdfReader(path)
+    return "\n".join(page.extract_text() or "" for page in pdf.pages)
+
+# --- low-memory reading ---
+def iter_text_chunks(path, chunk_chars=1_000_000, overlap=512):
+    """
+    Yield (offset, text) pieces of a file's text without holding all of it at once.
+    Offsets match what read_any would return, and consecutive pieces overlap by `overlap`
+    chars so a span on a boundary is seen whole in one of them.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".txt":
+        yield from _txt_chunks(path, chunk_chars, overlap)
+    elif ext == ".pdf":
+        yield from _joined_chunks((page.extract_text() or "" for page in PdfReader(path).pages), chunk_chars, overlap)
+    elif ext == ".docx":
+        yield from _joined_chunks((p.text for p in Document(path).paragraphs), chunk_chars, overlap)
+
+def _txt_chunks(path, chunk_chars, overlap):
+    offset = 0
+    tail = ""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        while True:
+            piece = f.read(chunk_chars)
+            if not piece:
+                break
+            yield offset - len(tail), tail + piece
+            offset += len(piece)
+            tail = piece[-overlap:] if overlap else ""
+
+def _joined_chunks(parts, chunk_chars, overlap):
+    # Same text as "\n".join(parts), cut into pieces of about chunk_chars
+    buf = []
+    size = 0
+    start = 0
+    first = True
+    fresh = False
+    for part in parts:
+        if not first:
+            buf.append("\n"); size += 1
+        first = False
+        buf.append(part); size += len(part)
+        fresh = True
+        if size >= chunk_chars:
+            text = "".join(buf)
+            yield start, text
+            keep = text[-overlap:] if overlap else ""
+            start += len(text) - len(keep)
+            buf, size = [keep], len(keep)
+            fresh = False
+    if fresh:
+        yield start, "".join(buf)
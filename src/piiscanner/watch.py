@@ -0,0 +1,243 @@
+# watch.py (keep scanning the configured targets as files are created or modified)
+import fnmatch, logging, os, queue, re, threading, time
+
+from .metrics import NULL
+from .utils import exclude_globs
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # watchdog is optional, polling works everywhere
+    Observer = None
+
+log = logging.getLogger(__name__)
+
+WILDCARDS = re.compile(r"[*?\[]")
+
+
+# --- which files we care about ---
+def watch_roots(patterns):
+    """The directories to watch: the part of each target pattern before its first wildcard."""
+    roots = []
+    for pat in patterns:
+        parts = re.split(r"[\\/]", pat)
+        fixed = []
+        for part in parts[:-1]:
+            if WILDCARDS.search(part):
+                break
+            fixed.append(part)
+        root = os.sep.join(fixed) or os.sep
+        if root.endswith(":"):  # bare drive letter
+            root += os.sep
+        if os.path.isdir(root):
+            roots.append(os.path.normpath(root))
+    # a root inside another root is already covered
+    roots = sorted(set(roots), key=len)
+    out = []
+    for r in roots:
+        if not any(r == o or r.startswith(o.rstrip(os.sep) + os.sep) for o in out):
+            out.append(r)
+    return out
+
+def _fnmatch(path, pat):
+    # glob's "**/" also matches no directory at all; fnmatch needs that spelled out
+    return fnmatch.fnmatch(path, pat) or ("**" in pat and fnmatch.fnmatch(path, re.sub(r"\*\*[\\/]", "", pat)))
+
+def matches(path, patterns, excludes):
+    norm = path.replace("/", os.sep).replace("\\", os.sep)
+    pats = [p.replace("/", os.sep).replace("\\", os.sep) for p in patterns]
+    exs = [e.replace("/", os.sep).replace("\\", os.sep) for e in excludes]
+    if any(_fnmatch(norm, ex) for ex in exs):
+        return False
+    return any(_fnmatch(norm, pat) for pat in pats)
+
+
+# --- debouncing ---
+class Debouncer:
+    """
+    Holds a path back until it has been quiet for `quiet` seconds, so a burst of writes to one file
+    is scanned once. A file that never goes quiet (a growing log) is still released after `max_delay`.
+    """
+
+    def __init__(self, quiet=2.0, max_delay=30.0):
+        self.quiet = quiet
+        self.max_delay = max_delay
+        self.first = {}
+        self.last = {}
+
+    def add(self, path, now=None):
+        now = time.monotonic() if now is None else now
+        self.first.setdefault(path, now)
+        self.last[path] = now
+
+    def _deadline(self, path):
+        return min(self.last[path] + self.quiet, self.first[path] + self.max_delay)
+
+    def due(self, now=None):
+        """Paths ready to scan; they are forgotten until the next event."""
+        now = time.monotonic() if now is None else now
+        ready = [p for p in self.last if self._deadline(p) <= now]
+        for p in ready:
+            del self.first[p], self.last[p]
+        return ready
+
+    def next_due(self, now=None):
+        """Seconds until the next path is ready, or None when nothing is pending."""
+        if not self.last:
+            return None
+        now = time.monotonic() if now is None else now
+        return max(0.0, min(self._deadline(p) for p in self.last) - now)
+
+    def __len__(self):
+        return len(self.last)
+
+
+# --- event sources ---
+class PollingWatcher:
+    """
+    Fallback for when watchdog isn't installed: re-stats the tree every `interval` seconds and
+    reports files whose size or mtime changed. Files already there at start() are not reported.
+    """
+
+    def __init__(self, roots, events, interval=5.0):
+        self.roots = roots
+        self.events = events
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = None
+        self.seen = {}
+
+    def snapshot(self):
+        snap = {}
+        for root in self.roots:
+            for dirpath, _, files in os.walk(root):
+                for f in files:
+                    p = os.path.join(dirpath, f)
+                    try:
+                        st = os.stat(p)
+                    except OSError:
+                        continue
+                    snap[p] = (st.st_mtime_ns, st.st_size)
+        return snap
+
+    def poll(self):
+        snap = self.snapshot()
+        for p, sig in snap.items():
+            if self.seen.get(p) != sig:
+                self.events.put(p)
+        self.seen = snap
+
+    def start(self):
+        self.seen = self.snapshot()
+        self._thread = threading.Thread(target=self._run, name="pii-watch-poll", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+
+if Observer is not None:
+    class _Handler(FileSystemEventHandler):
+        def __init__(self, events):
+            self.events = events
+
+        def on_created(self, event):
+            if not event.is_directory:
+                self.events.put(event.src_path)
+
+        def on_modified(self, event):
+            if not event.is_directory:
+                self.events.put(event.src_path)
+
+        def on_moved(self, event):
+            if not event.is_directory:
+                self.events.put(event.dest_path)
+
+
+class EventWatcher:
+    """Native change notifications through watchdog (inotify on Linux, ReadDirectoryChangesW on Windows)."""
+
+    def __init__(self, roots, events):
+        self.observer = Observer()
+        handler = _Handler(events)
+        for root in roots:
+            self.observer.schedule(handler, root, recursive=True)
+
+    def start(self):
+        self.observer.start()
+
+    def stop(self):
+        self.observer.stop()
+        self.observer.join()
+
+
+def make_watcher(roots, events, poll_interval=5.0, polling=False):
+    if Observer is not None and not polling:
+        try:
+            return EventWatcher(roots, events)
+        except OSError as e:  # e.g. out of inotify watches
+            log.warning("Native file events unavailable (%s), falling back to polling", e)
+    return PollingWatcher(roots, events, poll_interval)
+
+
+# --- the loop ---
+def watch(cfg, metrics=NULL, stop=None, polling=False):
+    """
+    Scan created and modified files under the configured targets until `stop` is set (or Ctrl+C).
+    The model is loaded once; paths that become due together are scanned as one batch.
+    Returns the output path.
+    """
+    from .guard import extractor
+    from .scan import attach_governor, build_model, extraction_workers, output_path, scan_into
+
+    wcfg = cfg.get("watch", {})
+    patterns = cfg.get("targets", [])
+    excludes = exclude_globs(cfg)  # never the scan's own output or redacted copies
+    roots = watch_roots(patterns)
+    if not roots:
+        raise ValueError("None of the configured targets has an existing directory to watch")
+    stop = stop or threading.Event()
+
+    model = build_model(cfg, metrics)
+    governor = attach_governor(cfg, model)
+    reader = extractor(cfg, extraction_workers(cfg, model), metrics)  # kept for the whole watch
+    events = queue.Queue()
+    watcher = make_watcher(roots, events, wcfg.get("poll_interval", 5.0), polling or wcfg.get("polling", False))
+    debouncer = Debouncer(wcfg.get("debounce", 2.0), wcfg.get("max_delay", 30.0))
+    out_path = output_path(cfg, "watch")
+    log.info("Watching %s with %s", roots, type(watcher).__name__)
+
+    watcher.start()
+    try:
+        with open(out_path, "a", encoding="utf-8") as out:
+            while not stop.is_set():
+                wait = debouncer.next_due()
+                try:
+                    p = events.get(timeout=min(1.0, wait) if wait is not None else 1.0)
+                    while True:
+                        if matches(p, patterns, excludes):
+                            debouncer.add(p)
+                        p = events.get_nowait()
+                except queue.Empty:
+                    pass
+
+                ready = [p for p in debouncer.due() if os.path.isfile(p)]
+                if ready:
+                    t0 = time.perf_counter()
+                    scan_into(cfg, model, ready, out, metrics, governor, reader=reader)
+                    out.flush()
+                    metrics.inc("watch_batches")
+                    metrics.inc("watch_files", len(ready))
+                    log.info("Scanned %d changed file(s) in %.2fs", len(ready), time.perf_counter() - t0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.stop()
+        reader.close()
+    return out_path
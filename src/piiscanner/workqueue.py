@@ -0,0 +1,237 @@
+# workqueue.py (coordinator/worker scanning over a SQLite work queue on a shared filesystem)
+import json, logging, os, socket, sqlite3, time, uuid
+from contextlib import contextmanager
+
+from .guard import ERROR, OK
+from .metrics import NULL
+from .schedule import schedule
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    state TEXT NOT NULL DEFAULT 'todo',   -- todo | leased | done | failed
+    lease TEXT,
+    lease_until REAL,
+    attempts INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS files_state ON files (state, id);
+CREATE TABLE IF NOT EXISTS results (
+    file_id INTEGER PRIMARY KEY REFERENCES files (id),
+    findings TEXT NOT NULL,
+    worker TEXT,
+    ts REAL,
+    outcome TEXT   -- JSON of the file's outcome record when it wasn't scanned ok, else NULL
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+
+class WorkQueue:
+    """
+    Durable file queue in one SQLite database, shared by a coordinator and any number of workers.
+    - The coordinator add()s paths and then marks enumeration finished.
+    - A worker lease()s a batch: the rows get a fresh lease id and an expiry. A worker that dies just lets
+      its lease run out, and the files go back to whoever leases next (up to max_attempts, then 'failed').
+    - commit() stores results only for rows still held under that lease, in one transaction, so a file is
+      never recorded twice even when a slow worker's lease was taken over.
+    The default rollback journal is used rather than WAL, which doesn't work on network filesystems.
+    Paths must mean the same file on every host that runs a worker.
+    """
+
+    def __init__(self, path, timeout=60.0):
+        self.path = str(path)
+        self.db = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    @contextmanager
+    def _tx(self):
+        # IMMEDIATE takes the write lock up front, so two workers can't lease the same rows
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield self.db
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    # --- coordinator ---
+    def add(self, paths, chunk=1000):
+        """Enqueue paths (already queued ones are ignored). Returns how many were new."""
+        added = 0
+        buf = []
+        for p in paths:
+            buf.append((p,))
+            if len(buf) >= chunk:
+                added += self._insert(buf)
+                buf = []
+        if buf:
+            added += self._insert(buf)
+        return added
+
+    def _insert(self, rows):
+        with self._tx() as db:
+            before = db.total_changes
+            db.executemany("INSERT OR IGNORE INTO files (path) VALUES (?)", rows)
+            return db.total_changes - before
+
+    def set_enumerated(self, done=True):
+        with self._tx() as db:
+            db.execute("INSERT OR REPLACE INTO meta VALUES ('enumerated', ?)", ("1" if done else "0",))
+
+    # --- worker ---
+    def lease(self, n, ttl, max_attempts=3):
+        """Up to n files as (lease id, [(file id, path)]); expired leases count as available."""
+        now = time.time()
+        lease = uuid.uuid4().hex
+        with self._tx() as db:
+            db.execute("UPDATE files SET state = 'failed', lease = NULL "
+                       "WHERE state = 'leased' AND lease_until < ? AND attempts >= ?", (now, max_attempts))
+            rows = db.execute("SELECT id, path FROM files WHERE state = 'todo' OR (state = 'leased' AND lease_until < ?) "
+                              "ORDER BY id LIMIT ?", (now, n)).fetchall()
+            db.executemany("UPDATE files SET state = 'leased', lease = ?, lease_until = ?, attempts = attempts + 1 "
+                           "WHERE id = ?", [(lease, now + ttl, fid) for fid, _ in rows])
+        return lease, rows
+
+    def renew(self, lease, ttl):
+        """Push the expiry out while a long batch is still being worked on. False if the lease was lost."""
+        with self._tx() as db:
+            return db.execute("UPDATE files SET lease_until = ? WHERE lease = ? AND state = 'leased'",
+                              (time.time() + ttl, lease)).rowcount > 0
+
+    def commit(self, lease, results, worker=None):
+        """
+        results: {file id: list of finding dicts, or (list, outcome record)}. Rows that are no longer ours are skipped.
+        Returns the number of files committed.
+        """
+        now = time.time()
+        committed = 0
+        with self._tx() as db:
+            for fid, findings in results.items():
+                findings, outcome = findings if isinstance(findings, tuple) else (findings, OK)
+                if db.execute("UPDATE files SET state = 'done', lease = NULL WHERE id = ? AND lease = ?",
+                              (fid, lease)).rowcount:
+                    db.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)",
+                               (fid, json.dumps(findings), worker, now, None if outcome is OK else json.dumps(outcome)))
+                    committed += 1
+        return committed
+
+    # --- progress ---
+    def counts(self):
+        rows = self.db.execute("SELECT state, COUNT(*) FROM files GROUP BY state").fetchall()
+        return {"todo": 0, "leased": 0, "done": 0, "failed": 0, **dict(rows)}
+
+    def enumerated(self):
+        row = self.db.execute("SELECT value FROM meta WHERE key = 'enumerated'").fetchone()
+        return bool(row and row[0] == "1")
+
+    def finished(self):
+        c = self.counts()
+        return self.enumerated() and c["todo"] == 0 and c["leased"] == 0
+
+    def iter_results(self):
+        """
+        (path, findings, ts, outcome) for files with findings or that weren't scanned ok, in queue order.
+        A file that failed on every attempt has no result row; it comes back as an "error" outcome.
+        """
+        cur = self.db.execute("SELECT f.path, r.file_id, r.findings, r.ts, r.outcome, f.attempts, f.lease_until "
+                              "FROM files f LEFT JOIN results r ON r.file_id = f.id "
+                              "WHERE (r.file_id IS NOT NULL AND (r.findings != '[]' OR r.outcome IS NOT NULL)) "
+                              "OR (r.file_id IS NULL AND f.state = 'failed') ORDER BY f.id")
+        for path, rid, findings, ts, outcome, attempts, lease_until in cur:
+            if rid is None:
+                yield path, [], lease_until, {"outcome": ERROR,
+                                              "detail": f"no worker finished it in {attempts} attempts"}
+            else:
+                yield path, json.loads(findings), ts, (json.loads(outcome) if outcome else OK)
+
+
+def worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def run_worker(cfg, queue_path, metrics=NULL, stop_when_idle=True):
+    """Lease, scan and commit batches until the queue is finished. Returns the number of files committed."""
+    from .guard import extractor
+    from .scan import attach_governor, build_model, extraction_workers, iter_scan
+    from .utils import findings_to_dicts
+
+    qcfg = cfg.get("queue", {})
+    n, ttl = qcfg.get("lease_files", 64), qcfg.get("lease_seconds", 300)
+    max_attempts = qcfg.get("max_attempts", 3)
+    poll = qcfg.get("poll_interval", 2.0)
+
+    q = WorkQueue(queue_path)
+    model = build_model(cfg, metrics)
+    governor = attach_governor(cfg, model)
+    reader = extractor(cfg, extraction_workers(cfg, model), metrics)
+    me = worker_id()
+    total = 0
+    try:
+        while True:
+            lease, rows = q.lease(n, ttl, max_attempts)
+            if not rows:
+                if q.finished() and stop_when_idle:
+                    break
+                time.sleep(poll)
+                continue
+            ids = {path: fid for fid, path in rows}
+            results = {}
+            renewed = time.monotonic()
+            for path, merged, outcome in iter_scan(cfg, model, [p for _, p in rows], metrics, governor, reader):
+                results[ids[path]] = (findings_to_dicts(merged), outcome)
+                if time.monotonic() - renewed > ttl / 3:
+                    if not q.renew(lease, ttl):
+                        log.warning("Lease %s expired while scanning; its files will be committed by another worker", lease)
+                        break
+                    renewed = time.monotonic()
+            committed = q.commit(lease, results, me)
+            metrics.inc("queue_files_committed", committed)
+            total += committed
+            log.info("%s committed %d/%d files", me, committed, len(rows))
+    finally:
+        q.close()
+        reader.close()
+    return total
+
+
+def coordinate(cfg, queue_path, paths, wait=False, metrics=NULL):
+    """Enqueue `paths`; with wait=True, also wait for the workers and write the findings file. Returns it or None."""
+    q = WorkQueue(queue_path)
+    try:
+        q.set_enumerated(False)
+        added = q.add(schedule(cfg, paths))  # workers lease in queue order
+        q.set_enumerated(True)
+        log.info("Queued %d new files in %s", added, queue_path)
+        if not wait:
+            return None
+        poll = cfg.get("queue", {}).get("poll_interval", 2.0)
+        while not q.finished():
+            log.info("Queue: %s", q.counts())
+            time.sleep(poll)
+    finally:
+        q.close()
+    return collect(cfg, queue_path)
+
+
+def collect(cfg, queue_path):
+    """Write the queue's results as a normal scan-*.jsonl findings file. Returns its path."""
+    from .scan import output_path
+
+    q = WorkQueue(queue_path)
+    out_path = output_path(cfg, "scan")
+    try:
+        with open(out_path, "w", encoding="utf-8") as out:
+            for path, findings, ts, outcome in q.iter_results():
+                out.write(json.dumps({"ts": ts, "file": path, "findings": findings, **outcome}) + "\n")
+        counts = q.counts()
+        if counts["failed"]:
+            log.warning("%d files failed on every attempt, written with outcome error", counts["failed"])
+    finally:
+        q.close()
+    return out_path
@@ -0,0 +1,280 @@
+"""
+Performance benchmarks for the scan path.
+
+Every stage is timed on its own against a deterministic corpus built with the
+generate_synthetic_pii_v3 generators, so a slowdown shows up in the stage that caused it.
+
+Usage:
+    python tests/benchmarks.py                         # run, write bench_results.json, compare to baseline
+    python tests/benchmarks.py --docs 50 --quick       # smaller corpus / grid
+    python tests/benchmarks.py --save-baseline         # store this run as the new baseline
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+PROJECT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT / "src"))
+sys.path.insert(0, str(PROJECT / "MLTraining" / "scripts"))
+
+import numpy as np
+
+import generate_synthetic_pii_v3 as gen
+from piiscanner.infer import PiiModel
+from piiscanner.scan import scan_file, walk_dir
+from piiscanner.utils import merge_findings, read_txt, read_docx, read_pdf
+
+DEFAULT_BASELINE = Path(__file__).parent / "bench_baseline.json"
+
+# metric name suffix -> True when bigger is better
+HIGHER_IS_BETTER = {"_per_sec": True, "_ms": False}
+
+
+# -----------------------------
+# Corpus
+# -----------------------------
+def build_corpus(out_dir: Path, n_docs: int, seed: int, positive_rate=0.55):
+    """Write n_docs synthetic documents as .txt, .docx and .pdf. Same seed -> same bytes of text."""
+    from faker import Faker
+    random.seed(seed); Faker.seed(seed)
+    fake = Faker("en_US")
+    style_map = {
+        "SSN": gen.ssn_styles(5),
+        "PHONE": gen.phone_styles(6),
+        "EMAIL": gen.email_styles(6),
+        "DOB": gen.dob_styles(5),
+        "ADDRESS": gen.address_styles(4),
+        "CREDIT_CARD": gen.cc_styles(4),
+        "IP_ADDRESS": gen.ip_styles(3),
+    }
+
+    texts = []
+    for _ in range(n_docs):
+        if random.random() < positive_rate:
+            text, _ = gen.build_positive(fake, style_map)
+        else:
+            text, _ = gen.build_negative(fake)
+        # pad out to something closer to a real document
+        while len(text) < 1500:
+            extra, _ = gen.build_positive(fake, style_map) if random.random() < positive_rate else gen.build_negative(fake)
+            text += extra
+        texts.append(text)
+
+    files = {"txt": [], "docx": [], "pdf": []}
+    for i, text in enumerate(texts):
+        sub = out_dir / f"dir_{i % 8}"
+        sub.mkdir(parents=True, exist_ok=True)
+        p = sub / f"doc_{i:06d}.txt"
+        p.write_text(text, encoding="utf-8")
+        files["txt"].append(str(p))
+
+    try:
+        from docx import Document
+        for i, text in enumerate(texts[: max(1, n_docs // 4)]):
+            p = out_dir / "docx" / f"doc_{i:06d}.docx"
+            p.parent.mkdir(parents=True, exist_ok=True)
+            doc = Document()
+            for line in text.splitlines():
+                doc.add_paragraph(line)
+            doc.save(str(p))
+            files["docx"].append(str(p))
+    except ImportError:
+        pass
+
+    try:
+        from reportlab.lib.pagesizes import letter
+        from reportlab.pdfgen import canvas
+        for i, text in enumerate(texts[: max(1, n_docs // 4)]):
+            p = out_dir / "pdf" / f"doc_{i:06d}.pdf"
+            p.parent.mkdir(parents=True, exist_ok=True)
+            c = canvas.Canvas(str(p), pagesize=letter)
+            y = 750
+            for line in text.splitlines():
+                c.drawString(40, y, line[:110])
+                y -= 14
+                if y < 40:
+                    c.showPage(); y = 750
+            c.save()
+            files["pdf"].append(str(p))
+    except ImportError:
+        pass
+
+    return texts, files
+
+
+# -----------------------------
+# Timing helpers
+# -----------------------------
+def timed(fn, repeat=1):
+    """Run fn `repeat` times, return (last result, list of seconds)."""
+    times = []
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        times.append(time.perf_counter() - t0)
+    return out, times
+
+def pct(times, q):
+    return float(np.percentile(np.asarray(times) * 1000.0, q))
+
+
+# -----------------------------
+# Stages
+# -----------------------------
+def bench_tokenizer(model, texts):
+    encs, times = timed(lambda: [model.encode(t) for t in texts], repeat=3)
+    n_tokens = sum(len(w) for e in encs for w in e["input_ids"])
+    best = min(times)
+    _, batch_times = timed(lambda: model.encode_batch(texts), repeat=3)
+    return {
+        "tokenizer.docs_per_sec": len(texts) / best,
+        "tokenizer.tokens_per_sec": n_tokens / best,
+        "tokenizer_batch.docs_per_sec": len(texts) / min(batch_times),
+        "tokenizer_batch.tokens_per_sec": n_tokens / min(batch_times),
+    }, encs
+
+def bench_session_run(model, batch_sizes, seq_lens, repeat):
+    out = {}
+    vocab = model.tok.vocab_size
+    rng = np.random.default_rng(0)
+    for L in seq_lens:
+        for b in batch_sizes:
+            inputs = {
+                "input_ids": rng.integers(1000, vocab, size=(b, L), dtype=np.int64),
+                "attention_mask": np.ones((b, L), dtype=np.int64),
+            }
+            model.session.run(None, inputs)  # warm-up
+            _, times = timed(lambda: model.session.run(None, inputs), repeat=repeat)
+            key = f"session_run.b{b}.L{L}"
+            out[f"{key}.p50_ms"] = pct(times, 50)
+            out[f"{key}.p95_ms"] = pct(times, 95)
+            out[f"{key}.tokens_per_sec"] = (b * L) / float(np.median(times))
+    return out
+
+def bench_postprocess(model, encs):
+    logits = [model.run(e) for e in encs]
+    findings, times = timed(lambda: [model.decode(e, l) for e, l in zip(encs, logits)], repeat=3)
+    n_tokens = sum(len(w) for e in encs for w in e["input_ids"])
+    return {"postprocess.tokens_per_sec": n_tokens / min(times)}, findings
+
+def bench_merge(findings, merge_gap):
+    n = sum(len(f) for f in findings)
+    _, times = timed(lambda: [merge_findings(f, max_gap=merge_gap) for f in findings], repeat=5)
+    return {"merge.findings_per_sec": n / min(times) if n else 0.0}
+
+def bench_readers(files):
+    out = {}
+    for kind, reader in (("txt", read_txt), ("docx", read_docx), ("pdf", read_pdf)):
+        paths = files.get(kind) or []
+        if not paths:
+            continue
+        size = sum(os.path.getsize(p) for p in paths)
+        _, times = timed(lambda: [reader(p) for p in paths], repeat=3)
+        best = min(times)
+        out[f"read_{kind}.files_per_sec"] = len(paths) / best
+        out[f"read_{kind}.mb_per_sec"] = size / (1024 * 1024) / best
+    return out
+
+def bench_walk(root, excludes):
+    paths, times = timed(lambda: list(walk_dir(str(root), excludes)), repeat=5)
+    return {"walk.files_per_sec": len(paths) / min(times)}
+
+def bench_end_to_end(model, paths, merge_gap):
+    size = sum(os.path.getsize(p) for p in paths)
+    _, times = timed(lambda: [scan_file(model, p, merge_gap) for p in paths], repeat=1)
+    return {
+        "end_to_end.docs_per_sec": len(paths) / times[0],
+        "end_to_end.mb_per_sec": size / (1024 * 1024) / times[0],
+    }
+
+
+# -----------------------------
+# Baseline comparison
+# -----------------------------
+def compare(results, baseline, tolerance):
+    """Return a list of (metric, baseline, current, change) for metrics that got worse than tolerance."""
+    regressions = []
+    for key, cur in results.items():
+        base = baseline.get(key)
+        if not base:
+            continue
+        higher = next((v for suf, v in HIGHER_IS_BETTER.items() if key.endswith(suf)), True)
+        change = (cur - base) / base
+        if (higher and change < -tolerance) or (not higher and change > tolerance):
+            regressions.append((key, base, cur, change))
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--docs", type=int, default=200)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--model_dir", default="model")
+    ap.add_argument("--merge_gap", type=int, default=2)
+    ap.add_argument("--quick", action="store_true", help="smaller session.run grid")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    ap.add_argument("--tolerance", type=float, default=0.15, help="allowed relative slowdown before a metric counts as a regression")
+    ap.add_argument("--save-baseline", action="store_true")
+    args = ap.parse_args()
+
+    model = PiiModel(model_dir=args.model_dir)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        texts, files = build_corpus(root, args.docs, args.seed)
+
+        results = {}
+        r, encs = bench_tokenizer(model, texts); results.update(r)
+        if args.quick:
+            results.update(bench_session_run(model, [1, 8], [128, 512], repeat=5))
+        else:
+            results.update(bench_session_run(model, [1, 4, 8, 16], [64, 128, 256, 512], repeat=10))
+        r, findings = bench_postprocess(model, encs); results.update(r)
+        results.update(bench_merge(findings, args.merge_gap))
+        results.update(bench_readers(files))
+        results.update(bench_walk(root, []))
+        results.update(bench_end_to_end(model, files["txt"], args.merge_gap))
+
+    report = {
+        "meta": {
+            "ts": time.time(),
+            "docs": args.docs,
+            "seed": args.seed,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpus": os.cpu_count(),
+        },
+        "results": results,
+    }
+    Path(args.out).write_text(json.dumps(report, indent=2))
+    print(json.dumps(results, indent=2))
+    print("Wrote", args.out)
+
+    if args.save_baseline:
+        Path(args.baseline).write_text(json.dumps(report, indent=2))
+        print("Saved baseline to", args.baseline)
+        return 0
+
+    if not Path(args.baseline).exists():
+        print("No baseline at", args.baseline, "- run with --save-baseline to create one")
+        return 0
+
+    baseline = json.loads(Path(args.baseline).read_text())["results"]
+    regressions = compare(results, baseline, args.tolerance)
+    for key, base, cur, change in regressions:
+        print(f"REGRESSION {key}: {base:.3f} -> {cur:.3f} ({change:+.1%})")
+    if not regressions:
+        print("No regressions against baseline")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
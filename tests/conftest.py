@@ -0,0 +1,78 @@
+import io
+import shutil
+import zipfile
+from pathlib import Path
+
+import pytest
+
+MODEL_DIR = Path(__file__).parent.parent / "src" / "piiscanner" / "model"
+
+
+@pytest.fixture(scope="session")
+def tiny_model_dir(tmp_path_factory):
+    """
+    The bundled tokenizer and label map with a tiny stand-in model.onnx
+    (token id -> fixed logits), so the scan path can run without the real weights.
+    """
+    np = pytest.importorskip("numpy")
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("transformers")
+    from onnx import TensorProto, helper, numpy_helper
+
+    out = tmp_path_factory.mktemp("tiny_model")
+    for name in ("config.json", "id2label.json", "special_tokens_map.json",
+                 "tokenizer.json", "tokenizer_config.json", "vocab.txt"):
+        shutil.copy(MODEL_DIR / name, out / name)
+
+    # mostly "O", like a real document; every 7th vocab id is confidently one of the PII labels
+    table = np.zeros((30522, 17), dtype=np.float32)
+    table[:, 0] = 5.0
+    ids = np.arange(0, 30522, 7)
+    table[ids, 1 + ids % 16] = 10.0
+    graph = helper.make_graph(
+        [helper.make_node("Gather", ["table", "input_ids"], ["logits"], axis=0)],
+        "tiny",
+        [helper.make_tensor_value_info("input_ids", TensorProto.INT64, ["batch", "seq"]),
+         helper.make_tensor_value_info("attention_mask", TensorProto.INT64, ["batch", "seq"])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["batch", "seq", 17])],
+        [numpy_helper.from_array(table, "table")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    onnx.save(model, str(out / "model.onnx"))
+    return out
+
+
+@pytest.fixture(scope="session")
+def qapp():
+    """One QApplication for the GUI tests, on the offscreen platform (no display needed)."""
+    import os
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    widgets = pytest.importorskip("PySide6.QtWidgets")
+    return widgets.QApplication.instance() or widgets.QApplication([])
+
+
+@pytest.fixture
+def docx_bomb():
+    """
+    make(path, paragraphs): a small .docx whose document.xml expands to `paragraphs` paragraphs,
+    slow and memory hungry to parse. Returns the path as a str.
+    """
+    docx = pytest.importorskip("docx")
+
+    def make(path, paragraphs):
+        buf = io.BytesIO()
+        docx.Document().save(buf)
+        src = zipfile.ZipFile(buf)
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+            for item in src.infolist():
+                data = src.read(item.filename)
+                if item.filename == "word/document.xml":
+                    xml = data.decode("utf-8")
+                    i = xml.index("<w:body>") + len("<w:body>")
+                    data = (xml[:i] + "<w:p><w:r><w:t>x</w:t></w:r></w:p>" * paragraphs + xml[i:]).encode("utf-8")
+                z.writestr(item, data)
+        return str(path)
+
+    return make
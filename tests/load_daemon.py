@@ -0,0 +1,104 @@
+"""
+Load test for the scan daemon (piiscanner.daemon).
+
+Starts a daemon in this process (or uses one that is already running) and keeps --clients
+concurrent keep-alive connections busy with synthetic documents for --seconds, then reports
+throughput and client-side p50/p99 latency next to the daemon's own batching stats.
+
+Usage:
+    python tests/load_daemon.py --model_dir model --clients 32 --seconds 20
+    python tests/load_daemon.py --connect 127.0.0.1:8765            # an already running `scan serve`
+    python tests/load_daemon.py --max-wait-ms 0 --max-batch-docs 1  # no coalescing, for comparison
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+PROJECT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT / "src"))
+
+import numpy as np
+
+from piiscanner.daemon import ScanDaemon, request
+from piiscanner.tune import synthetic_texts
+
+
+async def client(host, port, texts, until, latencies, offset):
+    reader, writer = await asyncio.open_connection(host, port)
+    i = offset
+    try:
+        while time.perf_counter() < until:
+            t0 = time.perf_counter()
+            status, _ = await request(reader, writer, "POST", "/scan/text", {"text": texts[i % len(texts)]})
+            if status != 200:
+                raise RuntimeError(f"daemon answered {status}")
+            latencies.append(time.perf_counter() - t0)
+            i += 1
+    finally:
+        writer.close()
+
+
+async def run(args):
+    daemon = None
+    if args.connect:
+        host, port = args.connect.rsplit(":", 1)
+        port = int(port)
+    else:
+        from piiscanner.infer import PiiModel
+        model = PiiModel(args.model_dir, use_profile=not args.no_profile)
+        cfg = {"merge_gap": 2, "daemon": {"max_batch_docs": args.max_batch_docs, "max_wait_ms": args.max_wait_ms}}
+        daemon = await ScanDaemon(model, cfg).start("127.0.0.1", 0)
+        host, port = daemon.address[:2]
+
+    texts = synthetic_texts(args.docs, args.seed, args.chars)
+    latencies = []
+    t0 = time.perf_counter()
+    until = t0 + args.seconds
+    await asyncio.gather(*(client(host, port, texts, until, latencies, k) for k in range(args.clients)))
+    elapsed = time.perf_counter() - t0
+
+    reader, writer = await asyncio.open_connection(host, port)
+    _, stats = await request(reader, writer, "GET", "/stats")
+    writer.close()
+    if daemon is not None:
+        await daemon.stop()
+
+    lat = np.asarray(latencies) * 1000.0
+    return {
+        "clients": args.clients,
+        "requests": len(latencies),
+        "requests_per_sec": len(latencies) / elapsed,
+        "chars_per_sec": sum(len(texts[i % len(texts)]) for i in range(len(latencies))) / elapsed,
+        "p50_ms": float(np.percentile(lat, 50)) if len(lat) else None,
+        "p99_ms": float(np.percentile(lat, 99)) if len(lat) else None,
+        "daemon": stats,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--model_dir", default="model")
+    ap.add_argument("--no-profile", action="store_true", help="ignore the saved tune profile")
+    ap.add_argument("--connect", default=None, metavar="HOST:PORT", help="load a running daemon instead of starting one")
+    ap.add_argument("--clients", type=int, default=16)
+    ap.add_argument("--seconds", type=float, default=10.0)
+    ap.add_argument("--docs", type=int, default=64, help="distinct request bodies")
+    ap.add_argument("--chars", type=int, default=1000, help="approximate size of each request")
+    ap.add_argument("--seed", type=int, default=13)
+    ap.add_argument("--max-batch-docs", type=int, default=32)
+    ap.add_argument("--max-wait-ms", type=float, default=5)
+    ap.add_argument("--out", default=None, help="also write the report here as JSON")
+    args = ap.parse_args()
+
+    report = asyncio.run(run(args))
+    print(json.dumps(report, indent=2))
+    if args.out:
+        Path(args.out).write_text(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,3 +1,40 @@
+import json
+
+
 def test_first():
     """An initial test for the app."""
     assert 1 + 1 == 2
+
+
+def test_scan_worker_extracts_in_process(qapp, tiny_model_dir, tmp_path, monkeypatch):
+    """The GUI keeps limits.isolate off: no watchdog processes, but the size caps apply and skips are recorded."""
+    from piiscanner import guard
+    from piiscanner.piiscannerapp import ScanWorker
+
+    def no_watchdog(*args, **kwargs):
+        raise AssertionError("the GUI started extraction processes")
+    monkeypatch.setattr(guard, "Watchdog", no_watchdog)
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    (docs / "ok.txt").write_text("Call John Smith at 555-123-4567.", encoding="utf-8")
+    (docs / "big.txt").write_text("Call John Smith at 555-123-4567. " * 2500, encoding="utf-8")
+    out = tmp_path / "out"
+    out.mkdir()
+    cfg = {"model_dir": str(tiny_model_dir), "use_tune_profile": False,
+           "limits": {"isolate": True, "file_seconds": 0.5, "max_file_mb": 64 / 1024}}
+    worker = ScanWorker(cfg, str(out), "", str(docs))
+    assert cfg["limits"]["isolate"] and not worker.cfg["limits"]["isolate"]
+    done, failed, progress, skipped = [], [], [], []
+    worker.done.connect(done.append)
+    worker.failed.connect(failed.append)
+    worker.progress.connect(progress.append)
+    worker.fileSkipped.connect(lambda fname, outcome: skipped.append((fname, outcome["outcome"])))
+    worker.run()  # on this thread; the signals are delivered directly
+
+    assert not failed and len(done) == 1
+    record = json.load(open(done[0]))
+    assert record["findings"] and {f["file"] for f in record["findings"]} == {"ok.txt"}
+    assert [(r["file"], r["outcome"]) for r in record["skipped"]] == skipped == [("big.txt", "too_large")]
+    assert "max_file_mb" in record["skipped"][0]["detail"]
+    assert progress[-1] == 95
@@ -0,0 +1,74 @@
+import asyncio
+
+from piiscanner.daemon import ScanDaemon, request
+from piiscanner.infer import PiiModel
+from piiscanner.utils import findings_to_dicts, merge_findings
+
+
+def test_concurrent_requests_share_batches(tiny_model_dir, tmp_path):
+    model = PiiModel(tiny_model_dir, batch_size=8, use_profile=False)
+    texts = [f"Call John Smith at 555-123-{i:04d}. " * (1 + i % 5) for i in range(40)]
+    (tmp_path / "docs").mkdir()
+    doc = tmp_path / "docs" / "doc.txt"
+    doc.write_text(texts[3], encoding="utf-8")
+    outside = tmp_path / "outside.txt"
+    outside.write_text(texts[3], encoding="utf-8")
+
+    async def main():
+        cfg = {"merge_gap": 2, "daemon": {"max_wait_ms": 50}, "targets": [str(tmp_path / "docs" / "*.txt")]}
+        daemon = await ScanDaemon(model, cfg).start(port=0)
+        host, port = daemon.address[:2]
+
+        async def client(chunk):
+            reader, writer = await asyncio.open_connection(host, port)
+            out = [await request(reader, writer, "POST", "/scan/text", {"text": t}) for t in chunk]
+            writer.close()
+            return out
+
+        replies = await asyncio.gather(*(client(texts[i::8]) for i in range(8)))
+        reader, writer = await asyncio.open_connection(host, port)
+        by_file = await request(reader, writer, "POST", "/scan/file", {"path": str(doc)})
+        refused = [(await request(reader, writer, "POST", "/scan/file", body))[0]
+                   for body in ({"path": str(outside)}, {"path": str(tmp_path / "docs" / ".." / "outside.txt")}, {})]
+        missing = await request(reader, writer, "GET", "/nope")
+        stats = (await request(reader, writer, "GET", "/stats"))[1]
+        writer.close()
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"POST /scan/text HTTP/1.1\r\nContent-Length: -1\r\n\r\n")
+        bad_length = int((await reader.readline()).split()[1])
+        writer.close()
+        await daemon.stop()
+        return replies, by_file, refused + [bad_length], missing, stats
+
+    replies, by_file, refused, missing, stats = asyncio.run(main())
+    for i in range(8):
+        for t, (status, body) in zip(texts[i::8], replies[i]):
+            assert status == 200
+            assert body["findings"] == findings_to_dicts(merge_findings(model.predict(t), max_gap=2))
+    assert by_file[1]["findings"] == replies[3][0][1]["findings"]
+    assert refused == [403, 403, 400, 400]  # not a target, escapes one, no path, bad Content-Length
+    assert missing[0] == 404
+    assert stats["requests"] == 41
+    assert stats["batches"] < 41  # requests were coalesced
+
+
+def test_files_are_read_under_the_limits(tiny_model_dir, tmp_path, docx_bomb):
+    model = PiiModel(tiny_model_dir, use_profile=False)
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    ok = docs / "ok.txt"
+    ok.write_text("Call John Smith at 555-123-4567.", encoding="utf-8")
+    bomb = docx_bomb(docs / "bomb.docx", 100_000)
+
+    async def main():
+        cfg = {"targets": [str(docs / "*")], "extraction_workers": 1, "limits": {"isolate": True, "file_seconds": 0.5}}
+        daemon = await ScanDaemon(model, cfg).start(port=0)
+        reader, writer = await asyncio.open_connection(*daemon.address[:2])
+        out = [(await request(reader, writer, "POST", "/scan/file", {"path": p}))[1] for p in (bomb, str(ok))]
+        writer.close()
+        await daemon.stop()
+        return out
+
+    hung, fine = asyncio.run(main())
+    assert (hung["contains_pii"], hung["outcome"], hung["findings"]) == (None, "timeout", [])
+    assert (fine["contains_pii"], fine["outcome"]) == (True, "ok")
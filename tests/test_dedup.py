@@ -0,0 +1,68 @@
+import json
+
+from piiscanner.dedup import Dedup
+from piiscanner.guard import OK
+from piiscanner.metrics import Metrics
+from piiscanner.scan import run_scan
+from piiscanner.utils import empty_findings
+
+
+def test_only_size_collisions_are_hashed(tmp_path):
+    def put(name, data):
+        p = tmp_path / name
+        p.write_bytes(data)
+        return str(p)
+
+    a = put("a.txt", b"x" * 3000 + b"tail-1")
+    other_tail = put("b.txt", b"x" * 3000 + b"tail-2")   # same size and head, differs at the end
+    copy = put("c.txt", b"x" * 3000 + b"tail-1")
+    unique = put("d.txt", b"something else")
+    other_head = put("e.txt", b"y" * 3000 + b"tail-1")
+    empty1, empty2 = put("f.txt", b""), put("g.txt", b"")
+
+    d = Dedup(partial_kb=1)
+    assert list(d.filter([a, other_tail, copy, unique, other_head, empty1, empty2])) == \
+        [a, other_tail, unique, other_head, empty1, empty2]
+    assert d.duplicates == 1 and d.bytes_saved == 3006
+    assert d.bytes_hashed == 4 * 1024 + 3 * 3006  # heads of the four same-size files, then a, b and c whole
+    assert list(d.ready()) == []
+    assert [(p, len(m), o) for p, m, o in d.resolve(a, empty_findings(), OK)] == [(a, 0, OK), (copy, 0, OK)]
+
+
+def test_same_bytes_under_another_extension_are_scanned(tmp_path):
+    data = b"Name,Phone\nJohn Smith,555-123-4567\n" * 10
+    paths = []
+    for name in ("a.txt", "a.csv", "b.TXT"):
+        (tmp_path / name).write_bytes(data)
+        paths.append(str(tmp_path / name))
+
+    d = Dedup()
+    assert list(d.filter(paths)) == paths[:2]  # .csv is read by another extractor; .TXT is still .txt
+    (_, _, _), (dup, _, outcome) = d.resolve(paths[0], empty_findings(), {"outcome": "error"})
+    assert dup == paths[2] and outcome["duplicate_of"] == paths[0]
+
+def test_scan_attributes_findings_to_every_copy(tiny_model_dir, tmp_path):
+    docs = tmp_path / "docs"
+    for sub in ("a", "b", "c"):
+        (docs / sub).mkdir(parents=True)
+    body = "Call John Smith at 555-123-4567. " * 20
+    paths = [str(docs / sub / "form.txt") for sub in ("a", "b", "c")]
+    for p in paths:
+        open(p, "w", encoding="utf-8").write(body)
+    other = docs / "a" / "other.txt"
+    other.write_text(body + "Call again.", encoding="utf-8")
+    paths.append(str(other))
+
+    cfg = {"model_dir": str(tiny_model_dir), "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "schedule": {"policy": "walk"}, "dedup": {"enabled": True}}
+    metrics = Metrics()
+    records = {r["file"]: r for r in map(json.loads, open(run_scan(cfg, paths, metrics)))}
+    assert set(records) == set(paths)
+    first = records[paths[0]]
+    assert first["findings"] and "duplicate_of" not in first
+    for p in paths[1:3]:
+        assert records[p]["duplicate_of"] == paths[0]
+        assert records[p]["findings"] == first["findings"]
+    assert "duplicate_of" not in records[str(other)]
+    assert sum(v for (name, _), v in metrics.counters.items() if name == "files_read") == 2
+    assert metrics.counters[("dedup_files", "txt")] == 2
@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from piiscanner.guard import FileTimeout, Limits, TooLarge, Watchdog, extract
+from piiscanner.scan import run_scan
+
+
+def test_limits_checked_before_and_during_extraction(tmp_path):
+    p = tmp_path / "a.txt"
+    p.write_text("x" * 3000)
+    assert extract(str(p), limits=Limits()) == "x" * 3000
+    with pytest.raises(TooLarge):
+        extract(str(p), limits=Limits(max_file_mb=1 / 1024))
+    with pytest.raises(TooLarge):
+        extract(str(p), p.read_bytes(), Limits(max_text_mb=2 / 1024))
+
+
+def test_watchdog_kills_a_hung_extraction_and_keeps_going(tmp_path, docx_bomb):
+    bomb = docx_bomb(tmp_path / "bomb.docx", 100_000)
+    ok = tmp_path / "ok.txt"
+    ok.write_text("hello")
+    w = Watchdog(Limits(file_seconds=0.3), processes=1)
+    try:
+        with pytest.raises(FileTimeout):
+            w.extract(bomb)
+        assert w.restarts == 1
+        assert w.extract(str(ok)) == "hello"
+    finally:
+        w.close()
+
+
+def test_outcomes_in_scan_output(tiny_model_dir, tmp_path, docx_bomb):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    paths = []
+    for i in range(4):
+        p = docs / f"d{i}.txt"
+        p.write_text("Call John Smith at 555-123-4567. " * (i + 1), encoding="utf-8")
+        paths.append(str(p))
+    bad = docs / "bad.pdf"
+    bad.write_bytes(b"%PDF-1.4 not really")
+    big = docs / "big.txt"
+    big.write_text("Call John Smith at 555-123-4567. " * 2500, encoding="utf-8")
+    bomb = docx_bomb(docs / "bomb.docx", 100_000)
+    paths += [str(bad), str(big), bomb]
+
+    cfg = {"model_dir": str(tiny_model_dir), "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "extraction_workers": 2, "limits": {"isolate": True, "file_seconds": 0.5, "max_file_mb": 64 / 1024}}
+    records = {r["file"]: r for r in map(json.loads, open(run_scan(cfg, paths)))}
+    assert [records[p]["outcome"] for p in paths[:4]] == ["ok"] * 4
+    assert all(records[p]["findings"] for p in paths[:4])
+    assert records[str(bad)]["outcome"] == "error"
+    assert records[str(big)]["outcome"] == "too_large"
+    assert records[bomb]["outcome"] == "timeout"
+    assert records[bomb]["findings"] == []
+
+
+def test_spawned_workers_use_the_bundled_interpreter(tmp_path, monkeypatch):
+    """In the packaged app sys.executable is the launcher; workers must start the Python next to it."""
+    import sys
+    from piiscanner import guard
+
+    picked = []
+    monkeypatch.setattr(guard.mp, "set_executable", picked.append)
+    monkeypatch.setattr(sys, "executable", str(tmp_path / "pii-scanner.exe"))
+    assert not guard.use_interpreter() and not picked
+    (tmp_path / "pythonw.exe").write_bytes(b"")
+    assert guard.use_interpreter() and picked == [str(tmp_path / "pythonw.exe")]
@@ -0,0 +1,51 @@
+from piiscanner.infer import PiiModel
+from piiscanner.utils import FINDING_DTYPE, _base_label, findings_to_dicts, merge_findings
+
+
+def test_long_text_is_windowed_and_batched(tiny_model_dir):
+    model = PiiModel(tiny_model_dir, batch_size=4, use_profile=False)
+    text = "Call John Smith at 555-123-4567 or john@example.com. " * 300
+    enc = model.encode(text)
+    assert len(enc["input_ids"]) > 1
+    assert all(len(w) <= model.max_length for w in enc["input_ids"])
+
+    findings = model.predict(text)
+    assert findings.dtype == FINDING_DTYPE
+    assert len(findings) > 0
+    assert findings["end"].max() <= len(text)
+    assert model.batches_run == -(-len(enc["input_ids"]) // 4)
+
+    merged = findings_to_dicts(merge_findings(findings, max_gap=2))
+    assert all(set(f) == {"start", "end", "label", "score"} for f in merged)
+    assert all("-" not in f["label"][:2] for f in merged)
+
+
+def test_predict_batch_matches_predict(tiny_model_dir):
+    model = PiiModel(tiny_model_dir, batch_size=4, use_profile=False)
+    texts = ["Call John Smith at 555-123-4567.", "", "Email john@example.com. " * 200, "no pii here"]
+    batched = model.predict_batch(texts)
+    assert len(batched) == len(texts)
+    for text, got in zip(texts, batched):
+        assert got.tolist() == model.predict(text).tolist()
+
+
+def test_token_labels_apply_thresholds(tiny_model_dir):
+    text = "Call John Smith at 555-123-4567 or john@example.com."
+    model = PiiModel(tiny_model_dir, use_profile=False)
+    enc = model.encode(text)
+    logits = model.run(enc)
+    (labels,) = model.token_labels(logits)
+    assert len(labels) == len(enc["input_ids"][0])
+    hits = labels != 0
+    assert hits.any()
+    # the tokens decode reports are exactly the non-O ones (special tokens have no span)
+    offs = enc["offset_mapping"][0]
+    spans = {(int(a), int(b)) for a, b in offs[hits & (offs[:, 1] > offs[:, 0])]}
+    assert spans == {(int(f["start"]), int(f["end"])) for f in model.decode(enc, logits)}
+
+    # thresholds are keyed like config.yaml: by entity, not by B-/I- tag
+    found = {_base_label(model.id2label[int(i)]) for i in labels[hits]}
+    strict = PiiModel(tiny_model_dir, thresholds={lab: 1.01 for lab in found}, use_profile=False)
+    assert not strict.token_labels(logits)[0].any()
+    loose = PiiModel(tiny_model_dir, thresholds={lab: 0.0 for lab in found}, use_profile=False)
+    assert (loose.token_labels(logits)[0] != 0).sum() >= hits.sum()
@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from piiscanner.journal import ScanJournal
+from piiscanner.scan import run_scan
+
+
+def test_resume_cuts_back_to_last_checkpoint(tmp_path):
+    out_path = tmp_path / "scan-1.jsonl"
+    j = ScanJournal.start(tmp_path / "scan-1.journal", interval=3600)
+    with open(out_path, "w", encoding="utf-8") as out:
+        j.attach(out)
+        out.write('{"file": "a"}\n')
+        j.done("a")
+        j.done("b")  # no findings
+        j.checkpoint()
+        out.write('{"file": "c"}\n')  # crash before c is checkpointed
+        j.done("c")
+    with open(j.path, "a", encoding="utf-8") as f:
+        f.write('{"offset": 99, "do')  # torn last line
+
+    r = ScanJournal.resume(tmp_path / "scan-1.journal", out_path)
+    assert r.completed == {"a", "b"}
+    assert out_path.read_text() == '{"file": "a"}\n'
+    r._f.close()
+
+
+def test_interrupted_scan_resumes_without_duplicates(tiny_model_dir, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    paths = []
+    for i in range(12):
+        p = docs / f"d{i:02d}.txt"
+        p.write_text("Call John Smith at 555-123-4567. " * (i + 1) if i % 3 else "nothing here", encoding="utf-8")
+        paths.append(str(p))
+    cfg = {"model_dir": tiny_model_dir, "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "extraction_workers": 1, "doc_batch_size": 2, "checkpoint": {"interval": 0}}
+
+    def crash_after(n):
+        for i, p in enumerate(paths):
+            if i == n:
+                raise KeyboardInterrupt
+            yield p
+
+    with pytest.raises(KeyboardInterrupt):
+        run_scan(cfg, crash_after(7))
+    scan_id = next((tmp_path / "out").glob("*.journal")).stem
+    out_path = run_scan(cfg, paths, resume=scan_id)
+    assert not out_path.with_suffix(".journal").exists()
+
+    cfg["output"]["path"] = str(tmp_path / "fresh")
+    fresh = run_scan(cfg, paths)
+    resumed = sorted(json.loads(line)["file"] for line in open(out_path))
+    assert resumed == sorted(json.loads(line)["file"] for line in open(fresh))
+    assert len(resumed) == len(set(resumed)) == 8
@@ -0,0 +1,60 @@
+from piiscanner.memory import MB, MemoryGovernor, activation_bytes, current_rss
+
+
+def test_rss_is_measured():
+    assert current_rss() > 0
+
+
+def test_batch_size_shrinks_with_sequence_length(tmp_path):
+    gov = MemoryGovernor(budget_mb=current_rss() / MB + 512, model_dir=tmp_path, max_batch=16)
+    assert activation_bytes(gov.dims, 512) > activation_bytes(gov.dims, 64)
+    assert 1 <= gov.batch_size(512) <= gov.batch_size(64) <= 16
+
+
+def test_over_budget_still_makes_progress(tmp_path):
+    gov = MemoryGovernor(budget_mb=1, model_dir=tmp_path, max_batch=8)
+    assert gov.batch_size(512) == 1
+    gov.after_batch()
+    assert gov.cap < 8 and gov.pressure
+
+
+def test_queue_back_pressure(tmp_path):
+    gov = MemoryGovernor(budget_mb=current_rss() / MB + 256, model_dir=tmp_path)
+    big = gov.queue_budget
+    assert gov.try_admit(big)          # nothing queued: always admitted
+    assert not gov.try_admit(1)        # full
+    gov.release(big)
+    assert gov.try_admit(1)
+    assert gov.is_oversized(gov.queue_budget)
+
+
+def test_held_texts_stay_reserved(tmp_path):
+    """The scan holds yielded texts until a batch is inferred; each one stays counted until it is released."""
+    from piiscanner.scan import iter_extracted
+
+    gov = MemoryGovernor(budget_mb=current_rss() / MB + 256, model_dir=tmp_path)
+    gov.pressure = True  # try_admit refuses whenever anything is in flight
+    paths = []
+    for i in range(4):
+        p = tmp_path / f"f{i}.txt"
+        p.write_text("x" * (100 * (i + 1)), encoding="utf-8")
+        paths.append(str(p))
+    held = [n for _, _, n, _ in iter_extracted(paths, 1, gov)]
+    assert held == [100, 200, 300, 400]
+    assert gov.in_flight == sum(held)
+    for n in held:
+        gov.release(n)
+    assert gov.in_flight == 0
+
+
+def test_unreadable_size_is_reported(tmp_path):
+    from piiscanner.metrics import Metrics
+    from piiscanner.scan import iter_extracted
+
+    gov = MemoryGovernor(budget_mb=current_rss() / MB + 256, model_dir=tmp_path)
+    (tmp_path / "a.txt").write_text("hello", encoding="utf-8")
+    paths = [str(tmp_path / "gone.txt"), str(tmp_path / "a.txt")]
+    m = Metrics()
+    out = [(p, text, n, outcome["outcome"]) for p, text, n, outcome in iter_extracted(paths, 1, gov, m)]
+    assert out == [(paths[0], "", 0, "error"), (paths[1], "hello", 5, "ok")]
+    assert m.to_dict()["counters"]["files_error"]["txt"] == 1
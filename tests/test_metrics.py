@@ -0,0 +1,39 @@
+import json
+
+from piiscanner.metrics import Metrics, NULL, file_type
+
+
+def test_counters_and_histograms_by_file_type(tmp_path):
+    m = Metrics()
+    m.inc("files_read", 1, "txt")
+    m.inc("files_read", 2, "pdf")
+    m.inc("files_read", 1, "txt")
+    m.observe("session_run_seconds", 0.02, "txt")
+    m.observe("session_run_seconds", 120.0, "txt")
+
+    d = m.to_dict()
+    assert d["counters"]["files_read"] == {"txt": 2, "pdf": 2}
+    h = d["histograms"]["session_run_seconds"]["txt"]
+    assert h["count"] == 2
+    assert sum(h["buckets"].values()) == 1  # 120s is above the last bucket, only counted in +Inf
+
+    prom = m.to_prometheus()
+    assert '# TYPE piiscanner_files_read_total counter' in prom
+    assert 'piiscanner_files_read_total{filetype="txt"} 2' in prom
+    assert 'piiscanner_session_run_seconds_bucket{filetype="txt",le="+Inf"} 2' in prom
+    assert 'piiscanner_session_run_seconds_count{filetype="txt"} 2' in prom
+
+    m.dump(tmp_path)
+    assert json.loads((tmp_path / "piiscanner.json").read_text())["counters"]["files_read"]["pdf"] == 2
+    assert (tmp_path / "piiscanner.prom").read_text() == prom
+
+
+def test_null_metrics_records_nothing():
+    with NULL.time("read_seconds", "txt"):
+        NULL.inc("files_read")
+    assert NULL.to_dict()["counters"] == {}
+
+
+def test_file_type():
+    assert file_type("C:\\a\\B.PDF") == "pdf"
+    assert file_type("/tmp/noext") == "none"
@@ -0,0 +1,44 @@
+import builtins
+import time
+
+from docx import Document
+
+from piiscanner import prefetch as prefetch_mod
+from piiscanner.prefetch import prefetch
+from piiscanner.utils import read_any, read_bytes
+
+
+def test_read_bytes_matches_read_any(tmp_path):
+    txt = tmp_path / "a.txt"
+    txt.write_bytes("Name: José\r\nSSN 123-45-6789\rend\n".encode("utf-8"))
+    docx = tmp_path / "b.docx"
+    d = Document()
+    d.add_paragraph("Call 555-123-4567")
+    d.add_paragraph("john@example.com")
+    d.save(str(docx))
+    for p in (txt, docx):
+        assert read_bytes(str(p), p.read_bytes()) == read_any(str(p))
+
+
+def test_prefetch_overlaps_slow_reads_and_keeps_order(tmp_path, monkeypatch):
+    paths = []
+    for i in range(40):
+        p = tmp_path / f"f{i:02d}.txt"
+        p.write_text(f"doc {i}")
+        paths.append(str(p))
+    big = tmp_path / "big.txt"
+    big.write_bytes(b"x" * 2048)
+    paths.insert(5, str(big))
+
+    def slow_open(*args, **kwargs):  # every open is a 50ms round trip
+        time.sleep(0.05)
+        return builtins.open(*args, **kwargs)
+    monkeypatch.setattr(prefetch_mod, "open", slow_open, raising=False)
+
+    t0 = time.perf_counter()
+    got = list(prefetch(paths, io_threads=16, budget_mb=1, max_file_mb=1 / 1024))
+    elapsed = time.perf_counter() - t0
+    assert [p for p, _ in got] == paths
+    assert dict(got)[str(big)] is None  # over max_file_mb, left for the ordinary reader
+    assert got[0][1] == b"doc 0"
+    assert elapsed < 41 * 0.05 / 4  # serially this is 2s
@@ -0,0 +1,124 @@
+import json
+
+import numpy as np
+
+from piiscanner.redact import Masks, Redactor, byte_offsets, masked, spans
+from piiscanner.scan import run_scan
+from piiscanner.utils import FINDING_DTYPE, label_id, read_any
+
+
+def _findings(*rows):
+    return np.array([(s, e, label_id(l), 0.9) for s, e, l in rows], dtype=FINDING_DTYPE)
+
+
+def test_masks_stream_across_pieces():
+    text = "Call John Smith at 555-123-4567 today"
+    found = spans(_findings((5, 15, "PERSON"), (19, 31, "PHONE"), (25, 28, "SSN")))  # SSN is inside PHONE: dropped
+    assert found[0].tolist() == [5, 19]
+    masks = Masks({"PHONE": "{fill}"}, fill_char="#")
+    want = "Call [PERSON] at ############ today"
+    assert "".join(masked([text], found, masks)) == want
+    pieces = [text[i:i + 4] for i in range(0, len(text), 4)]  # spans cross piece boundaries
+    assert "".join(masked(pieces, found, masks)) == want
+
+    assert byte_offsets(["é x"], [2, 3], 4).tolist() == [3, 4]
+    assert byte_offsets(["a\nb"], [1], 4) is None  # the file had \r\n
+
+
+def test_txt_copy_keeps_bytes_outside_findings(tmp_path):
+    src = tmp_path / "in" / "notes.txt"
+    src.parent.mkdir()
+    src.write_bytes("café: ring John Smith\n".encode("utf-8") * 3)
+    text = read_any(str(src))
+    first = text.index("John Smith")
+    r = Redactor(tmp_path / "out")
+    dst = r.write(str(src), text, _findings((first, first + 10, "PERSON")))
+    assert dst.read_bytes() == "café: ring [PERSON]\n".encode("utf-8") + "café: ring John Smith\n".encode("utf-8") * 2
+    assert r.stats()["files"] == 1
+
+    sparse = tmp_path / "in" / "sparse.txt"
+    sparse.write_text("x" * 5000 + "John Smith" + "y" * 5000 + "John Smith", encoding="utf-8")
+    found = _findings((5000, 5010, "PERSON"), (10010, 10020, "PERSON"))
+    want = "x" * 5000 + "[PERSON]" + "y" * 5000 + "[PERSON]"
+    assert r.write(str(sparse), read_any(str(sparse)), found).read_text(encoding="utf-8") == want
+
+    crlf = tmp_path / "in" / "crlf.txt"
+    crlf.write_bytes(b"ring John Smith\r\nbye\r\n")
+    dst = r.write(str(crlf), read_any(str(crlf)), _findings((5, 15, "PERSON")))
+    assert dst.read_bytes() == b"ring [PERSON]\r\nbye\r\n"  # the file's own newlines
+    assert r.write(str(crlf), None, _findings((5, 15, "PERSON"))).read_bytes() == b"ring [PERSON]\r\nbye\r\n"
+    mixed = tmp_path / "in" / "mixed.txt"
+    raw = "café\r\nJohn Smith\rx\r\r\nJohn Smith\n\r\n".encode("utf-8")
+    mixed.write_bytes(raw)
+    text = read_any(str(mixed))
+    at = [i for i in range(len(text)) if text.startswith("John Smith", i)]
+    dst = r.write(str(mixed), text, _findings(*((i, i + 10, "PERSON") for i in at)))
+    assert dst.read_bytes() == raw.replace(b"John Smith", b"[PERSON]")
+    assert r.write(str(crlf), read_any(str(crlf)), _findings()) is None
+
+
+def test_scan_writes_redacted_copies(tiny_model_dir, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    paths = []
+    for i in range(3):
+        p = docs / f"d{i}.txt"
+        p.write_text("Call John Smith at 555-123-4567. " * (i + 1), encoding="utf-8")
+        paths.append(str(p))
+    cfg = {"model_dir": str(tiny_model_dir), "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "redact": {"enabled": True, "path": str(tmp_path / "redacted"), "masks": {"default": "<{label}>"}}}
+    records = [json.loads(line) for line in open(run_scan(cfg, paths))]
+    assert len(records) == 3
+    r = Redactor(tmp_path / "redacted")
+    for rec in records:
+        text = read_any(rec["file"])
+        want, at = [], 0
+        for f in rec["findings"]:
+            want += [text[at:f["start"]], f"<{f['label']}>"]
+            at = f["end"]
+        assert r.target(rec["file"]).read_text(encoding="utf-8") == "".join(want) + text[at:]
+
+
+def test_own_output_is_never_scanned(tmp_path):
+    """Redacted copies and findings written under a scanned tree aren't picked up by the next walk or watch."""
+    from piiscanner.scan import build_paths, iter_targets
+    from piiscanner.utils import exclude_globs
+    from piiscanner.watch import matches
+
+    docs = tmp_path / "docs"
+    for sub in ("a", "redacted/abs/docs/a", "out"):
+        (docs / sub).mkdir(parents=True)
+    for f in ("a/x.txt", "redacted/abs/docs/a/x.txt", "redacted/top.txt", "out/scan.txt"):
+        (docs / f).write_text("hi", encoding="utf-8")
+    cfg = {"targets": [str(docs / "**" / "*.txt")], "exclude_globs": [],
+           "output": {"path": str(docs / "out")}, "redact": {"enabled": True, "path": str(docs / "redacted")}}
+    excludes = exclude_globs(cfg)
+    assert build_paths("", str(docs), excludes) == [str(docs / "a" / "x.txt")]
+    assert list(iter_targets(cfg)) == [str(docs / "a" / "x.txt")]
+    assert matches(str(docs / "a" / "x.txt"), cfg["targets"], excludes)
+    assert not matches(str(docs / "redacted" / "abs" / "docs" / "a" / "x.txt"), cfg["targets"], excludes)
+    assert not matches(str(docs / "out" / "scan.txt"), cfg["targets"], excludes)
+
+
+def test_duplicates_get_a_copy_of_the_originals_redaction(tiny_model_dir, tmp_path, monkeypatch):
+    import shutil
+    from docx import Document
+    from piiscanner import redact
+
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    doc = Document()
+    doc.add_paragraph("Call John Smith at 555-123-4567.")
+    doc.save(docs / "a.docx")
+    shutil.copy(docs / "a.docx", docs / "b.docx")
+
+    def no_reread(*args, **kwargs):
+        raise AssertionError("a duplicate was extracted again")
+    monkeypatch.setattr(redact, "iter_text_chunks", no_reread)
+    cfg = {"model_dir": str(tiny_model_dir), "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "dedup": {"enabled": True}, "redact": {"enabled": True, "path": str(tmp_path / "redacted")}}
+    records = [json.loads(line) for line in open(run_scan(cfg, [str(docs / "a.docx"), str(docs / "b.docx")]))]
+    (dup,) = [rec for rec in records if "duplicate_of" in rec]
+    r = Redactor(tmp_path / "redacted")
+    original = r.target(dup["duplicate_of"]).read_bytes()
+    assert b"[" in original and r.target(dup["file"]).read_bytes() == original
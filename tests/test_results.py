@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("PySide6")
+
+from PySide6.QtCore import QModelIndex, Qt
+
+from piiscanner.results import FindingsTableModel
+from piiscanner.utils import FINDING_DTYPE, label_id
+
+
+def _findings(*rows):
+    return np.array([(s, e, label_id(l), sc) for s, e, l, sc in rows], dtype=FINDING_DTYPE)
+
+
+def _column(model, col):
+    return [model.data(model.index(r, col)) for r in range(model.rowCount())]
+
+
+def test_rows_are_fetched_a_chunk_at_a_time(qapp, monkeypatch):
+    monkeypatch.setattr(FindingsTableModel, "FETCH_CHUNK", 3)
+    model = FindingsTableModel()
+    model.append_findings("a.txt", _findings(*[(i, i + 1, "EMAIL", 0.9) for i in range(7)]))
+    assert model.rowCount() == 3  # first page filled straight away
+    assert model.canFetchMore(QModelIndex())
+    model.fetchMore(QModelIndex())
+    model.fetchMore(QModelIndex())
+    assert model.rowCount() == 7 and not model.canFetchMore(QModelIndex())
+    assert _column(model, 3) == list(range(7))
+
+
+def test_sorted_inserts_and_filters(qapp):
+    model = FindingsTableModel()
+    model.sort(2, Qt.DescendingOrder)
+    model.append_findings("a.txt", _findings((0, 5, "EMAIL", 0.5), (10, 15, "SSN", 0.9)))
+    model.append_findings("b.txt", _findings((3, 8, "EMAIL", 0.7), (20, 25, "SSN", 0.6)))
+    assert _column(model, 2) == ["0.9000", "0.7000", "0.6000", "0.5000"]
+    assert model.labels() == ["EMAIL", "SSN"]
+
+    model.set_filter(label="EMAIL")
+    assert _column(model, 0) == ["b.txt", "a.txt"]
+    model.set_filter(file_text="A.TXT", min_score=0.6)
+    assert _column(model, 1) == ["SSN"]
+    model.append_findings("a.txt", _findings((30, 35, "PHONE", 0.95), (40, 45, "PHONE", 0.1)))
+    assert _column(model, 1) == ["PHONE", "SSN"]  # new rows go through the filter and into sorted place
+
+    model.sort(3, Qt.AscendingOrder)
+    model.set_filter()
+    assert _column(model, 3) == [0, 3, 10, 20, 30, 40]
+    model.clear()
+    assert model.rowCount() == 0 and model.labels() == []
@@ -0,0 +1,78 @@
+import json
+import random
+
+from piiscanner.sample import estimate, run_sample, sample_text, stratified_order
+
+
+def test_stratified_order_is_proportional_and_seeded(tmp_path):
+    files = [(str(tmp_path / "a" / f"{i}.txt"), 100) for i in range(30)]
+    files += [(str(tmp_path / "b" / f"{i}.pdf"), 100) for i in range(10)]
+    strata, order = stratified_order(files, seed=7)
+    assert len(strata) == 2 and len(order) == 40
+    first8 = [p for _, p in order[:8]]
+    assert sum(p.endswith(".pdf") for p in first8) == 2  # 10 of 40
+    assert order == stratified_order(list(reversed(files)), seed=7)[1]
+    assert order != stratified_order(files, seed=8)[1]
+
+
+def test_sample_text_takes_head_tail_and_windows(tmp_path):
+    p = tmp_path / "big.txt"
+    p.write_text("".join(f"{i:08d}" for i in range(10000)))
+    parts, covered, total = sample_text(str(p), 80, 3, random.Random(1))
+    assert parts[0].startswith("00000000") and parts[-1].endswith("00009999")
+    assert 3 <= len(parts) - 2 <= 3 and covered == 80 * len(parts) and total == 80000
+
+
+def test_estimate_interval_covers_truth():
+    est = estimate({"a": 1000, "b": 1000}, {"a": [True] * 30 + [False] * 70, "b": [False] * 100})
+    assert abs(est["estimate"] - 0.15) < 1e-9
+    assert est["ci95"][0] < 0.15 < est["ci95"][1]
+    assert estimate({"a": 5}, {})["estimate"] is None
+
+
+def test_run_sample_is_reproducible(tiny_model_dir, tmp_path):
+    for d in ("x", "y"):
+        (tmp_path / "docs" / d).mkdir(parents=True)
+        for i in range(10):
+            text = "Call John Smith at 555-123-4567. " if i % 2 else "nothing here "
+            (tmp_path / "docs" / d / f"{i}.txt").write_text(text * 200)
+    paths = sorted(str(p) for p in (tmp_path / "docs").rglob("*.txt"))
+    cfg = {"model_dir": str(tiny_model_dir), "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "sample": {"window_chars": 256, "windows": 2}}
+    budget = 5 * 6 * 256 / (1024 * 1024)  # about five files' worth of windows
+    a = json.loads(run_sample(cfg, paths, seed=3, budget_mb=budget).read_text())
+    b = json.loads(run_sample(cfg, paths, seed=3, budget_mb=budget).read_text())
+    assert 0 < a["sample"]["files"] < 20
+    assert a["positives"] == b["positives"] and a["prevalence"] == b["prevalence"]
+    lo, hi = a["prevalence"]["ci95"]
+    assert lo <= a["prevalence"]["estimate"] <= hi
+
+
+def test_strata_per_drive(monkeypatch):
+    import ntpath
+    from piiscanner import sample
+
+    files = [(f"C:\\data\\{d}\\{i}.txt", 100) for d in "ab" for i in range(3)] + [(f"D:\\share\\c\\{i}.txt", 100) for i in range(2)]
+    with monkeypatch.context() as m:  # Windows paths: commonpath raises across drives
+        m.setattr(sample.os, "path", ntpath)
+        m.setattr(sample.os, "sep", "\\")
+        strata, order = stratified_order(files, seed=1)
+    assert sorted(k[0] for k in strata) == ["C:\\a", "C:\\b", "D:\\."]
+    assert len(order) == 8
+
+
+def test_unreadable_files_are_reported(tiny_model_dir, tmp_path, docx_bomb):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    for i in range(4):
+        (docs / f"{i}.txt").write_text("Call John Smith at 555-123-4567. " * 20)
+    (docs / "bad.pdf").write_bytes(b"%PDF-1.4 not really")
+    docx_bomb(docs / "bomb.docx", 100_000)
+    cfg = {"model_dir": str(tiny_model_dir), "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "limits": {"isolate": True, "file_seconds": 0.5}}
+    report = json.loads(run_sample(cfg, sorted(str(p) for p in docs.iterdir()), seed=1).read_text())
+    assert report["sample"]["files"] == 4 and report["sample"]["unscanned"] == 2
+    assert sorted((u["file"], u["outcome"]) for u in report["unscanned"]) == [
+        (str(docs / "bad.pdf"), "error"), (str(docs / "bomb.docx"), "timeout")]
+    lo, hi = report["prevalence"]["ci95_with_unscanned"]
+    assert lo <= report["prevalence"]["ci95"][0] and hi == 1.0
@@ -0,0 +1,38 @@
+import os
+import time
+
+from piiscanner.schedule import interleave, schedule
+
+
+def _touch(path, size, age_days=0):
+    path.write_bytes(b"x" * size)
+    t = time.time() - age_days * 86400
+    os.utime(path, (t, t))
+    return str(path)
+
+
+def test_hints_and_small_files_go_first(tmp_path):
+    (tmp_path / "hr").mkdir()
+    old_big = _touch(tmp_path / "archive.txt", 200_000, age_days=900)
+    small = _touch(tmp_path / "notes.txt", 100)
+    payroll = _touch(tmp_path / "hr" / "payroll_2024.txt", 200_000, age_days=900)
+    shr = _touch(tmp_path / "shrubs.txt", 100)  # "hr" inside a word is not a hint
+    order = list(schedule({}, [old_big, small, shr, payroll]))
+    assert set(order[:2]) == {small, shr}
+    assert order[2:] == [payroll, old_big]  # same size and age, the hints break the tie
+    weighted = list(schedule({"schedule": {"weights": {"hint": 10}}}, [old_big, small, shr, payroll]))
+    assert weighted[0] == payroll
+
+
+def test_large_files_are_interleaved():
+    assert interleave(list("abcdef"), ["X", "Y", "Z"], 2) == list("abXcdYefZ")
+    assert interleave(["a"], ["X"], 5) == ["a", "X"]
+
+
+def test_walk_policy_and_windows_keep_streaming(tmp_path):
+    paths = [_touch(tmp_path / f"{n}.txt", size) for n, size in (("a", 5000), ("b", 10), ("c", 300), ("d", 1))]
+    assert list(schedule({"schedule": {"policy": "walk"}}, iter(paths))) == paths
+    windowed = list(schedule({"schedule": {"window": 2}}, iter(paths)))
+    assert windowed == [paths[1], paths[0], paths[3], paths[2]]
+    missing = str(tmp_path / "gone.txt")  # can't be stat'ed, still scanned (and reported) like before
+    assert missing in schedule({}, paths + [missing])
@@ -0,0 +1,70 @@
+import time
+
+from piiscanner.metrics import Metrics
+from piiscanner.throttle import OtherCpu, Throttle, TokenBucket, own_cpu
+
+
+def test_token_bucket_paces_reads():
+    bucket = TokenBucket(rate=1000, burst=1000)
+    assert bucket.consume(1000) == 0.0
+    t0 = time.monotonic()
+    waited = bucket.consume(200)  # bucket is empty, 200 bytes at 1000/s
+    assert 0.15 < waited < 0.3
+    assert time.monotonic() - t0 >= waited
+
+
+def test_cpu_share_caps_threads_and_paces_cpu_time():
+    t = Throttle(cpu_share=0.5)
+    t.threads = 4  # as computed for an 8-core host
+    assert t.cap_threads(0) == 4
+    assert t.cap_threads(2) == 2
+    assert t.cap_threads(16) == 4
+
+    m = Metrics()
+    slow = Throttle(cpu_share=0.01, metrics=m)
+    assert slow.threads == 1
+    slow.cores = 0.5
+    slow.pace()
+    t0 = time.monotonic()
+    while own_cpu() - slow._mark[1] < 0.05:  # burn 50ms of CPU
+        pass
+    busy = time.monotonic() - t0
+    slow.pace()  # half a core: about as long idle as busy
+    assert time.monotonic() - t0 >= 0.1 - 0.01
+    assert busy < 0.1
+    assert m.to_dict()["counters"]["throttle_cpu_seconds"]["all"] > 0
+
+
+def test_no_throttle_unless_configured():
+    assert Throttle.from_cfg({}) is None
+    assert Throttle.from_cfg({"throttle": {"cpu_share": 1.0, "read_mb_per_sec": 0}}) is None
+    assert Throttle.from_cfg({"throttle": {"read_mb_per_sec": 5}}).bucket is not None
+
+
+def test_extraction_processes_count_as_our_cpu(tmp_path, docx_bomb):
+    """With limits.isolate, CPU burnt in the Watchdog's workers is the scan's own, not load from other processes."""
+    import threading
+    import pytest
+    from piiscanner.guard import FileTimeout, Limits, Watchdog
+
+    bomb = docx_bomb(tmp_path / "bomb.docx", 100_000)
+    m = Metrics()
+    t = Throttle(cpu_share=0.01, metrics=m)
+    t.cores = 1.0
+    w = Watchdog(Limits(file_seconds=1.0, isolate=True), processes=1)
+    try:
+        cpu0, own0 = time.process_time(), own_cpu()
+        run = threading.Thread(target=lambda: pytest.raises(FileTimeout, w.extract, bomb))
+        run.start()
+        time.sleep(0.6)
+        live = own_cpu() - own0  # the worker is still parsing
+        run.join()
+        spent = own_cpu() - own0  # killed at file_seconds and reaped
+        ours = time.process_time() - cpu0
+    finally:
+        w.close()
+    assert live - ours > 0.3
+    assert spent - ours > 0.6
+    t._mark = (time.monotonic() - 0.1, own0)
+    t.pace()  # a core's worth of share: sleeps off what the worker used beyond the 0.1s since the mark
+    assert m.to_dict()["counters"]["throttle_cpu_seconds"]["all"] > 0.4
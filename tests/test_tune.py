@@ -0,0 +1,80 @@
+from piiscanner import tune
+
+
+def test_profile_roundtrip_is_tied_to_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(tune, "profile_dir", lambda: tmp_path / "cfg")
+    model_dir = tmp_path / "model"
+    model_dir.mkdir()
+    (model_dir / "model.onnx").write_bytes(b"onnx" * 100)
+
+    assert tune.load_profile(model_dir) is None
+    prof = {"version": tune.PROFILE_VERSION, "cpus": tune.os.cpu_count(),
+            "model": tune.model_fingerprint(model_dir), "batch_size": 16}
+    tune.save_profile(prof)
+    assert tune.load_profile(model_dir)["batch_size"] == 16
+
+    # a different model invalidates the profile
+    (model_dir / "model.onnx").write_bytes(b"other")
+    assert tune.load_profile(model_dir) is None
+
+
+def test_synthetic_workload_is_deterministic():
+    a = tune.synthetic_texts(4, seed=1)
+    assert a == tune.synthetic_texts(4, seed=1)
+    assert a != tune.synthetic_texts(4, seed=2)
+    assert all(len(t) >= 3000 for t in a)
+
+
+def test_tune_batches_documents_and_keeps_findings(tiny_model_dir, monkeypatch):
+    from piiscanner.infer import PiiModel
+
+    sizes = []
+    predict_batch = PiiModel.predict_batch
+    monkeypatch.setattr(PiiModel, "predict_batch", lambda self, texts: sizes.append(len(texts)) or predict_batch(self, texts))
+    findings = tune._findings
+    # pretend only 384+ token windows find everything 512 does
+    monkeypatch.setattr(tune, "_findings", lambda m, texts, n: findings(m, texts, n) + ([] if m.max_length >= 384 else [{(0, 1, 0)}]))
+    prof = tune.tune(tiny_model_dir, seconds=0.02, n_docs=6, doc_batch=4, log=lambda *a: None)
+
+    assert set(sizes) == {4, 2}  # the doc_batch groups, not one document at a time
+    assert prof["max_length"] in (384, 512) and prof["doc_batch_size"] == 4
+    same = {t["value"]: t["same_findings"] for t in prof["trials"] if t["knob"] == "max_length"}
+    assert same == {128: False, 256: False, 384: True, 512: True}
+
+
+def test_thread_sweep_keeps_one_session_besides_the_trial(tiny_model_dir, monkeypatch):
+    import gc
+    import weakref
+    from piiscanner import infer
+
+    live, peak = weakref.WeakSet(), []
+
+    class Counted(infer.PiiModel):
+        def __init__(self, *args, **kwargs):
+            gc.collect()
+            super().__init__(*args, **kwargs)
+            live.add(self)
+            peak.append(len(live))
+
+    monkeypatch.setattr(infer, "PiiModel", Counted)
+    monkeypatch.setattr(tune, "_pow2_upto", lambda n: [1, 2, 4, 8])
+    tune.tune(tiny_model_dir, seconds=0.01, n_docs=2, log=lambda *a: None)
+    assert len(peak) == 4 and max(peak) <= 2
+
+
+def test_profile_fills_in_only_what_cfg_leaves_unset(tiny_model_dir, tmp_path, monkeypatch):
+    from piiscanner.scan import build_model, extraction_workers
+
+    monkeypatch.setattr(tune, "profile_dir", lambda: tmp_path / "cfg")
+    tune.save_profile({"version": tune.PROFILE_VERSION, "cpus": tune.os.cpu_count(),
+                       "model": tune.model_fingerprint(tiny_model_dir),
+                       "batch_size": 3, "max_length": 256, "intra_op_threads": 1, "extraction_workers": 2})
+    cfg = {"model_dir": str(tiny_model_dir), "batch_size": None, "intra_op_threads": None, "extraction_workers": None}
+    model = build_model(cfg)
+    assert (model.batch_size, model.max_length, model.intra_op_threads) == (3, 256, 1)
+    assert extraction_workers(cfg, model) == 2
+
+    cfg = {**cfg, "batch_size": 8, "intra_op_threads": 2, "extraction_workers": 1}
+    model = build_model(cfg)
+    assert (model.batch_size, model.max_length, model.intra_op_threads) == (8, 256, 2)
+    assert extraction_workers(cfg, model) == 1
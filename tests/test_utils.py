@@ -0,0 +1,60 @@
+import random
+
+import numpy as np
+
+from piiscanner.utils import (FINDING_DTYPE, findings_to_dicts, label_id, merge_findings,
+                              merge_findings_array, to_findings_array)
+
+
+def reference_merge(findings, max_gap=0):
+    # the original dict-based merge loop
+    norm = [{"start": f["start"], "end": f["end"], "label": f["label"][2:] if f["label"][:2] in ("B-", "I-") else f["label"],
+             "score": f["score"]} for f in findings if f["label"] != "O"]
+    if not norm:
+        return []
+    norm.sort(key=lambda x: (x["start"], x["end"]))
+    merged, cur = [], norm[0]
+    for nxt in norm[1:]:
+        if nxt["label"] == cur["label"] and nxt["start"] <= cur["end"] + max_gap:
+            cur["end"] = max(cur["end"], nxt["end"])
+            cur["score"] = max(cur["score"], nxt["score"])
+        else:
+            merged.append(cur)
+            cur = nxt
+    merged.append(cur)
+    return merged
+
+
+def random_findings(rng, n):
+    out = []
+    for _ in range(n):
+        start = rng.randint(0, 300)
+        out.append({"start": start, "end": start + rng.randint(1, 12),
+                    "label": rng.choice(["B-SSN", "I-SSN", "B-PERSON", "I-PERSON", "O", "EMAIL"]),
+                    "score": round(rng.random(), 4)})
+    return out
+
+
+def test_vectorized_merge_matches_reference():
+    rng = random.Random(7)
+    for _ in range(300):
+        findings = random_findings(rng, rng.randint(0, 60))
+        gap = rng.randint(0, 3)
+        assert merge_findings(findings, max_gap=gap) == reference_merge(findings, max_gap=gap)
+
+
+def test_array_in_array_out():
+    arr = to_findings_array([
+        {"start": 0, "end": 3, "label": "B-SSN", "score": 0.9},
+        {"start": 4, "end": 6, "label": "I-SSN", "score": 0.95},
+        {"start": 20, "end": 25, "label": "B-EMAIL", "score": 0.7},
+    ])
+    merged = merge_findings(arr, max_gap=1)
+    assert merged.dtype == FINDING_DTYPE
+    assert findings_to_dicts(merged, file="a.txt") == [
+        {"start": 0, "end": 6, "label": "SSN", "score": 0.95, "file": "a.txt"},
+        {"start": 20, "end": 25, "label": "EMAIL", "score": 0.7, "file": "a.txt"},
+    ]
+    assert len(merge_findings_array(np.empty(0, dtype=FINDING_DTYPE))) == 0
+    assert merge_findings([]) == []
+    assert label_id("SSN") == label_id("SSN")
@@ -0,0 +1,85 @@
+import json
+
+from piiscanner.infer import PiiModel
+from piiscanner.scan import run_scan, run_verdicts
+
+
+def test_verdicts_agree_with_full_scan(tiny_model_dir, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    paths = []
+    for i in range(10):
+        p = docs / f"d{i}.txt"
+        p.write_text("Call John Smith at 555-123-4567. " * (50 * i + 1) if i % 3 else "nothing here", encoding="utf-8")
+        paths.append(str(p))
+    cfg = {"model_dir": str(tiny_model_dir), "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "extraction_workers": 2, "merge_gap": 0, "checkpoint": {"enabled": False}}
+
+    full = {}
+    for line in open(run_scan(cfg, paths)):
+        rec = json.loads(line)
+        full[rec["file"]] = rec["findings"]
+    verdicts = [json.loads(line) for line in open(run_verdicts(cfg, paths))]
+
+    assert [v["file"] for v in verdicts] == paths
+    for v in verdicts:
+        assert v["contains_pii"] == (v["file"] in full)
+        if v["contains_pii"]:
+            first = min(full[v["file"]], key=lambda f: f["start"])
+            assert (v["first"]["start"], v["first"]["label"]) == (first["start"], first["label"])
+
+
+def test_first_hit_skips_remaining_windows(tiny_model_dir):
+    model = PiiModel(tiny_model_dir, batch_size=2, use_profile=False)
+    text = "Call John Smith at 555-123-4567. " * 2000
+    hit, windows = model.first_hit(text)
+    assert hit is not None and windows == 2
+    assert len(model.encode(text)["input_ids"]) > 20
+
+    label = int(model.predict(text)["label_id"].max())
+    hit, _ = model.first_hit(text, [label])
+    assert hit["label_id"][0] == label
+    assert model.first_hit("")[0] is None
+
+
+def test_verdicts_check_labels_and_limits(tiny_model_dir, tmp_path, docx_bomb):
+    import pytest
+    from piiscanner.scan import UnknownLabels
+
+    ok = tmp_path / "ok.txt"
+    ok.write_text("Call John Smith at 555-123-4567.", encoding="utf-8")
+    bomb = docx_bomb(tmp_path / "bomb.docx", 100_000)
+    cfg = {"model_dir": str(tiny_model_dir), "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "extraction_workers": 1, "limits": {"isolate": True, "file_seconds": 0.5}}
+    with pytest.raises(UnknownLabels):
+        run_verdicts(cfg, [str(ok)], labels=["SNN"])
+
+    verdicts = [json.loads(line) for line in open(run_verdicts(cfg, iter([str(ok), bomb])))]
+    assert [(v["contains_pii"], v["outcome"]) for v in verdicts] == [(True, "ok"), (None, "timeout")]
+
+
+def test_verdict_pieces_stop_at_the_first_hit(tmp_path, capsys):
+    """Through the watchdog, pieces after the one with the hit are never extracted, and --resume is refused."""
+    import pytest
+    from piiscanner.guard import Limits, Watchdog
+    from piiscanner.scan import main
+    from piiscanner.utils import iter_text_chunks
+
+    big = tmp_path / "big.txt"
+    big.write_text("Call John Smith at 555-123-4567. " * 2000, encoding="utf-8")
+    ok = tmp_path / "ok.txt"
+    ok.write_text("hello", encoding="utf-8")
+    w = Watchdog(Limits(file_seconds=5), processes=1)
+    try:
+        pieces = w.chunks(str(big), 4096)
+        offset, text = next(pieces)
+        assert offset == 0 and len(text) == 4096
+        pieces.close()
+        assert w.restarts == 0 and w.extract(str(ok)) == "hello"  # the same worker, ready for the next file
+        assert list(w.chunks(str(big), 16384)) == list(iter_text_chunks(str(big), 16384))
+    finally:
+        w.close()
+
+    with pytest.raises(SystemExit) as e:
+        main(["scan", "--verdict", "--resume", "scan-20250101-120000"])
+    assert e.value.code == 2 and "--resume" in capsys.readouterr().err
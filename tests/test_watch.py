@@ -0,0 +1,44 @@
+import os
+import queue
+
+from piiscanner.watch import Debouncer, PollingWatcher, matches, watch_roots
+
+
+def test_debouncer_waits_for_quiet_but_not_forever():
+    d = Debouncer(quiet=2.0, max_delay=5.0)
+    d.add("a", now=0.0)
+    d.add("a", now=1.5)
+    assert d.due(now=3.0) == []
+    assert d.next_due(now=3.0) == 0.5
+    assert d.due(now=3.5) == ["a"]
+    assert len(d) == 0
+
+    for t in range(0, 6):  # written every second, never quiet
+        d.add("log", now=float(t))
+    assert d.due(now=5.0) == ["log"]
+
+
+def test_polling_reports_new_and_modified_files(tmp_path):
+    (tmp_path / "old.txt").write_text("x")
+    events = queue.Queue()
+    w = PollingWatcher([str(tmp_path)], events)
+    w.seen = w.snapshot()
+
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "new.txt").write_text("hello")
+    w.poll()
+    assert events.get_nowait() == str(tmp_path / "sub" / "new.txt")
+    assert events.empty()
+
+    (tmp_path / "old.txt").write_text("changed")
+    w.poll()
+    assert events.get_nowait() == str(tmp_path / "old.txt")
+
+
+def test_targets_to_roots_and_matching(tmp_path):
+    pat = os.path.join(str(tmp_path), "**", "*.txt")
+    assert watch_roots([pat, os.path.join(str(tmp_path), "a", "*.pdf")]) == [str(tmp_path)]
+    assert matches(os.path.join(str(tmp_path), "x.txt"), [pat], [])
+    assert matches(os.path.join(str(tmp_path), "d", "x.txt"), [pat], [])
+    assert not matches(os.path.join(str(tmp_path), "x.pdf"), [pat], [])
+    assert not matches(os.path.join(str(tmp_path), ".git", "x.txt"), [pat], ["**/.git/**"])
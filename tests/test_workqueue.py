@@ -0,0 +1,61 @@
+import json
+import os
+import subprocess
+import sys
+
+import yaml
+
+from piiscanner.scan import run_scan
+from piiscanner.workqueue import WorkQueue, collect, coordinate
+
+
+def test_expired_lease_is_retried_and_stale_commit_dropped(tmp_path):
+    q = WorkQueue(tmp_path / "q.db")
+    q.add(["a", "b", "c"])
+    q.set_enumerated()
+
+    dead, rows = q.lease(2, ttl=-1)  # already expired, as if the worker died
+    assert [p for _, p in rows] == ["a", "b"]
+    live, rows2 = q.lease(10, ttl=60)
+    assert [p for _, p in rows2] == ["a", "b", "c"]
+
+    assert q.commit(dead, {fid: [{"label": "X"}] for fid, _ in rows}) == 0
+    assert q.commit(live, {fid: [] for fid, _ in rows2}) == 3
+    assert q.finished()
+    assert list(q.iter_results()) == []
+
+    q.add(["d"])
+    for _ in range(2):
+        q.lease(1, ttl=-1, max_attempts=2)
+    assert q.lease(1, ttl=60, max_attempts=2)[1] == []
+    assert q.counts()["failed"] == 1
+    [(path, findings, _, outcome)] = q.iter_results()
+    assert (path, findings, outcome["outcome"]) == ("d", [], "error")
+
+
+def test_local_worker_processes_match_single_process_scan(tiny_model_dir, tmp_path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    paths = []
+    for i in range(30):
+        p = docs / f"d{i:02d}.txt"
+        p.write_text("Call John Smith at 555-123-4567. " * (i + 1) if i % 4 else "nothing to see", encoding="utf-8")
+        paths.append(str(p))
+    cfg = {"model_dir": str(tiny_model_dir), "output": {"path": str(tmp_path / "out")}, "use_tune_profile": False,
+           "extraction_workers": 1, "queue": {"lease_files": 4, "poll_interval": 0.1}}
+    cfg_path = tmp_path / "config.yaml"
+    cfg_path.write_text(yaml.safe_dump(cfg))
+
+    db = tmp_path / "q.db"
+    coordinate(cfg, db, paths)
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(sys.path)}
+    workers = [subprocess.Popen([sys.executable, "-m", "piiscanner.scan", "--config", str(cfg_path),
+                                 "work", "--queue", str(db)], env=env, stdout=subprocess.PIPE)
+               for _ in range(3)]
+    committed = [int(w.communicate(timeout=120)[0].split()[-2]) for w in workers]
+    assert sum(committed) == len(paths)
+
+    distributed = [json.loads(line) for line in open(collect(cfg, db))]
+    cfg["output"]["path"] = str(tmp_path / "single")
+    single = [json.loads(line) for line in open(run_scan(cfg, paths))]
+    assert [(r["file"], r["findings"]) for r in distributed] == [(r["file"], r["findings"]) for r in single]